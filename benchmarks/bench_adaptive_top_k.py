@@ -0,0 +1,195 @@
+"""
+Benchmark of adaptive top_k (`RagConfig.adaptive_top_k`) against fixed top_k: chunks sent
+to the LLM per query, prompt tokens, LLM calls and query latency, with the relevance of the
+chunks (share of chunks from files of the query topic).
+
+Topics have from 1 to 7 files in the corpus: queries about a topic match from a few chunks to
+many, so that the number of relevant chunks varies from query to query.
+
+The fake LLM costs `--llm-latency` per call, plus `--llm-latency-per-prompt-token` per prompt
+word, like a local model whose prefill time grows with the context it is given.
+
+Usage:
+    python benchmarks/bench_adaptive_top_k.py --chunks-per-file 4 --top-k 3 10 \\
+        --max-k 10 --min-gaps 0.02 0.05 --llm-latency 0.1 --llm-latency-per-prompt-token 0.0002
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from corpus import TOPICS, generate_corpus, generate_queries
+from fakes import FakeEmbedding, FakeLLM
+from llama_index.core import Settings
+
+# Set before importing the server, which keeps already configured models
+Settings.embed_model = FakeEmbedding()
+Settings.llm = FakeLLM()
+
+from mcp_llamaindex.dir_rag_server import DirectoryRagServer, RagConfig
+from mcp_llamaindex.utils.adaptive_top_k import AdaptiveTopK
+from mcp_llamaindex.utils.metrics import metrics
+
+
+def file_topics(data_dir: Path) -> dict[str, str]:
+    """Topic of each corpus file, from its title."""
+    return {
+        path.name: path.read_text(encoding="utf-8").split("\n", 1)[0].split()[-1]
+        for path in data_dir.glob("*.md")
+    }
+
+
+def query_topic(query: str) -> str:
+    return next(topic for topic in TOPICS if topic in query)
+
+
+def generate_skewed_corpus(data_dir: Path, chunks_per_file: int, seed: int) -> None:
+    """Corpus where the first topics have 7 files, and the last half of them 1 file."""
+    for i in range(7):
+        # The first `len(TOPICS) >> i` topics get one more file
+        generate_corpus(
+            data_dir,
+            (len(TOPICS) >> i) * chunks_per_file,
+            chunks_per_file,
+            seed=seed + i,
+            prefix=f"doc{i}",
+        )
+
+
+def metric_total(snapshot: dict, section: str, name: str, **labels: str) -> float:
+    values = [
+        item["sum" if section == "histograms" else "value"]
+        for item in snapshot[section]
+        if item["name"] == name and item["labels"] == labels
+    ]
+    return sum(values)
+
+
+def measure(
+    server: DirectoryRagServer, queries: list[str], topics: dict[str, str]
+) -> dict:
+    metrics.reset()
+    latencies, nb_nodes, precisions = [], [], []
+    for query in queries:
+        start = time.perf_counter()
+        response = server.rag_query_engine.query(query)
+        latencies.append(time.perf_counter() - start)
+        nodes = response.source_nodes
+        nb_nodes.append(len(nodes))
+        relevant = [
+            topics.get(node.metadata.get("file_name")) == query_topic(query)
+            for node in nodes
+        ]
+        precisions.append(sum(relevant) / len(relevant) if relevant else 0.0)
+
+    snapshot = metrics.snapshot()
+    latencies.sort()
+    return {
+        "nodes_per_query": round(statistics.mean(nb_nodes), 2),
+        "min_nodes": min(nb_nodes),
+        "max_nodes": max(nb_nodes),
+        "prompt_tokens_per_query": round(
+            metric_total(snapshot, "counters", "tokens_total", kind="prompt")
+            / len(queries)
+        ),
+        "dropped_tokens_per_query": round(
+            metric_total(snapshot, "counters", "adaptive_dropped_tokens_total")
+            / len(queries)
+        ),
+        "llm_calls_per_query": round(
+            sum(
+                h["count"]
+                for h in snapshot["histograms"]
+                if h["labels"] == {"stage": "llm"}
+            )
+            / len(queries),
+            2,
+        ),
+        "mean_ms": round(statistics.mean(latencies) * 1e3, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1e3, 1),
+        "precision": round(statistics.mean(precisions), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--chunks-per-file", type=int, default=4)
+    parser.add_argument(
+        "--top-k", type=int, nargs="+", default=[3, 10], help="Fixed top_k baselines."
+    )
+    parser.add_argument("--min-k", type=int, default=1)
+    parser.add_argument("--max-k", type=int, default=10)
+    parser.add_argument("--min-gaps", type=float, nargs="+", default=[0.02, 0.05])
+    parser.add_argument("--min-score", type=float, default=None)
+    parser.add_argument(
+        "--llm-latency", type=float, default=0.1, help="Seconds per LLM call."
+    )
+    parser.add_argument(
+        "--llm-latency-per-prompt-token",
+        type=float,
+        default=0.0002,
+        help="Seconds per prompt word.",
+    )
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="JSON file to write results to.")
+    args = parser.parse_args()
+
+    configs = [{"top_k": top_k} for top_k in args.top_k] + [
+        {
+            "adaptive_top_k": AdaptiveTopK(
+                min_k=args.min_k,
+                max_k=args.max_k,
+                min_score=args.min_score,
+                min_gap=min_gap,
+            )
+        }
+        for min_gap in args.min_gaps
+    ]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        data_dir = root / "md_documents"
+        generate_skewed_corpus(data_dir, args.chunks_per_file, args.seed)
+        topics = file_topics(data_dir)
+        queries = generate_queries(args.queries, seed=args.seed)
+        Settings.llm.latency_s = args.llm_latency
+        Settings.llm.latency_per_prompt_token_s = args.llm_latency_per_prompt_token
+
+        for config in configs:
+            server = DirectoryRagServer(
+                rag_config=RagConfig(
+                    persist_dir=root / "vector_store", data_dir=data_dir, **config
+                )
+            )
+            _ = server.index
+            result = {
+                key: value.model_dump() if isinstance(value, AdaptiveTopK) else value
+                for key, value in config.items()
+            } | measure(server, queries, topics)
+            print(json.dumps(result))
+            results.append(result)
+
+    report = {
+        "config": {
+            key: str(value) if isinstance(value, Path) else value
+            for key, value in vars(args).items()
+        },
+        "platform": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark of file updates: chunk-level diff (`update_markdown_file`) against deleting
+and adding the file again, after a one-paragraph edit of a large Markdown file.
+
+Embedding latency is simulated per text, as it is the cost the diff avoids.
+
+Usage:
+    python benchmarks/bench_chunk_diff.py --sections 100 300 --embed-latency-per-text 0.01
+"""
+
+import argparse
+import json
+import platform
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from corpus import write_file
+from fakes import FakeEmbedding, FakeLLM
+from llama_index.core import Settings
+
+# Set before importing the server, which keeps already configured models
+Settings.embed_model = FakeEmbedding()
+Settings.llm = FakeLLM()
+
+from mcp_llamaindex.dir_rag_server import DirectoryRagServer, RagConfig
+
+
+def edit_one_paragraph(path: Path, rng: random.Random) -> None:
+    paragraphs = path.read_text(encoding="utf-8").split("\n\n")
+    i = rng.randrange(1, len(paragraphs))
+    paragraphs[i] += " This sentence was added by the edit."
+    path.write_text("\n\n".join(paragraphs), encoding="utf-8")
+
+
+def bench_size(root: Path, nb_sections: int, args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    data_dir = root / "md_documents"
+    data_dir.mkdir()
+    write_file(data_dir / "reference.md", rng, "alphalake", nb_sections)
+    DirectoryRagServer._get_or_create_index.cache_clear()
+    server = DirectoryRagServer(
+        rag_config=RagConfig(persist_dir=root / "vector_store", data_dir=data_dir)
+    )
+    nb_chunks = server.index.vector_store._collection.count()
+
+    new_version = root / "reference.md"
+    new_version.write_text((data_dir / "reference.md").read_text(encoding="utf-8"))
+    edit_one_paragraph(new_version, rng)
+
+    start = time.perf_counter()
+    server.delete_markdown_files(["reference.md"])
+    server.add_markdown_file(new_version)
+    readd_s = time.perf_counter() - start
+
+    edit_one_paragraph(new_version, rng)
+    start = time.perf_counter()
+    report = server.update_markdown_file(new_version)
+    update_s = time.perf_counter() - start
+    assert server.index.vector_store._collection.count() == (
+        report["unchanged"] + report["embedded"]
+    )
+
+    return {
+        "file_mb": round(new_version.stat().st_size / 2**20, 2),
+        "chunks": nb_chunks,
+        "readd_embedded": nb_chunks,
+        "readd_s": round(readd_s, 3),
+        "update_embedded": report["embedded"],
+        "update_s": round(update_s, 3),
+        "speedup": round(readd_s / update_s, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--sections",
+        type=int,
+        nargs="+",
+        default=[300],
+        help="Sections of the file, about one chunk each.",
+    )
+    parser.add_argument(
+        "--embed-latency-per-text",
+        type=float,
+        default=0.01,
+        help="Seconds per embedded text.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="JSON file to write results to.")
+    args = parser.parse_args()
+
+    Settings.embed_model = FakeEmbedding(latency_per_text_s=args.embed_latency_per_text)
+
+    results = []
+    for nb_sections in args.sections:
+        with tempfile.TemporaryDirectory() as tmp:
+            result = {"sections": nb_sections} | bench_size(
+                Path(tmp), nb_sections, args
+            )
+        print(json.dumps(result))
+        results.append(result)
+
+    report = {
+        "config": {
+            key: str(value) if isinstance(value, Path) else value
+            for key, value in vars(args).items()
+        },
+        "platform": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
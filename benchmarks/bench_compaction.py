@@ -0,0 +1,139 @@
+"""
+Benchmark of index compaction: disk usage and retrieval latency of an index after
+add/delete churn, before and after `compact_index`.
+
+Each churn cycle deletes a share of the files from the index, then adds them again,
+which leaves their previous embeddings as deleted elements of the HNSW index.
+
+Usage:
+    python benchmarks/bench_compaction.py --chunks 5000 --cycles 10 --churn 0.2
+"""
+
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from corpus import generate_corpus, generate_queries
+from fakes import FakeEmbedding, FakeLLM
+from llama_index.core import Settings
+
+# Set before importing the server, which keeps already configured models
+Settings.embed_model = FakeEmbedding()
+Settings.llm = FakeLLM()
+
+from mcp_llamaindex.dir_rag_server import DirectoryRagServer, RagConfig
+from mcp_llamaindex.utils.maintenance import CHROMA_COLLECTION, drop_replaced_collection
+
+
+def retrieve_ms(server: DirectoryRagServer, queries: list[str]) -> float:
+    """Median latency of `retrieve_docs`, in milliseconds."""
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        server.retrieve_docs(query)
+        latencies.append(time.perf_counter() - start)
+    return round(statistics.median(latencies) * 1e3, 3)
+
+
+def summary(stats: dict, latency_ms: float) -> dict:
+    return {
+        "chunks": stats["chunks"],
+        "hnsw_elements": stats["hnsw_elements"],
+        "persist_dir_mb": round(stats["persist_dir_bytes"] / 2**20, 2),
+        "hnsw_index_mb": round(stats["hnsw_index_bytes"] / 2**20, 2),
+        "chroma_sqlite_mb": round(stats["sqlite_bytes"] / 2**20, 2),
+        "orphan_docstore_entries": stats["orphan_docstore_entries"],
+        "retrieve_p50_ms": latency_ms,
+    }
+
+
+def bench_size(root: Path, nb_chunks: int, args: argparse.Namespace) -> dict:
+    files = generate_corpus(root / "md_documents", nb_chunks, seed=args.seed)
+    DirectoryRagServer._get_or_create_index.cache_clear()
+    server = DirectoryRagServer(
+        rag_config=RagConfig(
+            persist_dir=root / "vector_store",
+            data_dir=root / "md_documents",
+            docstore_backend=args.docstore_backend,
+        )
+    )
+    queries = generate_queries(args.queries, seed=args.seed)
+    fresh = summary(server.get_index_stats(), retrieve_ms(server, queries))
+
+    # Deleted files are added back from a copy
+    backup_dir = root / "backup"
+    backup_dir.mkdir()
+    churned_files = []
+    for path in files[: max(1, int(len(files) * args.churn))]:
+        churned_files.append(backup_dir / path.name)
+        shutil.copy(path, churned_files[-1])
+    for _ in range(args.cycles):
+        server.delete_markdown_files([path.name for path in churned_files])
+        for path in churned_files:
+            server.add_markdown_file(path)
+    churned = summary(server.get_index_stats(), retrieve_ms(server, queries))
+
+    start = time.perf_counter()
+    server.compact_index()
+    compaction_s = time.perf_counter() - start
+    # As the next compaction does, once no query runs on the old collection
+    drop_replaced_collection(root / "vector_store", CHROMA_COLLECTION)
+    compacted = summary(server.get_index_stats(), retrieve_ms(server, queries))
+
+    return {
+        "target_chunks": nb_chunks,
+        "files": len(files),
+        "churned_files": len(churned_files),
+        "fresh": fresh,
+        "churned": churned,
+        "compacted": compacted,
+        "compaction_s": round(compaction_s, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--chunks", type=int, nargs="+", default=[5000])
+    parser.add_argument("--cycles", type=int, default=10)
+    parser.add_argument(
+        "--churn", type=float, default=0.2, help="Share of files churned per cycle."
+    )
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument(
+        "--docstore-backend", choices=["json", "sqlite", "none"], default="sqlite"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="JSON file to write results to.")
+    args = parser.parse_args()
+
+    results = []
+    for nb_chunks in args.chunks:
+        with tempfile.TemporaryDirectory() as tmp:
+            result = bench_size(Path(tmp), nb_chunks, args)
+        print(json.dumps(result))
+        results.append(result)
+
+    report = {
+        "config": {
+            key: str(value) if isinstance(value, Path) else value
+            for key, value in vars(args).items()
+        },
+        "platform": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
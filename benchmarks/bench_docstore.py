@@ -0,0 +1,74 @@
+"""
+Benchmark index creation (with persist) and cold start time for each docstore backend.
+
+Usage:
+    python benchmarks/bench_docstore.py --nb-files 1000
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from llama_index.core import Settings
+from llama_index.core.embeddings import MockEmbedding
+
+# Embedding cost is not what is measured here.
+# Set before importing the server, which keeps already configured models
+Settings.embed_model = MockEmbedding(embed_dim=1024)
+
+from mcp_llamaindex.dir_rag_server import DirectoryRagServer, RagConfig
+
+
+def write_corpus(data_dir: Path, nb_files: int) -> None:
+    data_dir.mkdir(parents=True)
+    paragraph = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 20
+    for i in range(nb_files):
+        sections = [f"## Section {j}\n\n{paragraph}" for j in range(5)]
+        (data_dir / f"doc_{i}.md").write_text(
+            f"# Document {i}\n\n" + "\n\n".join(sections)
+        )
+
+
+def dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def bench_backend(root: Path, backend: str) -> dict:
+    rag_config = RagConfig(
+        persist_dir=root / f"vector_store_{backend}",
+        data_dir=root / "md_documents",
+        docstore_backend=backend,
+    )
+    DirectoryRagServer._get_or_create_index.cache_clear()
+    start = time.perf_counter()
+    _ = DirectoryRagServer(rag_config=rag_config).index
+    build_time = time.perf_counter() - start
+
+    DirectoryRagServer._get_or_create_index.cache_clear()
+    start = time.perf_counter()
+    _ = DirectoryRagServer(rag_config=rag_config).index
+    startup_time = time.perf_counter() - start
+
+    return {
+        "backend": backend,
+        "build_s": round(build_time, 3),
+        "startup_s": round(startup_time, 3),
+        "disk_mb": round(dir_size(Path(rag_config.persist_dir)) / 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--nb-files", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        write_corpus(root / "md_documents", args.nb_files)
+        for backend in ["json", "sqlite", "none"]:
+            print(bench_backend(root, backend))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Benchmark of the shared embedding server against one in-process model per process:
+embedding throughput of concurrent client processes, and memory (max RSS) of all processes.
+
+Clients send small requests (e.g. queries, or documents inserted one by one), which the
+server groups into batches. With the default fake model, each call costs a fixed latency,
+plus a latency per text; pass `--model BAAI/bge-large-en-v1.5` to measure the real model.
+
+Usage:
+    python benchmarks/bench_embedding_server.py --processes 4 --texts 200 --request-size 1
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from corpus import generate_queries
+from fakes import FakeEmbedding
+
+from mcp_llamaindex.utils.embedding_server import RemoteEmbedding, make_server
+
+
+def load_model(args: argparse.Namespace):
+    if args.model == "fake":
+        return FakeEmbedding(
+            model_name="fake",
+            latency_s=args.fake_latency,
+            latency_per_text_s=args.fake_latency_per_text,
+            busy=True,
+        )
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+    return HuggingFaceEmbedding(
+        model_name=args.model, embed_batch_size=args.max_batch_size
+    )
+
+
+def max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_server(args: argparse.Namespace, url: str, ready, stop, results) -> None:
+    server = make_server(
+        load_model(args),
+        url,
+        max_batch_size=args.max_batch_size,
+        max_wait_s=args.max_wait_ms / 1e3,
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    ready.set()
+    stop.wait()
+    server.shutdown()
+    results.put(max_rss_mb())
+
+
+def run_client(args: argparse.Namespace, url: str | None, seed: int, barrier, results):
+    model = RemoteEmbedding(model_name=args.model, url=url) if url else load_model(args)
+    texts = generate_queries(args.texts, seed=seed)
+    requests = [
+        texts[i : i + args.request_size]
+        for i in range(0, len(texts), args.request_size)
+    ]
+    barrier.wait()
+    start = time.perf_counter()
+    for request in requests:
+        model.get_text_embedding_batch(request)
+    results.put((time.perf_counter() - start, max_rss_mb()))
+
+
+def bench_mode(args: argparse.Namespace, shared: bool) -> dict:
+    results = multiprocessing.Queue()
+    barrier = multiprocessing.Barrier(args.processes)
+    server, url, server_rss = None, None, 0.0
+    with tempfile.TemporaryDirectory() as tmp:
+        if shared:
+            url = f"unix://{Path(tmp) / 'embed.sock'}"
+            ready, stop = multiprocessing.Event(), multiprocessing.Event()
+            server_results = multiprocessing.Queue()
+            server = multiprocessing.Process(
+                target=run_server, args=(args, url, ready, stop, server_results)
+            )
+            server.start()
+            ready.wait()
+
+        clients = [
+            multiprocessing.Process(
+                target=run_client, args=(args, url, seed, barrier, results)
+            )
+            for seed in range(args.processes)
+        ]
+        for client in clients:
+            client.start()
+        client_results = [results.get() for _ in clients]
+        for client in clients:
+            client.join()
+        if server:
+            stop.set()
+            server_rss = server_results.get()
+            server.join()
+
+    elapsed = max(result[0] for result in client_results)
+    clients_rss = sum(result[1] for result in client_results)
+    return {
+        "mode": "shared_server" if shared else "in_process",
+        "texts_per_s": round(args.processes * args.texts / elapsed, 1),
+        "seconds": round(elapsed, 3),
+        "clients_rss_mb": round(clients_rss, 1),
+        "server_rss_mb": round(server_rss, 1),
+        "total_rss_mb": round(clients_rss + server_rss, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--model", default="fake")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--texts", type=int, default=200, help="Texts per process.")
+    parser.add_argument("--request-size", type=int, default=1)
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument(
+        "--fake-latency", type=float, default=0.02, help="Seconds per call."
+    )
+    parser.add_argument(
+        "--fake-latency-per-text",
+        type=float,
+        default=0.001,
+        help="Seconds per embedded text.",
+    )
+    parser.add_argument("--output", type=Path, help="JSON file to write results to.")
+    args = parser.parse_args()
+
+    results = []
+    for shared in (False, True):
+        result = bench_mode(args, shared)
+        print(json.dumps(result))
+        results.append(result)
+
+    report = {
+        "config": {
+            key: str(value) if isinstance(value, Path) else value
+            for key, value in vars(args).items()
+        },
+        "platform": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": multiprocessing.cpu_count(),
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
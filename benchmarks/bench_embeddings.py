@@ -0,0 +1,158 @@
+"""
+Benchmark of embedding backends on CPU: throughput (chunks/s) of each configuration,
+and retrieval drift relative to the current model (HuggingFaceEmbedding, torch fp32,
+batches in insertion order).
+
+Drift is reported as the mean cosine similarity of chunk embeddings with the reference
+ones, and as the recall@k of the reference top-k chunks of each query.
+
+Usage:
+    python benchmarks/bench_embeddings.py --configs torch onnx onnx-int8 --num-threads 4
+"""
+
+import argparse
+import json
+import platform
+import random
+import time
+from pathlib import Path
+
+import numpy as np
+from corpus import TOPICS, generate_queries, section_text
+from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+from mcp_llamaindex.utils.embeddings import make_embed_model
+
+# name: (backend, precision), "reference" being the current model
+CONFIGS = {
+    "reference": None,
+    "torch": ("torch", "fp32"),
+    "onnx": ("onnx", "fp32"),
+    "onnx-int8": ("onnx", "int8"),
+}
+
+
+def generate_chunks(nb_chunks: int, seed: int = 0) -> list[str]:
+    """Chunks of varied lengths, as produced by the splitter on real documents."""
+    rng = random.Random(seed)
+    chunks = []
+    for i in range(nb_chunks):
+        words = section_text(rng, TOPICS[i % len(TOPICS)]).split()
+        chunks.append(" ".join(words[: rng.randint(20, len(words))]))
+    return chunks
+
+
+def embed(embed_model, chunks: list[str], queries: list[str]) -> dict:
+    embed_model.get_text_embedding_batch(chunks[:8])  # Warm up
+    start = time.perf_counter()
+    chunk_embeddings = np.array(embed_model.get_text_embedding_batch(chunks))
+    seconds = time.perf_counter() - start
+    query_embeddings = np.array([embed_model.get_query_embedding(q) for q in queries])
+    return {
+        "seconds": seconds,
+        "chunks": chunk_embeddings,
+        "queries": query_embeddings,
+    }
+
+
+def top_k(chunks: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    return np.argsort(-(queries @ chunks.T), axis=1)[:, :k]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--model", default="BAAI/bge-large-en-v1.5")
+    parser.add_argument(
+        "--configs", nargs="+", choices=list(CONFIGS)[1:], default=list(CONFIGS)[1:]
+    )
+    parser.add_argument("--chunks", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--max-batch-tokens", type=int, default=8192)
+    parser.add_argument("--max-length", type=int)
+    parser.add_argument("--num-threads", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="JSON file to write results to.")
+    args = parser.parse_args()
+
+    chunks = generate_chunks(args.chunks, seed=args.seed)
+    queries = generate_queries(args.queries, seed=args.seed)
+
+    reference = embed(
+        HuggingFaceEmbedding(
+            model_name=args.model,
+            embed_batch_size=args.batch_size,
+            max_length=args.max_length,
+        ),
+        chunks,
+        queries,
+    )
+    reference_top_k = top_k(reference["chunks"], reference["queries"], args.top_k)
+
+    results = []
+    for name in ["reference"] + args.configs:
+        result = {"config": name}
+        try:
+            if name == "reference":
+                embedded = reference
+            else:
+                backend, precision = CONFIGS[name]
+                embedded = embed(
+                    make_embed_model(
+                        args.model,
+                        backend=backend,
+                        precision=precision,
+                        batch_size=args.batch_size,
+                        max_batch_tokens=args.max_batch_tokens,
+                        max_length=args.max_length,
+                        num_threads=args.num_threads,
+                    ),
+                    chunks,
+                    queries,
+                )
+        except Exception as e:  # noqa: BLE001 - e.g. onnx backend without optimum
+            result["error"] = str(e)
+            print(json.dumps(result))
+            results.append(result)
+            continue
+
+        retrieved = top_k(embedded["chunks"], embedded["queries"], args.top_k)
+        recall = np.mean(
+            [
+                len(set(found) & set(expected)) / args.top_k
+                for found, expected in zip(retrieved, reference_top_k)
+            ]
+        )
+        cosine = np.sum(embedded["chunks"] * reference["chunks"], axis=1) / (
+            np.linalg.norm(embedded["chunks"], axis=1)
+            * np.linalg.norm(reference["chunks"], axis=1)
+        )
+        result |= {
+            "chunks_per_s": round(len(chunks) / embedded["seconds"], 2),
+            "speedup": round(reference["seconds"] / embedded["seconds"], 2),
+            "mean_cosine_to_reference": round(float(np.mean(cosine)), 5),
+            f"recall@{args.top_k}_vs_reference": round(float(recall), 4),
+        }
+        print(json.dumps(result))
+        results.append(result)
+
+    report = {
+        "config": {
+            key: str(value) if isinstance(value, Path) else value
+            for key, value in vars(args).items()
+        },
+        "platform": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
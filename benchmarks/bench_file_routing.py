@@ -0,0 +1,147 @@
+"""
+Benchmark of two-stage file routing (`RagConfig.route_top_files`) against flat search of all
+chunks: retrieval latency and relevance, for growing corpora.
+
+Each synthetic file covers one topic, and queries target a topic: relevance is the share
+of retrieved chunks from files of the query topic (precision@k).
+
+Usage:
+    python benchmarks/bench_file_routing.py --chunks 10000 100000 --top-files 5 20
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from corpus import TOPICS, generate_corpus, generate_queries
+from fakes import FakeEmbedding, FakeLLM
+from llama_index.core import Settings
+
+# Set before importing the server, which keeps already configured models
+Settings.embed_model = FakeEmbedding()
+Settings.llm = FakeLLM()
+
+from mcp_llamaindex.dir_rag_server import DirectoryRagServer, RagConfig
+
+
+def file_topics(data_dir: Path) -> dict[str, str]:
+    """Topic of each corpus file, from its title."""
+    return {
+        path.name: path.read_text(encoding="utf-8").split("\n", 1)[0].split()[-1]
+        for path in data_dir.glob("*.md")
+    }
+
+
+def query_topic(query: str) -> str:
+    return next(topic for topic in TOPICS if topic in query)
+
+
+def measure(retriever, queries: list[str], topics: dict[str, str]) -> dict:
+    latencies, precisions = [], []
+    for query in queries:
+        start = time.perf_counter()
+        nodes = retriever.retrieve(query)
+        latencies.append(time.perf_counter() - start)
+        relevant = [
+            topics.get(node.metadata.get("file_name")) == query_topic(query)
+            for node in nodes
+        ]
+        precisions.append(sum(relevant) / len(relevant) if relevant else 0.0)
+    latencies.sort()
+    return {
+        "p50_ms": round(latencies[len(latencies) // 2] * 1e3, 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1e3, 2),
+        "precision": round(statistics.mean(precisions), 4),
+    }
+
+
+def bench_size(root: Path, nb_chunks: int, args: argparse.Namespace) -> list[dict]:
+    data_dir = root / "md_documents"
+    generate_corpus(data_dir, nb_chunks, args.chunks_per_file, seed=args.seed)
+    DirectoryRagServer._get_or_create_index.cache_clear()
+    DirectoryRagServer._get_file_summaries.cache_clear()
+    server = DirectoryRagServer(
+        rag_config=RagConfig(
+            persist_dir=root / "vector_store",
+            data_dir=data_dir,
+            route_top_files=args.top_files[0],
+        )
+    )
+    start = time.perf_counter()
+    index = server.index
+    build_s = time.perf_counter() - start
+    file_summaries = server.file_summaries
+
+    topics = file_topics(data_dir)
+    queries = generate_queries(args.queries, seed=args.seed)
+    common = {
+        "chunks": index.vector_store._collection.count(),
+        "files": file_summaries.collection.count(),
+        "build_s": round(build_s, 2),
+    }
+    results = [
+        common
+        | {"mode": "flat"}
+        | measure(
+            DirectoryRagServer._make_retriever(index, args.top_k), queries, topics
+        )
+    ]
+    for top_files in args.top_files:
+        retriever = DirectoryRagServer._make_retriever(
+            index, args.top_k, None, file_summaries, top_files
+        )
+        results.append(
+            common
+            | {"mode": "routed", "top_files": top_files}
+            | measure(retriever, queries, topics)
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--chunks", type=int, nargs="+", default=[10000])
+    parser.add_argument("--chunks-per-file", type=int, default=10)
+    parser.add_argument(
+        "--top-files",
+        type=int,
+        nargs="+",
+        default=[5, 20],
+        help="Numbers of files selected by routing.",
+    )
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="JSON file to write results to.")
+    args = parser.parse_args()
+
+    results = []
+    for nb_chunks in args.chunks:
+        with tempfile.TemporaryDirectory() as tmp:
+            for result in bench_size(Path(tmp), nb_chunks, args):
+                print(json.dumps(result))
+                results.append(result)
+
+    report = {
+        "config": {
+            key: str(value) if isinstance(value, Path) else value
+            for key, value in vars(args).items()
+        },
+        "platform": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Micro-benchmark of link extraction on a documentation-like HTML page.
+Compares the full BeautifulSoup DOM used before with `extract_hrefs`.
+
+Usage:
+    python benchmarks/bench_link_extraction.py --nb-sections 200
+"""
+
+import argparse
+import timeit
+
+from bs4 import BeautifulSoup
+
+from mcp_llamaindex.utils.crawler import extract_hrefs
+
+
+def documentation_page(nb_sections: int) -> str:
+    sidebar = "".join(
+        f'<li class="toctree-l1"><a class="reference internal" href="/docs/api/module_{i}.html">Module {i}</a></li>'
+        for i in range(300)
+    )
+    sections = "".join(
+        f'<section id="section-{i}"><h2>Section {i}<a class="headerlink" href="#section-{i}">¶</a></h2>'
+        f"<p>Some <em>explanations</em> with <code>inline_code()</code> and a "
+        f'<a href="../guide/page_{i}.html#anchor">link to the guide</a>.</p>'
+        f'<div class="highlight"><pre><span class="k">def</span> <span class="nf">f_{i}</span>'
+        f'(<span class="n">x</span>): <span class="k">return</span> x</pre></div>'
+        f"<table><tr><td>cell</td><td>cell</td><td>cell</td></tr></table></section>"
+        for i in range(nb_sections)
+    )
+    return (
+        "<html><head><title>Docs</title></head><body>"
+        f'<nav class="sidebar"><ul>{sidebar}</ul></nav>'
+        f'<main><article role="main">{sections}</article></main>'
+        "<footer><a href='/about'>About</a></footer></body></html>"
+    )
+
+
+def beautifulsoup_hrefs(html: str, css_selector: str | None) -> list[str]:
+    soup = BeautifulSoup(html, "html.parser")
+    if css_selector:
+        soup = soup.select_one(css_selector) or soup
+    return [a_tag.get("href") for a_tag in soup.find_all("a", href=True)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--nb-sections", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    html = documentation_page(args.nb_sections)
+    print(f"Page size: {len(html) / 1e3:.0f} kB")
+    for css_selector in [None, "main", "main > article"]:
+        assert (
+            beautifulsoup_hrefs(html, css_selector)
+            == extract_hrefs(html, css_selector)[0]
+        )
+        before = min(
+            timeit.repeat(
+                lambda css_selector=css_selector: beautifulsoup_hrefs(
+                    html, css_selector
+                ),
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+        after = min(
+            timeit.repeat(
+                lambda css_selector=css_selector: extract_hrefs(html, css_selector),
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+        print(
+            f"css_selector={css_selector!r}: BeautifulSoup {before * 1e3:.1f} ms, "
+            f"extract_hrefs {after * 1e3:.1f} ms, speedup x{before / after:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""
+Load test of the MCP server, with concurrent FastMCP clients.
+
+The server is the one of `mcp_llamaindex.mcp_server` (DirectoryRagServer), on a synthetic
+corpus in a temporary directory. Its LLM is a local stand-in of the LM Studio endpoint
+(see fake_lmstudio.py), and its embedding model a deterministic fake, so that the
+server overhead and its scaling can be measured without real backends.
+
+Transports:
+    in-memory: each session is a distinct client session on the same server.
+    stdio: the server runs in a subprocess, which serves a single session by design.
+        Sessions then share this connection, and send their calls concurrently.
+
+Each session makes `--calls` tool calls, picked randomly with `--mix` ratios among
+query (query_docs), list (get_indexed_files), add (add_markdown_file) and
+delete (delete_markdown_files, of a file previously added).
+
+Usage:
+    python benchmarks/bench_mcp_load.py --transport in-memory --sessions 8 --calls 50 \\
+        --mix query=0.7,list=0.2,add=0.05,delete=0.05 --llm-latency 0.2 --output load.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import AsyncExitStack
+from pathlib import Path
+
+from corpus import generate_corpus, generate_queries
+from fake_lmstudio import serve_in_thread
+from fakes import FakeEmbedding
+from fastmcp import Client
+from fastmcp.client.transports import PythonStdioTransport
+from llama_index.core import Settings
+
+OPERATIONS = ("query", "list", "add", "delete")
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    mix = {}
+    for item in value.split(","):
+        operation, _, ratio = item.partition("=")
+        if operation not in OPERATIONS:
+            raise argparse.ArgumentTypeError(
+                f"Unknown operation '{operation}', expected one of {OPERATIONS}."
+            )
+        mix[operation] = float(ratio)
+    if sum(mix.values()) <= 0:
+        raise argparse.ArgumentTypeError("At least one ratio must be positive.")
+    return mix
+
+
+def build_server(root: Path, embed_latency: float):
+    """
+    Builds the FastMCP server of mcp_server.py, on the benchmark directories.
+    LLM_BASE_URL must already point to the LM Studio stand-in.
+    """
+    # Set before importing the server, which keeps already configured models
+    Settings.embed_model = FakeEmbedding(latency_per_text_s=embed_latency)
+    from mcp_llamaindex.dir_rag_server import DirectoryRagServer, RagConfig
+
+    server = DirectoryRagServer(
+        rag_config=RagConfig(
+            persist_dir=root / "vector_store", data_dir=root / "md_documents"
+        )
+    )
+    _ = server.index  # Index creation is not part of the load test
+    return server.as_server()
+
+
+def serve_stdio(root: Path, embed_latency: float) -> None:
+    """Server side of the stdio transport, run in a subprocess."""
+    build_server(root, embed_latency).run(transport="stdio", show_banner=False)
+
+
+def percentiles(latencies: list[float]) -> dict[str, float]:
+    if not latencies:
+        return {}
+    latencies = sorted(latencies)
+    return {
+        f"p{q}_ms": round(
+            latencies[min(len(latencies) * q // 100, len(latencies) - 1)] * 1e3, 3
+        )
+        for q in (50, 95, 99)
+    } | {"max_ms": round(latencies[-1] * 1e3, 3)}
+
+
+class Workload:
+    """Tool calls shared by all sessions, and their records."""
+
+    def __init__(self, mix: dict[str, float], extra_files: list[Path], seed: int):
+        self.operations = list(mix)
+        self.weights = list(mix.values())
+        self.queries = generate_queries(100, seed=seed)
+        self.to_add = list(extra_files)
+        self.added: list[str] = []
+        self.records: list[tuple[str, float, bool]] = []
+
+    def next_call(self, rng: random.Random) -> tuple[str, str, dict]:
+        operation = rng.choices(self.operations, self.weights)[0]
+        if operation == "delete" and not self.added:
+            operation = "add" if self.to_add else "list"
+        if operation == "add" and not self.to_add:
+            operation = "list"
+
+        if operation == "query":
+            return operation, "query_docs", {"query": rng.choice(self.queries)}
+        if operation == "add":
+            file_path = self.to_add.pop()
+            self.added.append(file_path.name)
+            return operation, "add_markdown_file", {"file_path": str(file_path)}
+        if operation == "delete":
+            file_name = self.added.pop(rng.randrange(len(self.added)))
+            return operation, "delete_markdown_files", {"file_names": [file_name]}
+        return operation, "get_indexed_files", {}
+
+    async def run_session(
+        self, client: Client, nb_calls: int, seed: int, timeout: float
+    ) -> None:
+        rng = random.Random(seed)
+        for _ in range(nb_calls):
+            operation, tool, arguments = self.next_call(rng)
+            start = time.perf_counter()
+            try:
+                result = await client.call_tool(
+                    tool, arguments, timeout=timeout, raise_on_error=False
+                )
+                error = result.is_error
+            except Exception:  # noqa: BLE001 - any failure counts as an error
+                error = True
+            self.records.append((operation, time.perf_counter() - start, error))
+
+    def report(self, duration_s: float) -> dict:
+        by_operation = defaultdict(list)
+        for operation, latency, error in self.records:
+            by_operation[operation].append((latency, error))
+        nb_errors = sum(error for _, _, error in self.records)
+        return {
+            "calls": len(self.records),
+            "duration_s": round(duration_s, 3),
+            "throughput_calls_per_s": round(len(self.records) / duration_s, 2),
+            "error_rate": round(nb_errors / max(len(self.records), 1), 4),
+            "latency": percentiles([latency for _, latency, _ in self.records]),
+            "operations": {
+                operation: {
+                    "calls": len(records),
+                    "error_rate": round(
+                        sum(error for _, error in records) / len(records), 4
+                    ),
+                    **percentiles([latency for latency, _ in records]),
+                }
+                for operation, records in sorted(by_operation.items())
+            },
+        }
+
+
+async def run_load(args: argparse.Namespace, root: Path, workload: Workload) -> float:
+    if args.transport == "stdio":
+        transport = PythonStdioTransport(
+            script_path=__file__,
+            args=[
+                "--serve-stdio",
+                str(root),
+                "--embed-latency",
+                str(args.embed_latency),
+            ],
+            # The subprocess needs the LM Studio stand-in URL, and the benchmark env
+            env=dict(os.environ),
+            cwd=os.getcwd(),
+        )
+        clients = [Client(transport, timeout=args.timeout)]
+    else:
+        mcp = build_server(root, args.embed_latency)
+        clients = [Client(mcp) for _ in range(args.sessions)]
+
+    async with AsyncExitStack() as stack:
+        # Clients are connected first, so that connection time is not measured
+        for client in clients:
+            await stack.enter_async_context(client)
+        await clients[0].ping()
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(
+                workload.run_session(
+                    clients[i % len(clients)], args.calls, args.seed + i, args.timeout
+                )
+                for i in range(args.sessions)
+            )
+        )
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--transport", choices=["in-memory", "stdio"], default="in-memory"
+    )
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--calls", type=int, default=25, help="Tool calls per session.")
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default="query=0.7,list=0.2,add=0.05,delete=0.05",
+        help="Ratios of operations, among query, list, add and delete.",
+    )
+    parser.add_argument("--chunks", type=int, default=1000, help="Corpus size.")
+    parser.add_argument(
+        "--llm-latency", type=float, default=0.0, help="Seconds per LLM call."
+    )
+    parser.add_argument(
+        "--embed-latency",
+        type=float,
+        default=0.0,
+        help="Seconds per embedded text.",
+    )
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="JSON file to write results to.")
+    parser.add_argument("--serve-stdio", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_stdio:
+        serve_stdio(args.serve_stdio, args.embed_latency)
+        return
+
+    llm_server, os.environ["LLM_BASE_URL"] = serve_in_thread(latency_s=args.llm_latency)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        generate_corpus(root / "md_documents", args.chunks, seed=args.seed)
+        nb_adds = args.sessions * args.calls
+        extra_files = generate_corpus(
+            root / "extra",
+            nb_adds * 2,
+            chunks_per_file=2,
+            seed=args.seed + 1,
+            prefix="extra",
+        )
+        workload = Workload(args.mix, extra_files, args.seed)
+        duration_s = asyncio.run(run_load(args, root, workload))
+    llm_server.shutdown()
+
+    report = {
+        "config": {
+            key: str(value) if isinstance(value, Path) else value
+            for key, value in vars(args).items()
+            if key != "serve_stdio"
+        },
+        "results": workload.report(duration_s),
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmark of reduced-dimension embeddings (`RagConfig.embed_dim`): retrieval quality
+against index size and query latency, for PCA and truncation to each dimension.
+
+Quality is the recall@k of the full-dimension top-k chunks of each query, exact search.
+Size and latency are those of a persistent Chroma collection holding the chunk vectors.
+
+Usage:
+    python benchmarks/bench_projection.py --dims 64 128 256 512 --chunks 2000
+"""
+
+import argparse
+import json
+import platform
+import tempfile
+import time
+from pathlib import Path
+
+import chromadb
+import numpy as np
+from bench_embeddings import generate_chunks, top_k
+from corpus import generate_queries
+
+from mcp_llamaindex.utils.embeddings import make_embed_model
+from mcp_llamaindex.utils.projection import EmbeddingProjection
+from mcp_llamaindex.utils.snapshot import BATCH_SIZE
+
+
+def dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def bench_collection(
+    chunks: np.ndarray, queries: np.ndarray, k: int
+) -> tuple[float, float]:
+    """Persisted size (MB) and mean query latency (ms) of a Chroma collection."""
+    with tempfile.TemporaryDirectory() as tmp:
+        client = chromadb.PersistentClient(path=tmp)
+        collection = client.create_collection("bench")
+        for start in range(0, len(chunks), BATCH_SIZE):
+            batch = chunks[start : start + BATCH_SIZE]
+            collection.add(
+                ids=[str(i) for i in range(start, start + len(batch))],
+                embeddings=batch.tolist(),
+            )
+        collection.query(query_embeddings=queries[:1].tolist(), n_results=k)  # Warm up
+        start = time.perf_counter()
+        for query in queries:
+            collection.query(query_embeddings=[query.tolist()], n_results=k)
+        query_ms = (time.perf_counter() - start) / len(queries) * 1e3
+        size_mb = dir_size(Path(tmp)) / 2**20
+    return size_mb, query_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--model", default="BAAI/bge-large-en-v1.5")
+    parser.add_argument("--dims", type=int, nargs="+", default=[64, 128, 256, 512])
+    parser.add_argument(
+        "--methods", nargs="+", choices=["pca", "truncate"], default=["pca", "truncate"]
+    )
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument(
+        "--sample-size",
+        type=int,
+        default=1024,
+        help="Chunks the PCA is fitted on, as `RagConfig.projection_sample_size`.",
+    )
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="JSON file to write results to.")
+    args = parser.parse_args()
+
+    embed_model = make_embed_model(args.model)
+    chunks = np.array(
+        embed_model.get_text_embedding_batch(generate_chunks(args.chunks, args.seed)),
+        dtype=np.float32,
+    )
+    queries = np.array(
+        [
+            embed_model.get_query_embedding(query)
+            for query in generate_queries(args.queries, seed=args.seed)
+        ],
+        dtype=np.float32,
+    )
+    reference_top_k = top_k(chunks, queries, args.top_k)
+    full_dim = chunks.shape[1]
+    sample = chunks[
+        np.random.default_rng(args.seed).permutation(len(chunks))[: args.sample_size]
+    ]
+
+    configs = [("full", full_dim)] + [
+        (method, dim) for method in args.methods for dim in args.dims if dim < full_dim
+    ]
+    results = []
+    for method, dim in configs:
+        if method == "full":
+            projected_chunks, projected_queries = chunks, queries
+        else:
+            projection = EmbeddingProjection.fit(sample, dim, method)
+            projected_chunks = projection.apply(chunks)
+            projected_queries = projection.apply(queries)
+
+        retrieved = top_k(projected_chunks, projected_queries, args.top_k)
+        recall = np.mean(
+            [
+                len(set(found) & set(expected)) / args.top_k
+                for found, expected in zip(retrieved, reference_top_k)
+            ]
+        )
+        size_mb, query_ms = bench_collection(
+            projected_chunks, projected_queries, args.top_k
+        )
+        result = {
+            "method": method,
+            "dim": dim,
+            f"recall@{args.top_k}_vs_full": round(float(recall), 4),
+            "vector_bytes": dim * 4,
+            "chroma_mb": round(size_mb, 2),
+            "query_ms": round(query_ms, 3),
+        }
+        print(json.dumps(result))
+        results.append(result)
+
+    report = {
+        "config": {
+            key: str(value) if isinstance(value, Path) else value
+            for key, value in vars(args).items()
+        },
+        "platform": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
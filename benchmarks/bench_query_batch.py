@@ -0,0 +1,129 @@
+"""
+Benchmark of batched queries (`query_docs_batch`) against one call per question
+(`retrieve_docs` / `query_docs`): cost per question, for growing batch sizes.
+
+The fake embedding model costs `--embed-latency` per call plus `--embed-latency-per-text`
+per query, like a model whose fixed cost per forward pass is amortized over a batch. The fake
+LLM costs `--llm-latency` per call; batched answers are synthesized `--concurrency` at once.
+
+Usage:
+    python benchmarks/bench_query_batch.py --chunks 10000 --batch-sizes 1 8 32 128 \\
+        --embed-latency 0.02 --embed-latency-per-text 0.002 --llm-latency 0.2
+"""
+
+import argparse
+import json
+import platform
+import tempfile
+import time
+from pathlib import Path
+
+from corpus import generate_corpus, generate_queries
+from fakes import FakeEmbedding, FakeLLM
+from llama_index.core import Settings
+
+# Set before importing the server, which keeps already configured models
+Settings.embed_model = FakeEmbedding()
+Settings.llm = FakeLLM()
+
+from mcp_llamaindex.dir_rag_server import DirectoryRagServer, RagConfig
+
+
+def per_query_ms(fn, queries: list[str]) -> float:
+    start = time.perf_counter()
+    fn(queries)
+    return round((time.perf_counter() - start) / len(queries) * 1e3, 3)
+
+
+def bench_batch(
+    server: DirectoryRagServer, queries: list[str], synthesize: bool
+) -> dict:
+    if synthesize:
+        single = per_query_ms(lambda qs: [server.query_docs(q) for q in qs], queries)
+    else:
+        single = per_query_ms(lambda qs: [server.retrieve_docs(q) for q in qs], queries)
+    batched = per_query_ms(
+        lambda qs: server.query_docs_batch(qs, synthesize=synthesize), queries
+    )
+    return {
+        "synthesize": synthesize,
+        "batch_size": len(queries),
+        "single_ms_per_query": single,
+        "batched_ms_per_query": batched,
+        "speedup": round(single / batched, 2) if batched else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--chunks", type=int, default=10000, help="Corpus size.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument(
+        "--embed-latency", type=float, default=0.02, help="Seconds per embedding call."
+    )
+    parser.add_argument(
+        "--embed-latency-per-text",
+        type=float,
+        default=0.002,
+        help="Seconds per embedded text.",
+    )
+    parser.add_argument(
+        "--llm-latency", type=float, default=0.2, help="Seconds per LLM call."
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="Answers synthesized at once."
+    )
+    parser.add_argument(
+        "--no-synthesis",
+        action="store_true",
+        help="Only measure retrieval, without generating answers.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="JSON file to write results to.")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        generate_corpus(root / "md_documents", args.chunks, seed=args.seed)
+        server = DirectoryRagServer(
+            rag_config=RagConfig(
+                persist_dir=root / "vector_store",
+                data_dir=root / "md_documents",
+                top_k=args.top_k,
+                batch_synthesis_concurrency=args.concurrency,
+            )
+        )
+        _ = server.index
+        # Latencies only apply to queries, not to the index build
+        Settings.embed_model.latency_s = args.embed_latency
+        Settings.embed_model.latency_per_text_s = args.embed_latency_per_text
+        Settings.llm.latency_s = args.llm_latency
+
+        for synthesize in [False] if args.no_synthesis else [False, True]:
+            for batch_size in args.batch_sizes:
+                queries = generate_queries(batch_size, seed=args.seed + batch_size)
+                result = bench_batch(server, queries, synthesize)
+                print(json.dumps(result))
+                results.append(result)
+
+    report = {
+        "config": {
+            key: str(value) if isinstance(value, Path) else value
+            for key, value in vars(args).items()
+        },
+        "platform": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
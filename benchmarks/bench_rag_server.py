@@ -0,0 +1,173 @@
+"""
+Offline benchmark of DirectoryRagServer: indexing throughput and query latency.
+
+Runs on a synthetic Markdown corpus, with deterministic fake embedding and LLM
+backends, so that no model nor LLM server is needed. Backend latencies are configurable,
+to simulate a local model; with zero latency, only the server overhead is measured.
+
+Usage:
+    python benchmarks/bench_rag_server.py --chunks 1000 10000 100000 --output bench.json
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from corpus import generate_corpus, generate_queries
+from fakes import FakeEmbedding, FakeLLM
+from llama_index.core import Settings
+
+# Set before importing the server, which keeps already configured models
+Settings.embed_model = FakeEmbedding()
+Settings.llm = FakeLLM()
+
+from mcp_llamaindex.dir_rag_server import DirectoryRagServer, RagConfig
+
+
+def percentiles(latencies: list[float]) -> dict[str, float]:
+    latencies = sorted(latencies)
+    return {
+        f"p{q}_ms": round(
+            latencies[min(len(latencies) * q // 100, len(latencies) - 1)] * 1e3, 3
+        )
+        for q in (50, 99)
+    } | {"mean_ms": round(statistics.fmean(latencies) * 1e3, 3)}
+
+
+def time_calls(fn: Callable, args: list) -> list[float]:
+    latencies = []
+    for arg in args:
+        start = time.perf_counter()
+        fn(arg)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_size(root: Path, nb_chunks: int, args: argparse.Namespace) -> dict:
+    rag_config = RagConfig(
+        persist_dir=root / "vector_store",
+        data_dir=root / "md_documents",
+        docstore_backend=args.docstore_backend,
+        num_workers=args.num_workers,
+        top_k=args.top_k,
+    )
+    files = generate_corpus(rag_config.data_dir, nb_chunks, seed=args.seed)
+    extra_files = generate_corpus(
+        root / "extra", args.nb_updates * 10, seed=args.seed + 1, prefix="extra"
+    )
+
+    # Index creation
+    DirectoryRagServer._get_or_create_index.cache_clear()
+    DirectoryRagServer._instantiate_rag_query_engine.cache_clear()
+    server = DirectoryRagServer(rag_config=rag_config)
+    start = time.perf_counter()
+    index = server.index
+    build_s = time.perf_counter() - start
+    indexed_chunks = index.vector_store._collection.count()
+
+    # Incremental updates, one file per call
+    add_latencies = time_calls(server.add_markdown_file, extra_files)
+    delete_latencies = time_calls(
+        server.delete_markdown_files, [[path.name] for path in extra_files]
+    )
+
+    # Queries
+    queries = generate_queries(args.queries, seed=args.seed)
+    query_latencies = time_calls(server.query_docs, queries)
+    allowed_files = [path.name for path in files[:3]]
+    nodes_latencies = time_calls(
+        lambda query: server.query_and_get_nodes(query, allowed_files), queries
+    )
+
+    return {
+        "target_chunks": nb_chunks,
+        "files": len(files),
+        "chunks": indexed_chunks,
+        "index_build": {
+            "seconds": round(build_s, 3),
+            "docs_per_s": round(len(files) / build_s, 2),
+            "chunks_per_s": round(indexed_chunks / build_s, 2),
+        },
+        "add_markdown_file": {
+            "docs_per_s": round(len(add_latencies) / sum(add_latencies), 2),
+            **percentiles(add_latencies),
+        },
+        "delete_markdown_files": {
+            "docs_per_s": round(len(delete_latencies) / sum(delete_latencies), 2),
+            **percentiles(delete_latencies),
+        },
+        "query_docs": percentiles(query_latencies),
+        "query_and_get_nodes": percentiles(nodes_latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--chunks", type=int, nargs="+", default=[1000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--nb-updates", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument(
+        "--docstore-backend", choices=["json", "sqlite", "none"], default="json"
+    )
+    parser.add_argument("--num-workers", type=int, default=1)
+    parser.add_argument(
+        "--embed-latency", type=float, default=0.0, help="Seconds per embedding call."
+    )
+    parser.add_argument(
+        "--embed-latency-per-text",
+        type=float,
+        default=0.0,
+        help="Seconds per embedded text.",
+    )
+    parser.add_argument(
+        "--llm-latency", type=float, default=0.0, help="Seconds per LLM call."
+    )
+    parser.add_argument(
+        "--llm-latency-per-token",
+        type=float,
+        default=0.0,
+        help="Seconds per generated token.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="JSON file to write results to.")
+    args = parser.parse_args()
+
+    Settings.embed_model = FakeEmbedding(
+        latency_s=args.embed_latency, latency_per_text_s=args.embed_latency_per_text
+    )
+    Settings.llm = FakeLLM(
+        latency_s=args.llm_latency, latency_per_token_s=args.llm_latency_per_token
+    )
+
+    results = []
+    for nb_chunks in args.chunks:
+        with tempfile.TemporaryDirectory() as tmp:
+            result = bench_size(Path(tmp), nb_chunks, args)
+        print(json.dumps(result))
+        results.append(result)
+
+    report = {
+        "config": {
+            key: str(value) if isinstance(value, Path) else value
+            for key, value in vars(args).items()
+        },
+        "platform": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark of index snapshots: cold start of a new replica from a snapshot,
+against indexing the documents again.
+
+Embedding latency is simulated per text (a local model embeds ~100 chunks/s on CPU),
+as it is the cost a snapshot restore avoids.
+
+Usage:
+    python benchmarks/bench_snapshot.py --chunks 1000 10000 --output bench_snapshot.json
+"""
+
+import argparse
+import json
+import platform
+import tempfile
+import time
+from pathlib import Path
+
+from corpus import generate_corpus
+from fakes import FakeEmbedding, FakeLLM
+from llama_index.core import Settings
+
+# Set before importing the server, which keeps already configured models
+Settings.embed_model = FakeEmbedding()
+Settings.llm = FakeLLM()
+
+from mcp_llamaindex.dir_rag_server import DirectoryRagServer, RagConfig
+
+
+def dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def new_server(root: Path, name: str) -> DirectoryRagServer:
+    DirectoryRagServer._get_or_create_index.cache_clear()
+    DirectoryRagServer._instantiate_rag_query_engine.cache_clear()
+    return DirectoryRagServer(
+        rag_config=RagConfig(
+            persist_dir=root / name / "vector_store",
+            data_dir=root / "md_documents",
+        )
+    )
+
+
+def bench_size(root: Path, nb_chunks: int, args: argparse.Namespace) -> dict:
+    files = generate_corpus(root / "md_documents", nb_chunks, seed=args.seed)
+
+    server = new_server(root, "source")
+    start = time.perf_counter()
+    nb_nodes = server.index.vector_store._collection.count()
+    reindex_s = time.perf_counter() - start
+
+    snapshot_path = root / "snapshot.npz"
+    start = time.perf_counter()
+    server.export_snapshot(str(snapshot_path))
+    export_s = time.perf_counter() - start
+
+    replica = new_server(root, "replica")
+    start = time.perf_counter()
+    replica.import_snapshot(str(snapshot_path))
+    restored_nodes = replica.index.vector_store._collection.count()
+    restore_s = time.perf_counter() - start
+    assert restored_nodes == nb_nodes
+
+    return {
+        "target_chunks": nb_chunks,
+        "files": len(files),
+        "chunks": nb_nodes,
+        "reindex_s": round(reindex_s, 3),
+        "export_s": round(export_s, 3),
+        "restore_s": round(restore_s, 3),
+        "speedup": round(reindex_s / restore_s, 1),
+        "snapshot_mb": round(snapshot_path.stat().st_size / 2**20, 2),
+        "persist_dir_mb": round(dir_size(root / "source" / "vector_store") / 2**20, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--chunks", type=int, nargs="+", default=[1000])
+    parser.add_argument(
+        "--embed-latency-per-text",
+        type=float,
+        default=0.01,
+        help="Seconds per embedded text.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="JSON file to write results to.")
+    args = parser.parse_args()
+
+    Settings.embed_model = FakeEmbedding(latency_per_text_s=args.embed_latency_per_text)
+
+    results = []
+    for nb_chunks in args.chunks:
+        with tempfile.TemporaryDirectory() as tmp:
+            result = bench_size(Path(tmp), nb_chunks, args)
+        print(json.dumps(result))
+        results.append(result)
+
+    report = {
+        "config": {
+            key: str(value) if isinstance(value, Path) else value
+            for key, value in vars(args).items()
+        },
+        "platform": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
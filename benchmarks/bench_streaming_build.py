@@ -0,0 +1,139 @@
+"""
+Benchmark of the initial index build: peak memory and throughput of the streaming
+build by file batches, against loading the whole directory in one batch (as
+`VectorStoreIndex.from_documents` does).
+
+Each build runs in its own process, so that its peak RSS is measured alone.
+
+Usage:
+    python benchmarks/bench_streaming_build.py --chunks 10000 50000 --batch-sizes 16 64
+"""
+
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from corpus import generate_corpus
+from fakes import FakeEmbedding, FakeLLM
+from llama_index.core import Settings
+
+# Set before importing the server, which keeps already configured models
+Settings.embed_model = FakeEmbedding()
+Settings.llm = FakeLLM()
+
+from mcp_llamaindex.dir_rag_server import DirectoryRagServer, RagConfig
+
+# Batch size of a build loading the whole directory at once
+WHOLE_DIRECTORY = 10**9
+
+
+def build(data_dir: Path, persist_dir: Path, batch_size: int, docstore: str) -> dict:
+    """Builds the index in this process, and reports its time and peak memory."""
+    server = DirectoryRagServer(
+        rag_config=RagConfig(
+            persist_dir=persist_dir,
+            data_dir=data_dir,
+            docstore_backend=docstore,
+            build_batch_size=batch_size,
+            build_batch_bytes=WHOLE_DIRECTORY
+            if batch_size == WHOLE_DIRECTORY
+            else 8 * 2**20,
+        )
+    )
+    start = time.perf_counter()
+    nb_chunks = server.index.vector_store._collection.count()
+    build_s = time.perf_counter() - start
+    return {
+        "chunks": nb_chunks,
+        "build_s": round(build_s, 3),
+        "chunks_per_s": round(nb_chunks / build_s, 1),
+        # Kilobytes on Linux
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10, 1
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--chunks", type=int, nargs="+", default=[10000])
+    parser.add_argument(
+        "--batch-sizes",
+        type=int,
+        nargs="+",
+        default=[16, 64],
+        help="Files per batch of the streaming builds.",
+    )
+    parser.add_argument(
+        "--docstore-backend", choices=["json", "sqlite", "none"], default="sqlite"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="JSON file to write results to.")
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        data_dir, persist_dir, batch_size = args.child
+        result = build(
+            Path(data_dir), Path(persist_dir), int(batch_size), args.docstore_backend
+        )
+        print(json.dumps(result))
+        return
+
+    results = []
+    for nb_chunks in args.chunks:
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir = Path(tmp) / "md_documents"
+            files = generate_corpus(data_dir, nb_chunks, seed=args.seed)
+            for batch_size in [WHOLE_DIRECTORY] + args.batch_sizes:
+                persist_dir = Path(tmp) / f"vector_store_{batch_size}"
+                output = subprocess.run(
+                    [
+                        sys.executable,
+                        __file__,
+                        "--docstore-backend",
+                        args.docstore_backend,
+                        "--child",
+                        str(data_dir),
+                        str(persist_dir),
+                        str(batch_size),
+                    ],
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                ).stdout
+                result = {
+                    "target_chunks": nb_chunks,
+                    "files": len(files),
+                    "build": "whole directory"
+                    if batch_size == WHOLE_DIRECTORY
+                    else f"streaming, {batch_size} files per batch",
+                } | json.loads(output.strip().splitlines()[-1])
+                print(json.dumps(result))
+                results.append(result)
+
+    report = {
+        "config": {
+            key: str(value) if isinstance(value, Path) else value
+            for key, value in vars(args).items()
+        },
+        "platform": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
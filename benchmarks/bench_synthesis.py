@@ -0,0 +1,91 @@
+"""
+Benchmark query latency of each response synthesis mode, against a local stand-in
+of the LM Studio endpoint (see fake_lmstudio.py) with a fixed latency per LLM call.
+
+With a large enough top_k, the retrieved context overflows the LLM context window,
+and "compact" refines sequentially, when "async_tree_summarize" summarizes concurrently.
+
+Usage:
+    python benchmarks/bench_synthesis.py --top-k 12 --llm-latency 0.5 --queries 5
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from corpus import generate_corpus, generate_queries
+from fake_lmstudio import serve_in_thread
+from fakes import FakeEmbedding
+from llama_index.core import Settings
+
+MODES = ["compact", "refine", "tree_summarize", "async_tree_summarize"]
+
+
+def bench_mode(root: Path, mode: str, queries: list[str], args) -> dict:
+    from mcp_llamaindex.dir_rag_server import DirectoryRagServer, RagConfig
+    from mcp_llamaindex.utils.metrics import metrics
+
+    server = DirectoryRagServer(
+        rag_config=RagConfig(
+            persist_dir=root / "vector_store",
+            data_dir=root / "md_documents",
+            top_k=args.top_k,
+            response_mode=mode,
+            synthesis_concurrency=args.concurrency,
+        )
+    )
+    _ = server.index
+    metrics.reset()
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        server.query_docs(query)
+        latencies.append(time.perf_counter() - start)
+
+    llm_calls = sum(
+        histogram["count"]
+        for histogram in metrics.snapshot()["histograms"]
+        if histogram["labels"] == {"stage": "llm"}
+    )
+    latencies.sort()
+    return {
+        "mode": mode,
+        "llm_calls_per_query": llm_calls / len(queries),
+        "mean_s": round(sum(latencies) / len(latencies), 3),
+        "p50_s": round(latencies[len(latencies) // 2], 3),
+        "max_s": round(latencies[-1], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--top-k", type=int, default=12)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--llm-latency", type=float, default=0.5, help="Seconds per LLM call."
+    )
+    parser.add_argument("--queries", type=int, default=5)
+    parser.add_argument("--chunks", type=int, default=500, help="Corpus size.")
+    args = parser.parse_args()
+
+    llm_server, os.environ["LLM_BASE_URL"] = serve_in_thread(latency_s=args.llm_latency)
+    # Set before importing the server, which keeps already configured models
+    Settings.embed_model = FakeEmbedding()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        generate_corpus(root / "md_documents", args.chunks)
+        queries = generate_queries(args.queries)
+        for mode in args.modes:
+            print(json.dumps(bench_mode(root, mode, queries, args)))
+    llm_server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
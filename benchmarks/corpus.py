@@ -0,0 +1,151 @@
+"""
+Synthetic Markdown corpus generator, deterministic for a given seed.
+
+Each file covers one topic word, which queries can target.
+Sections are sized so that each one makes roughly one chunk with the default splitter.
+"""
+
+import random
+from pathlib import Path
+
+WORDS = [
+    "the",
+    "of",
+    "and",
+    "to",
+    "in",
+    "is",
+    "for",
+    "that",
+    "with",
+    "as",
+    "on",
+    "are",
+    "this",
+    "by",
+    "be",
+    "it",
+    "from",
+    "or",
+    "an",
+    "at",
+    "which",
+    "can",
+    "not",
+    "have",
+    "has",
+    "was",
+    "will",
+    "all",
+    "more",
+    "use",
+    "when",
+    "also",
+    "one",
+    "their",
+    "these",
+    "other",
+    "data",
+    "index",
+    "query",
+    "model",
+    "server",
+    "file",
+    "node",
+    "vector",
+    "store",
+    "chunk",
+    "embedding",
+    "search",
+    "document",
+    "retrieval",
+    "answer",
+    "context",
+    "token",
+    "batch",
+    "cache",
+    "memory",
+    "disk",
+    "latency",
+    "score",
+    "request",
+    "response",
+    "client",
+    "network",
+    "process",
+    "thread",
+    "queue",
+    "worker",
+    "config",
+    "setting",
+    "update",
+    "delete",
+    "insert",
+    "collection",
+    "metadata",
+    "filter",
+    "result",
+    "page",
+    "section",
+    "parser",
+]
+
+TOPICS = [
+    f"{prefix}{suffix}"
+    for prefix in ("alpha", "beta", "gamma", "delta", "omega", "sigma", "kappa", "zeta")
+    for suffix in ("lake", "forge", "spark", "stone", "wave", "grid", "leaf", "core")
+]
+
+WORDS_PER_SECTION = 600
+
+
+def section_text(rng: random.Random, topic: str) -> str:
+    sentences = []
+    nb_words = 0
+    while nb_words < WORDS_PER_SECTION:
+        sentence = rng.choices(WORDS, k=rng.randint(8, 20))
+        sentence.insert(rng.randrange(len(sentence)), topic)
+        sentences.append(" ".join(sentence).capitalize() + ".")
+        nb_words += len(sentence)
+    return " ".join(sentences)
+
+
+def write_file(path: Path, rng: random.Random, topic: str, nb_sections: int) -> None:
+    sections = [
+        f"## {topic.capitalize()} section {i}\n\n{section_text(rng, topic)}"
+        for i in range(nb_sections)
+    ]
+    path.write_text(f"# About {topic}\n\n" + "\n\n".join(sections), encoding="utf-8")
+
+
+def generate_corpus(
+    data_dir: str | Path,
+    nb_chunks: int,
+    chunks_per_file: int = 10,
+    seed: int = 0,
+    prefix: str = "doc",
+) -> list[Path]:
+    """
+    Writes about `nb_chunks` chunks of Markdown, spread in files of `chunks_per_file` sections.
+
+    Returns:
+        paths of the written files.
+    """
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    nb_files = max(1, nb_chunks // chunks_per_file)
+    paths = []
+    for i in range(nb_files):
+        path = data_dir / f"{prefix}_{i:06d}.md"
+        write_file(path, rng, TOPICS[i % len(TOPICS)], chunks_per_file)
+        paths.append(path)
+    return paths
+
+
+def generate_queries(nb_queries: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        f"What is {rng.choice(TOPICS)} used for with {rng.choice(WORDS[40:])}?"
+        for _ in range(nb_queries)
+    ]
@@ -0,0 +1,105 @@
+"""
+Local stand-in for the LM Studio endpoint (OpenAI compatible chat completions),
+answering deterministic completions after a configurable latency.
+
+Usage:
+    python benchmarks/fake_lmstudio.py --port 1234 --latency 0.5
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeLMStudioHandler(BaseHTTPRequestHandler):
+    # Set on the handler class by `make_server`
+    latency_s: float = 0.0
+    nb_output_tokens: int = 32
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json({"object": "list", "data": [{"id": "fake-llm"}]})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = "".join(m.get("content") or "" for m in payload.get("messages", []))
+        digest = hashlib.sha256(prompt.encode()).hexdigest()
+        time.sleep(self.latency_s)
+        answer = " ".join(
+            digest[i % 60 : i % 60 + 4] for i in range(self.nb_output_tokens)
+        )
+        self._send_json(
+            {
+                "id": f"chatcmpl-{digest[:12]}",
+                "object": "chat.completion",
+                "model": payload.get("model", "fake-llm"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": answer},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": len(prompt.split()),
+                    "completion_tokens": self.nb_output_tokens,
+                },
+            }
+        )
+
+    def _send_json(self, data: dict) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+
+def make_server(
+    port: int = 0, latency_s: float = 0.0, nb_output_tokens: int = 32
+) -> ThreadingHTTPServer:
+    """Builds the stand-in server, on a free port if `port` is 0."""
+    handler = type(
+        "Handler",
+        (FakeLMStudioHandler,),
+        {"latency_s": latency_s, "nb_output_tokens": nb_output_tokens},
+    )
+    return ThreadingHTTPServer(("127.0.0.1", port), handler)
+
+
+def serve_in_thread(
+    port: int = 0, latency_s: float = 0.0
+) -> tuple[ThreadingHTTPServer, str]:
+    """
+    Starts the stand-in server in a daemon thread.
+
+    Returns:
+        the server, to shut down when done, and its base URL (for `LLM_BASE_URL`).
+    """
+    server = make_server(port, latency_s)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=1234)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per call.")
+    args = parser.parse_args()
+    make_server(args.port, args.latency).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Deterministic fake embedding and LLM backends, with configurable latency.
+They let benchmarks run without network, model weights, nor LLM server.
+"""
+
+import hashlib
+import math
+import re
+import time
+import zlib
+from typing import Any
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.llms import (
+    CompletionResponse,
+    CompletionResponseGen,
+    CustomLLM,
+    LLMMetadata,
+)
+from llama_index.core.llms.callbacks import llm_completion_callback
+from pydantic import Field
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class FakeEmbedding(BaseEmbedding):
+    """
+    Hashed bag-of-words embedding: texts sharing words get close vectors,
+    so that retrieval results stay meaningful.
+    Each call sleeps `latency_s`, plus `latency_per_text_s` for each embedded text.
+    With `busy`, the latency is spent computing, like a model on CPU, so that
+    concurrent processes compete for cores.
+    """
+
+    embed_dim: int = Field(1024, gt=0)
+    latency_s: float = Field(0.0, ge=0)
+    latency_per_text_s: float = Field(0.0, ge=0)
+    busy: bool = False
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "FakeEmbedding"
+
+    def _vector(self, text: str) -> list[float]:
+        vector = [0.0] * self.embed_dim
+        for word in WORD_PATTERN.findall(text.lower()):
+            vector[zlib.crc32(word.encode()) % self.embed_dim] += 1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def _sleep(self, nb_texts: int) -> None:
+        delay = self.latency_s + self.latency_per_text_s * nb_texts
+        if delay and self.busy:
+            # CPU time of the process, shared with other processes on the same core
+            end = time.process_time() + delay
+            while time.process_time() < end:
+                pass
+        elif delay:
+            time.sleep(delay)
+
+    def _get_query_embedding(self, query: str) -> list[float]:
+        self._sleep(1)
+        return self._vector(query)
+
+    def _get_query_embeddings(self, queries: list[str]) -> list[list[float]]:
+        self._sleep(len(queries))
+        return [self._vector(query) for query in queries]
+
+    def _get_text_embedding(self, text: str) -> list[float]:
+        self._sleep(1)
+        return self._vector(text)
+
+    def _get_text_embeddings(self, texts: list[str]) -> list[list[float]]:
+        self._sleep(len(texts))
+        return [self._vector(text) for text in texts]
+
+    async def _aget_query_embedding(self, query: str) -> list[float]:
+        return self._get_query_embedding(query)
+
+    async def _aget_text_embedding(self, text: str) -> list[float]:
+        return self._get_text_embedding(text)
+
+
+class FakeLLM(CustomLLM):
+    """
+    LLM answering a deterministic digest of the prompt.
+    Each call sleeps `latency_s`, plus `latency_per_token_s` for each generated token,
+    and `latency_per_prompt_token_s` for each word of the prompt (prefill).
+    """
+
+    latency_s: float = Field(0.0, ge=0)
+    latency_per_token_s: float = Field(0.0, ge=0)
+    latency_per_prompt_token_s: float = Field(0.0, ge=0)
+    nb_output_tokens: int = Field(32, gt=0)
+    context_window: int = 4096
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "FakeLLM"
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(
+            context_window=self.context_window,
+            num_output=self.nb_output_tokens,
+            model_name="fake-llm",
+        )
+
+    def _answer(self, prompt: str) -> str:
+        digest = hashlib.sha256(prompt.encode()).hexdigest()
+        time.sleep(
+            self.latency_s
+            + self.latency_per_token_s * self.nb_output_tokens
+            + self.latency_per_prompt_token_s * len(prompt.split())
+        )
+        return " ".join(
+            digest[i % len(digest) : i % len(digest) + 4]
+            for i in range(self.nb_output_tokens)
+        )
+
+    @llm_completion_callback()
+    def complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponse:
+        return CompletionResponse(text=self._answer(prompt))
+
+    @llm_completion_callback()
+    def stream_complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponseGen:
+        answer = self._answer(prompt)
+        yield CompletionResponse(text=answer, delta=answer)
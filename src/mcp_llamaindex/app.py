@@ -66,7 +66,9 @@ def delete_files_handler(files_to_delete):
     return status_message, gr.update(choices=updated_choices, value=updated_choices)
 
 
-def crawl_website_handler(url: str, crawling_depth: int, css_selector: str):
+def crawl_website_handler(
+    url: str, crawling_depth: int, css_selector: str, use_sitemap: bool = False
+):
     """
     Handler to crawl a website and return the links.
     """
@@ -82,6 +84,7 @@ def crawl_website_handler(url: str, crawling_depth: int, css_selector: str):
         css_selector=css_selector,
         only_domain_links=True,
         only_subpath_links=False,
+        discovery="sitemap" if use_sitemap else "links",
     )
     gr.Info(
         f"Crawling the website at {url} with a maximum depth of {crawling_depth}..."
@@ -104,14 +107,10 @@ def download_pages_handler(pages_to_download, css_selector):
         gr.Warning("No pages selected for download.")
         return "No pages selected.", gr.update()
 
-    downloaded_count = 0
-    failed_urls = {}
-    for url in pages_to_download:
-        try:
-            rag_server.download_web_page(url=url, css_selector=css_selector)
-            downloaded_count += 1
-        except Exception as e:
-            failed_urls[url] = str(e)
+    failed_urls = rag_server.download_web_pages(
+        urls=pages_to_download, css_selector=css_selector
+    )
+    downloaded_count = len(pages_to_download) - len(failed_urls)
 
     gr.Info(
         f"Downloaded {downloaded_count} pages (out of {len(pages_to_download)}) as md files."
@@ -128,6 +127,40 @@ def download_pages_handler(pages_to_download, css_selector):
     return status_message, gr.update(choices=updated_choices, value=updated_choices)
 
 
+def crawl_and_ingest_handler(
+    url: str, crawling_depth: int, css_selector: str, use_sitemap: bool = False
+):
+    """
+    Handler to crawl a website and ingest every crawled page, fetching each page once.
+    """
+    if not url:
+        gr.Warning("Please enter a URL.")
+        return "No URL provided.", gr.update()
+
+    gr.Info(
+        f"Crawling and ingesting the website at {url} with a maximum depth of {crawling_depth}..."
+    )
+    report = rag_server.crawl_and_ingest(
+        url=url,
+        max_depth=crawling_depth,
+        css_selector=css_selector,
+        discovery="sitemap" if use_sitemap else "links",
+    )
+    gr.Info(
+        f"Ingested {len(report['ingested_urls'])} pages (out of {len(report['crawled_urls'])} crawled)."
+    )
+
+    updated_choices = rag_server.list_markdown_files()
+    fail_message = r"\n+".join(
+        ["Failed to ingest the following URLs:"]
+        + [f"{key}: {value}" for key, value in report["failed_urls"].items()]
+    )
+    status_message = (
+        fail_message if report["failed_urls"] else "Successfully ingested all pages."
+    )
+    return status_message, gr.update(choices=updated_choices, value=updated_choices)
+
+
 with gr.Blocks(theme=gr.themes.Ocean()) as demo:
     gr.Markdown("# RAG Pipeline Explorer")
 
@@ -176,7 +209,15 @@ with gr.Blocks(theme=gr.themes.Ocean()) as demo:
                     label="Filter HTML with CSS selector",
                     placeholder="Leave empty for no filter. Example selector : main",
                 )
-                crawl_button = gr.Button("Crawl Website")
+                use_sitemap_input = gr.Checkbox(
+                    label="Discover pages from sitemap.xml",
+                    info="Lists pages from the website sitemaps instead of following links. "
+                    "Pages unchanged since their last ingestion are skipped. "
+                    "Follows links if the website has no sitemap.",
+                )
+                with gr.Row():
+                    crawl_button = gr.Button("Crawl Website")
+                    crawl_and_ingest_button = gr.Button("Crawl and Ingest All Pages")
 
                 # Step 2 : Downloads relevant links
                 with gr.Group():
@@ -191,7 +232,12 @@ with gr.Blocks(theme=gr.themes.Ocean()) as demo:
 
                 crawl_button.click(
                     crawl_website_handler,
-                    inputs=[url_input, crawling_depth_input, css_selector_input],
+                    inputs=[
+                        url_input,
+                        crawling_depth_input,
+                        css_selector_input,
+                        use_sitemap_input,
+                    ],
                     outputs=[links_checklist],
                 )
 
@@ -201,6 +247,17 @@ with gr.Blocks(theme=gr.themes.Ocean()) as demo:
                     outputs=[download_status, resource_checklist],
                 )
 
+                crawl_and_ingest_button.click(
+                    crawl_and_ingest_handler,
+                    inputs=[
+                        url_input,
+                        crawling_depth_input,
+                        css_selector_input,
+                        use_sitemap_input,
+                    ],
+                    outputs=[download_status, resource_checklist],
+                )
+
         with gr.Column(scale=3):
             chatbot = gr.Chatbot(label="RAG Chatbot", type="messages")
             msg = gr.Textbox(label="Ask a question about your documents")
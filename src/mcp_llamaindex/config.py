@@ -24,6 +24,66 @@ class Settings(BaseSettings):
     summary_model: str = Field(
         description="The LLM model name for summarizing retrieved chunks"
     )
+    LLM_BASE_URL: str = Field(
+        "http://localhost:1234/v1",
+        description="Base URL of the LM Studio (OpenAI compatible) server.",
+    )
+    LLM_MAX_CONCURRENCY: int = Field(
+        2, ge=1, description="Maximum number of simultaneous requests to the LLM."
+    )
+    LLM_MAX_QUEUE_SIZE: int = Field(
+        32,
+        ge=0,
+        description="Maximum number of LLM requests waiting for a free slot. "
+        "Further requests are rejected.",
+    )
+
+    # Embedding model
+    EMBED_MODEL: str = Field(
+        "BAAI/bge-large-en-v1.5", description="HuggingFace embedding model name."
+    )
+    EMBED_BACKEND: Literal["torch", "onnx"] = Field(
+        "torch",
+        description="'onnx' runs the model with ONNX Runtime on CPU "
+        "(needs optimum[onnxruntime]).",
+    )
+    EMBED_PRECISION: Literal["fp32", "int8"] = Field(
+        "fp32", description="'int8' quantizes the model, with the onnx backend only."
+    )
+    EMBED_BATCH_SIZE: int = Field(
+        16, ge=1, description="Maximum number of texts encoded at once."
+    )
+    EMBED_MAX_BATCH_TOKENS: int = Field(
+        8192,
+        ge=1,
+        description="Maximum number of padded tokens encoded at once. "
+        "Texts are batched by similar lengths.",
+    )
+    EMBED_MAX_LENGTH: int | None = Field(
+        None, ge=1, description="Texts are truncated beyond, model default if None."
+    )
+    EMBED_NUM_THREADS: int | None = Field(
+        None, ge=1, description="Intra-op threads of torch or ONNX Runtime."
+    )
+    EMBEDDING_SERVER_URL: str | None = Field(
+        None,
+        description="Local embedding server shared by processes, e.g. "
+        "unix:///tmp/mcp_llamaindex_embed.sock. None to load the model in process.",
+    )
+
+    # Multi-process serving
+    SERVING_ROLE: Literal["standalone", "writer", "reader"] = Field(
+        "standalone",
+        description="'writer' owns ingestion and publishes read-only index generations, "
+        "'reader' serves queries from the last one. 'standalone' does both.",
+    )
+
+    # Metrics
+    METRICS_TEXTFILE: Path | None = Field(
+        None,
+        description="Prometheus textfile refreshed after each tool call, "
+        "for node_exporter textfile collector. None to disable.",
+    )
 
     # Paths - not from .env but defined here
     PACKAGE_ROOT: Path = Path(__file__).parent.resolve()
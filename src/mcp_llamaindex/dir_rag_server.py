@@ -1,17 +1,22 @@
-from functools import lru_cache
+import asyncio
+import contextvars
+import random
+from functools import lru_cache, partial, wraps
 from pathlib import Path
 import shutil
-from typing import Any
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Literal
 
 from fastmcp import FastMCP, Context
 from fastmcp.utilities.logging import get_logger
 from pydantic import Field, BaseModel
 
 import chromadb
+import numpy as np
 from fastmcp.tools import Tool as FastMCPTool
 from fastmcp.resources import Resource as FastMCPResource
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-from llama_index.llms.lmstudio import LMStudio
 from llama_index.core import (
     SimpleDirectoryReader,
     Settings,
@@ -19,39 +24,169 @@ from llama_index.core import (
     StorageContext,
     load_index_from_storage,
 )
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.core.query_engine import RetrieverQueryEngine
+from llama_index.core.schema import MetadataMode, NodeWithScore, QueryBundle
 from llama_index.core.retrievers import VectorIndexRetriever
-from llama_index.core.response_synthesizers import CompactAndRefine
+from llama_index.core.storage.docstore.keyval_docstore import KVDocumentStore
+from llama_index.core.storage.index_store.keyval_index_store import KVIndexStore
 from llama_index.core.vector_stores import (
     MetadataFilters,
     MetadataFilter,
     FilterCondition,
+    FilterOperator,
 )
 from llama_index.vector_stores.chroma import ChromaVectorStore
 
 from mcp_llamaindex.config import settings
 from mcp_llamaindex.servers.base import BaseServer
-from mcp_llamaindex.utils.crawler import url_to_filename
-from mcp_llamaindex.utils.downloader import PageDownloader
+from mcp_llamaindex.utils.adaptive_top_k import (
+    AdaptiveTopK,
+    AdaptiveTopKPostprocessor,
+    cut_nodes,
+)
+from mcp_llamaindex.utils.batch_query import embed_queries, search_batch
+from mcp_llamaindex.utils.chunk_diff import update_file_nodes
+from mcp_llamaindex.utils.context_packing import pack_context
+from mcp_llamaindex.utils.crawler import WebsiteCrawler, url_to_filename
+from mcp_llamaindex.utils.downloader import PageDownloader, html_to_markdown
+from mcp_llamaindex.utils.embedding_server import RemoteEmbedding
+from mcp_llamaindex.utils.embeddings import embed_model_name, make_embed_model
+from mcp_llamaindex.utils.file_routing import (
+    FILE_SUMMARY_COLLECTION,
+    FileRoutingRetriever,
+    FileSummaryIndex,
+    FileSummaryMode,
+)
+from mcp_llamaindex.utils.generations import (
+    GenerationPublisher,
+    GenerationReader,
+    GenerationStore,
+)
+from mcp_llamaindex.utils.index_build import (
+    BUILD_STATE_FILE,
+    IndexBuildState,
+    StreamingIndexBuilder,
+    markdown_files,
+)
+from mcp_llamaindex.utils.ingest_pipeline import CrawlIngestPipeline
+from mcp_llamaindex.utils.llm_gateway import LLMGateway, PooledLMStudio
+from mcp_llamaindex.utils.maintenance import (
+    CHROMA_COLLECTION,
+    collection_disk_stats,
+    compact_collection,
+    dir_size,
+    scan_collection,
+)
+from mcp_llamaindex.utils.metrics import (
+    MetricsCallbackHandler,
+    MetricsMiddleware,
+    metrics,
+)
+from mcp_llamaindex.utils.projection import (
+    PROJECTION_FILE,
+    EmbeddingProjection,
+    ProjectedEmbedding,
+    ProjectionMethod,
+    projected_model_name,
+)
+from mcp_llamaindex.utils.scheduler import DEFAULT_TOOL_LANES, ToolLane, ToolScheduler
+from mcp_llamaindex.utils.snapshot import (
+    export_collection,
+    import_collection,
+    read_arrays,
+    read_manifest,
+)
+from mcp_llamaindex.utils.sqlite_kvstore import SqliteKVStore
+from mcp_llamaindex.utils.synthesis import ResponseMode, get_response_synthesizer
+from mcp_llamaindex.utils.workers import map_in_processes, split_documents
 
 logger = get_logger(__name__)
 
+SQLITE_DOCSTORE_FILE = "docstore.sqlite3"
+# Maximum number of file names listed by index statistics
+MAX_LISTED_FILES = 50
+MIN_SAMPLING_TOKENS = 256
+# Tools changing the index, only served by writers, which publish a generation of their changes
+WRITE_TOOLS = {
+    "download_web_page",
+    "crawl_and_ingest",
+    "add_markdown_file",
+    "update_markdown_file",
+    "delete_markdown_files",
+    "import_snapshot",
+    "compact_index",
+}
+
+# Models set before importing this module are kept (e.g. offline fake backends of benchmarks)
 # Optional: Configure local LLM (e.g., Llama 3 via Ollama)
-Settings.llm = LMStudio(
-    model_name=settings.summary_model,
-    base_url="http://localhost:1234/v1",
-    request_timeout=120.0,  # Increased timeout for potentially longer generations
-    context_window=4096,  # Important for memory management with local LLMs
-)
+# Requests are queued by a gateway, so that concurrent queries don't overload the LLM server
+if Settings._llm is None:
+    Settings.llm = PooledLMStudio(
+        model_name=settings.summary_model,
+        base_url=settings.LLM_BASE_URL,
+        request_timeout=120.0,  # Increased timeout for potentially longer generations
+        context_window=4096,  # Important for memory management with local LLMs
+        gateway=LLMGateway(
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+            max_queue_size=settings.LLM_MAX_QUEUE_SIZE,
+        ),
+    )
 
 # Configure local embedding model (e.g., BGE Large)
-Settings.embed_model = HuggingFaceEmbedding(
-    model_name="BAAI/bge-large-en-v1.5",
-)
+# With an embedding server, processes share its model instead of each loading a copy
+if Settings._embed_model is None:
+    if settings.EMBEDDING_SERVER_URL:
+        Settings.embed_model = RemoteEmbedding(
+            model_name=embed_model_name(settings.EMBED_MODEL, settings.EMBED_PRECISION),
+            url=settings.EMBEDDING_SERVER_URL,
+        )
+    else:
+        Settings.embed_model = make_embed_model(
+            settings.EMBED_MODEL,
+            backend=settings.EMBED_BACKEND,
+            precision=settings.EMBED_PRECISION,
+            batch_size=settings.EMBED_BATCH_SIZE,
+            max_batch_tokens=settings.EMBED_MAX_BATCH_TOKENS,
+            max_length=settings.EMBED_MAX_LENGTH,
+            num_threads=settings.EMBED_NUM_THREADS,
+        )
 
 # The same embedding model must be used for both indexing and querying
 logger.debug("LLM and embedding model configured.")
 
+# Time pipeline stages and count tokens, the callback manager is shared by LLM and embedding model
+Settings.callback_manager.add_handler(MetricsCallbackHandler())
+
+# Held while the cached index, collections and models are built or replaced: tools run
+# concurrently, and Chroma fails to open a store from several threads at once
+_RESOURCES_LOCK = threading.RLock()
+
+
+def _locked_cache(fn: Callable) -> Callable:
+    """
+    `lru_cache(maxsize=1)` of a method, called under `_RESOURCES_LOCK`, so that concurrent
+    first calls build its result once. Cached methods call each other, the lock is reentrant.
+    """
+    cached = lru_cache(maxsize=1)(fn)
+
+    @wraps(fn)
+    def locked(*args: Any, **kwargs: Any) -> Any:
+        with _RESOURCES_LOCK:
+            return cached(*args, **kwargs)
+
+    locked.cache_clear = cached.cache_clear
+    return locked
+
+
+class TimedChromaVectorStore(ChromaVectorStore):
+    """Chroma vector store, timing upserts in metrics."""
+
+    def add(self, nodes: list, **add_kwargs: Any) -> list[str]:
+        with metrics.timer("stage_seconds", stage="upsert"):
+            return super().add(nodes, **add_kwargs)
+
 
 class RagConfig(BaseModel):
     """Configuration for RAG."""
@@ -60,8 +195,85 @@ class RagConfig(BaseModel):
     persist_dir: str | Path = settings.STATIC_DIR / "vector_store"
     data_dir: str | Path = settings.STATIC_DIR / "md_documents"
 
+    # docstore and index store, next to the vector store
+    # "json": LlamaIndex default JSON files, fully re-written on each persist
+    # "sqlite": SQLite database, written incrementally
+    # "none": no docstore, the index is rebuilt from Chroma (which holds node text)
+    docstore_backend: Literal["json", "sqlite", "none"] = "json"
+
+    # ingestion
+    # Number of worker processes for directory loading, chunking and HTML conversion.
+    # 1 runs everything in the server process.
+    num_workers: int = Field(1, ge=1)
+    # Number of web pages fetched at once. Fetching waits on the network, unlike `num_workers`
+    fetch_concurrency: int = Field(8, ge=1)
+    # Seconds to connect to a web server, and to wait for each read, when fetching pages
+    fetch_timeout: float = Field(30.0, gt=0)
+
+    # Initial index build: files are loaded, embedded and upserted by batches of at most
+    # `build_batch_size` files and `build_batch_bytes` bytes, which bounds memory use.
+    # An interrupted build resumes from the last batch done.
+    build_batch_size: int = Field(64, ge=1)
+    build_batch_bytes: int = Field(8 * 2**20, ge=1)
+
+    # embeddings storage
+    # Dimension of stored and searched embeddings, None for the full model dimension.
+    # Embeddings are projected by PCA, fitted on `projection_sample_size` document chunks
+    # when the index is created, or truncated (for Matryoshka models).
+    embed_dim: int | None = Field(None, gt=0)
+    embed_projection: ProjectionMethod = "pca"
+    projection_sample_size: int = Field(2048, gt=0)
+
+    # vector search, Chroma HNSW index parameters (Chroma defaults if None)
+    # Set when the collection is created, except `hnsw_ef_search`, which applies to an
+    # existing collection too. `compact_index` rebuilds a collection with the others.
+    # See `python -m mcp_llamaindex.utils.hnsw_tuning` to pick them for a corpus.
+    hnsw_space: Literal["l2", "cosine", "ip"] | None = None
+    # Number of neighbors of each node in the graph ("M")
+    hnsw_max_neighbors: int | None = Field(None, gt=0)
+    hnsw_ef_construction: int | None = Field(None, gt=0)
+    hnsw_ef_search: int | None = Field(None, gt=0)
+
     # retrieval
     top_k: int = 3
+    # Adaptive number of chunks sent to the LLM, instead of `top_k`: `max_k` chunks are
+    # fetched, then cut at a score threshold or at the largest score gap, keeping `min_k`.
+    adaptive_top_k: AdaptiveTopK | None = None
+    # Two-stage retrieval, for large corpora: with `route_top_files` set, queries first select
+    # the files whose summary embedding is the closest, then search the chunks of these
+    # files only. Summaries are extracted from file headings on ingestion, and rewritten
+    # by the LLM in the background with "llm" mode. Readers search all chunks.
+    route_top_files: int | None = Field(None, gt=0)
+    file_summary_mode: FileSummaryMode = "extractive"
+    file_summary_chars: int = Field(1000, gt=0)
+
+    # response synthesis
+    # "compact" and "refine" call the LLM sequentially once the context overflows its window.
+    # "async_tree_summarize" summarizes context parts concurrently, then merges the summaries.
+    response_mode: ResponseMode = "compact"
+    # Maximum number of simultaneous LLM calls, for "async_tree_summarize"
+    synthesis_concurrency: int = Field(4, ge=1)
+    # Maximum number of answers synthesized at once by `query_docs_batch`
+    batch_synthesis_concurrency: int = Field(4, ge=1)
+
+    # client LLM sampling
+    # Maximum number of tokens of retrieved context sent to the client LLM
+    sampling_context_tokens: int = Field(3000, gt=0)
+    # Maximum number of tokens of the client LLM answer
+    sampling_max_tokens: int = Field(1024, gt=0)
+
+    # multi-process serving
+    # "standalone": one process ingests and queries the index in `persist_dir`
+    # "writer": owns ingestion, and publishes read-only generations of the index once changed
+    # "reader": serves queries from the last published generation, hot-swapped, without write tools
+    serving_role: Literal["standalone", "writer", "reader"] = settings.SERVING_ROLE
+    # Directory of published generations, `persist_dir`/generations if None
+    generations_dir: str | Path | None = None
+    # Seconds between checks for a new generation, by readers
+    generation_poll_interval: float = Field(2.0, gt=0)
+    # Minimum seconds between two generations published by writers, changes meanwhile are
+    # published together
+    generation_publish_interval: float = Field(10.0, ge=0)
 
 
 class DirectoryRagServer(BaseServer):
@@ -83,27 +295,92 @@ You can ask questions about your documents, and the server will retrieve relevan
     # RAG pipeline
     rag_config: RagConfig = Field(default_factory=RagConfig)
 
-    @property
-    def documents(self) -> list:
-        return self._load_documents(self.rag_config.data_dir)
+    # Admission control of tool calls: concurrency, queue size and timeout by lane of tools
+    tool_lanes: dict[str, ToolLane] = Field(
+        default_factory=lambda: dict(DEFAULT_TOOL_LANES)
+    )
 
     @property
     def index(self) -> VectorStoreIndex:
+        if self.rag_config.serving_role == "reader":
+            return self._get_generation_reader().index
         return self._get_or_create_index()
 
+    @property
+    def embed_model(self) -> BaseEmbedding:
+        return self._get_embed_model()
+
+    @property
+    def embed_model_name(self) -> str:
+        """Name of the stored embeddings, with their projection if any."""
+        if self.rag_config.embed_dim is None:
+            return Settings.embed_model.model_name
+        return projected_model_name(
+            Settings.embed_model.model_name,
+            self.rag_config.embed_projection,
+            self.rag_config.embed_dim,
+        )
+
+    @property
+    def file_summaries(self) -> FileSummaryIndex | None:
+        """Summaries of the indexed files, to route queries, if enabled."""
+        if (
+            self.rag_config.route_top_files is None
+            or self.rag_config.serving_role == "reader"
+        ):
+            return None
+        return self._get_file_summaries()
+
+    @property
+    def generation_store(self) -> GenerationStore:
+        return GenerationStore(
+            self.rag_config.generations_dir
+            or Path(self.rag_config.persist_dir) / "generations"
+        )
+
     @property
     def rag_query_engine(self) -> RetrieverQueryEngine:
-        return self._instantiate_rag_query_engine(self.index, self.rag_config.top_k)
+        return self._instantiate_rag_query_engine(
+            self.index,
+            self.rag_config.top_k,
+            self.rag_config.response_mode,
+            self.rag_config.synthesis_concurrency,
+            self.file_summaries,
+            self.rag_config.route_top_files,
+            self.rag_config.adaptive_top_k,
+        )
 
     def get_tools(self) -> list[FastMCPTool]:
-        """Get the tools for the server."""
-        return [
-            FastMCPTool.from_function(fn=self.query_docs),
-            FastMCPTool.from_function(fn=self.download_web_page),
-            FastMCPTool.from_function(fn=self.add_markdown_file),
-            FastMCPTool.from_function(fn=self.delete_markdown_files),
-            FastMCPTool.from_function(fn=self.get_indexed_files),
+        """
+        Get the tools for the server.
+        Tools run in worker threads, admitted by `tool_lanes`, so that the server stays responsive.
+        Readers don't serve write tools, writers publish generations of their writes.
+        """
+        scheduler = ToolScheduler(self.tool_lanes)
+        tools = [
+            self.query_docs,
+            self.query_docs_batch,
+            self.query_docs_with_client_llm_sampling,
+            self.retrieve_docs,
+            self.download_web_page,
+            self.crawl_and_ingest,
+            self.add_markdown_file,
+            self.update_markdown_file,
+            self.delete_markdown_files,
+            self.get_indexed_files,
+            self.export_snapshot,
+            self.import_snapshot,
+            self.get_index_stats,
+            self.compact_index,
         ]
+        if self.rag_config.serving_role == "reader":
+            tools = [fn for fn in tools if fn.__name__ not in WRITE_TOOLS]
+        elif self.rag_config.serving_role == "writer":
+            tools = [
+                self._publishing(fn) if fn.__name__ in WRITE_TOOLS else fn
+                for fn in tools
+            ]
+        return [FastMCPTool.from_function(fn=scheduler.wrap(fn)) for fn in tools]
 
     def get_resources(self) -> list[FastMCPResource]:
         """Get the resources for the server."""
@@ -111,6 +388,8 @@ You can ask questions about your documents, and the server will retrieve relevan
             FastMCPResource.from_function(
                 fn=self.list_markdown_files, uri="data://list-markdown-files"
             ),
+            FastMCPResource.from_function(fn=self.get_metrics, uri="metrics://server"),
+            FastMCPResource.from_function(fn=self.get_index_stats, uri="index://stats"),
         ]
 
     def as_server(self) -> FastMCP:
@@ -121,6 +400,10 @@ You can ask questions about your documents, and the server will retrieve relevan
             dependencies=self.server_dependencies,
         )
 
+        mcp.add_middleware(MetricsMiddleware(textfile=settings.METRICS_TEXTFILE))
+        if self.rag_config.serving_role == "writer":
+            # Readers start from the index as it is at writer startup
+            self.publish_generation()
         [mcp.add_tool(tool=tool) for tool in self.get_tools()]
         [mcp.add_resource(resource=resource) for resource in self.get_resources()]
         return mcp
@@ -143,6 +426,190 @@ You can ask questions about your documents, and the server will retrieve relevan
         response = self.rag_query_engine.query(query)
         return str(response)
 
+    def query_docs_batch(
+        self, queries: list[str], top_k: int | None = None, synthesize: bool = True
+    ) -> list[dict[str, Any]]:
+        """
+        Answers many questions at once over the local Markdown documentation. Much cheaper than
+        calling `query_docs` for each of them: questions are embedded together, and searched
+        in a single request. Answers are generated concurrently.
+
+        Args:
+            queries (list[str]): The questions to ask about the Markdown documents.
+            top_k (int | None): Number of chunks retrieved per question. Server default if None,
+                                adaptive to each question if so configured.
+            synthesize (bool): Whether to generate answers. If False, only the chunks
+                               retrieved for each question are returned.
+
+        Returns:
+            list[dict]: For each question, in the same order: the question, the generated answer
+                        (None if `synthesize` is False), and the retrieved chunks, by decreasing
+                        score, with their text, score and file name.
+        """
+        if not queries:
+            return []
+        adaptive_top_k = None if top_k else self.rag_config.adaptive_top_k
+        top_k = top_k or (
+            adaptive_top_k.max_k if adaptive_top_k else self.rag_config.top_k
+        )
+        index = self.index
+        embeddings = embed_queries(index._embed_model, queries)
+        file_summaries = self.file_summaries
+        if file_summaries is None:
+            with metrics.timer("stage_seconds", stage="retrieve"):
+                results = search_batch(
+                    index.vector_store._collection, embeddings, top_k
+                )
+        else:
+            # Routing searches the chunks of different files for each question
+            retriever = self._make_retriever(
+                index,
+                top_k,
+                file_summaries=file_summaries,
+                route_top_files=self.rag_config.route_top_files,
+            )
+            results = [
+                retriever.retrieve(QueryBundle(query, embedding=embedding))
+                for query, embedding in zip(queries, embeddings)
+            ]
+        if adaptive_top_k:
+            results = [cut_nodes(nodes, adaptive_top_k) for nodes in results]
+
+        answers: list[str | None] = [None] * len(queries)
+        if synthesize:
+            query_engine = self.rag_query_engine
+
+            def synthesize_answer(query: str, nodes: list[NodeWithScore]) -> str:
+                return str(query_engine.synthesize(QueryBundle(query), nodes))
+
+            with ThreadPoolExecutor(
+                max_workers=min(
+                    self.rag_config.batch_synthesis_concurrency, len(queries)
+                )
+            ) as executor:
+                # Each task runs in a copy of the context, to keep the LLM request options
+                futures = [
+                    executor.submit(
+                        contextvars.copy_context().run, synthesize_answer, query, nodes
+                    )
+                    for query, nodes in zip(queries, results)
+                ]
+                answers = [future.result() for future in futures]
+
+        return [
+            {
+                "query": query,
+                "answer": answer,
+                "chunks": [
+                    self._chunk_dict(
+                        node_with_score, node_with_score.node.get_content()
+                    )
+                    for node_with_score in nodes
+                ],
+            }
+            for query, answer, nodes in zip(queries, answers, results)
+        ]
+
+    def retrieve_docs(
+        self,
+        query: str,
+        top_k: int | None = None,
+        min_score: float | None = None,
+        files: list[str] | None = None,
+        metadata: dict[str, str | int | float] | None = None,
+        max_chars: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Retrieves the chunks of the local Markdown documentation most relevant to a query,
+        WITHOUT generating an answer. Much faster than `query_docs`, to use when you
+        synthesize the answer yourself. With file routing enabled, and no `files` nor
+        `metadata`, chunks are searched in the files whose summary best matches the query.
+
+        Args:
+            query (str): The search query.
+            top_k (int | None): Maximum number of chunks to retrieve. Server default if None.
+            min_score (float | None): Chunks with a lower similarity score are dropped.
+            files (list[str] | None): File names to search in. All files if None or empty.
+            metadata (dict | None): Metadata values the chunks must match, e.g. {"file_type": "text/markdown"}.
+            max_chars (int | None): Maximum number of characters of returned text, in total.
+                                    The last chunk is truncated to fit.
+
+        Returns:
+            list[dict]: Chunks by decreasing score, with their text, score and file name.
+        """
+        retriever = self._make_retriever(
+            self.index,
+            top_k or self.rag_config.top_k,
+            self._build_metadata_filters(files, metadata),
+            self.file_summaries,
+            self.rag_config.route_top_files,
+        )
+        chunks = []
+        remaining_chars = max_chars
+        for node_with_score in retriever.retrieve(query):
+            score = node_with_score.score
+            if min_score is not None and (score is None or score < min_score):
+                continue
+            text = node_with_score.node.get_content()
+            if remaining_chars is not None:
+                if remaining_chars <= 0:
+                    break
+                text = text[:remaining_chars]
+                remaining_chars -= len(text)
+            chunks.append(self._chunk_dict(node_with_score, text))
+        return chunks
+
+    @staticmethod
+    def _chunk_dict(node_with_score: NodeWithScore, text: str) -> dict[str, Any]:
+        """Retrieved chunk, as returned by tools."""
+        score = node_with_score.score
+        return {
+            "text": text,
+            "score": round(score, 4) if score is not None else None,
+            "file_name": node_with_score.node.metadata.get("file_name"),
+        }
+
+    @staticmethod
+    def _make_retriever(
+        index: VectorStoreIndex,
+        top_k: int,
+        filters: MetadataFilters | None = None,
+        file_summaries: FileSummaryIndex | None = None,
+        route_top_files: int | None = None,
+    ) -> BaseRetriever:
+        """Chunks retriever, routing queries through file summaries if given."""
+        if file_summaries is None or route_top_files is None:
+            return VectorIndexRetriever(
+                index=index, similarity_top_k=top_k, filters=filters
+            )
+        return FileRoutingRetriever(
+            index=index,
+            file_summaries=file_summaries,
+            top_files=route_top_files,
+            similarity_top_k=top_k,
+            filters=filters,
+        )
+
+    @staticmethod
+    def _build_metadata_filters(
+        files: list[str] | None = None,
+        metadata: dict[str, str | int | float] | None = None,
+    ) -> MetadataFilters | None:
+        """
+        Builds retrieval filters: file name in `files`, and metadata equal to `metadata` values.
+        """
+        filters = [
+            MetadataFilter(key=key, value=value)
+            for key, value in (metadata or {}).items()
+        ]
+        if files:
+            filters.append(
+                MetadataFilter(key="file_name", value=files, operator=FilterOperator.IN)
+            )
+        if not filters:
+            return None
+        return MetadataFilters(filters=filters, condition=FilterCondition.AND)
+
     async def query_docs_with_client_llm_sampling(
         self, query: str, ctx: Context
     ) -> str:
@@ -152,6 +619,7 @@ You can ask questions about your documents, and the server will retrieve relevan
         question related to the documents.
 
         SUMMARIZING IS DONE THROUGH LLM SAMPLING, NOT BY THE SERVER ITSELF.
+        Retrieved chunks are merged and trimmed to `rag_config.sampling_context_tokens`.
 
         Args:
             query (str): The question to ask about the Markdown documents.
@@ -163,7 +631,11 @@ You can ask questions about your documents, and the server will retrieve relevan
         if self.rag_query_engine is None:
             return "Error: RAG pipeline not initialized. Please ensure Markdown files are present, Ollama is running, and the server started correctly."
 
-        retrieved_docs = self.rag_query_engine.retrieve(query)
+        # Retrieval blocks, sampling needs the event loop of the client session
+        retrieved_nodes = await asyncio.to_thread(self.rag_query_engine.retrieve, query)
+        chunks = pack_context(
+            retrieved_nodes, token_budget=self.rag_config.sampling_context_tokens
+        )
         question_prompt = f"Query: {query}"
         system_prompt = (
             "You're an assistant that summarizes documents to answer a user query."
@@ -171,12 +643,18 @@ You can ask questions about your documents, and the server will retrieve relevan
         prompt = "\n\n___\n\n".join(
             [question_prompt]
             + [
-                f"Document {i}:\n" + node.get_content()
-                for i, node in enumerate(retrieved_docs)
+                f"Document {i} ({chunk.file_name}):\n" + chunk.text
+                for i, chunk in enumerate(chunks)
             ]
         )
+        # A summary of the context needs at most about half of its tokens
+        context_tokens = sum(chunk.nb_tokens for chunk in chunks)
+        max_tokens = min(
+            self.rag_config.sampling_max_tokens,
+            max(MIN_SAMPLING_TOKENS, context_tokens // 2),
+        )
         response = await ctx.sample(
-            prompt, system_prompt=system_prompt, max_tokens=10000
+            prompt, system_prompt=system_prompt, max_tokens=max_tokens
         )
         return response.text
 
@@ -244,6 +722,202 @@ You can ask questions about your documents, and the server will retrieve relevan
         # Filter out None values in case some documents don't have a file_name
         return sorted([fp for fp in file_paths if fp])
 
+    def export_snapshot(self, snapshot_path: str) -> dict[str, Any]:
+        """
+        Exports the index (text, metadata and embedding of every chunk) into a portable
+        snapshot file, to bring up a new replica without re-embedding the documents.
+        Markdown source files are not included.
+
+        Args:
+            snapshot_path (str): Path of the snapshot file to write (.npz).
+
+        Returns:
+            dict: The snapshot manifest (chunk count, embedding model, checksums).
+        """
+        return export_collection(
+            self.index.vector_store._collection,
+            snapshot_path,
+            manifest_extra={"embed_model": self.embed_model_name},
+            extra_arrays=self._projection_arrays(),
+        )
+
+    def import_snapshot(self, snapshot_path: str) -> dict[str, Any]:
+        """
+        Loads a snapshot written by `export_snapshot` into an empty index.
+        Much faster than indexing the documents again, as embeddings are not computed.
+
+        Args:
+            snapshot_path (str): Path of the snapshot file to load.
+
+        Returns:
+            dict: The snapshot manifest.
+        """
+        chroma_collection = self._get_chroma_collection()
+        if chroma_collection.count() > 0:
+            raise ValueError(
+                "Vector store is not empty. Snapshots can only be imported in a fresh store."
+            )
+        embed_model = read_manifest(snapshot_path).get("embed_model")
+        if embed_model != self.embed_model_name:
+            raise ValueError(
+                f"Snapshot embedded with '{embed_model}', "
+                f"but the configured model is '{self.embed_model_name}'."
+            )
+
+        manifest = import_collection(chroma_collection, snapshot_path)
+        if self.file_summaries is not None:
+            # Summaries hold the chunk ids of the previous index, files are summarized again
+            self.file_summaries.delete(sorted(self.file_summaries.file_names()))
+        projection_arrays = read_arrays(snapshot_path, prefix="projection_")
+        if projection_arrays:
+            EmbeddingProjection.from_arrays(projection_arrays).save(
+                Path(self.rag_config.persist_dir) / PROJECTION_FILE
+            )
+        # The index is rebuilt from the loaded vector store on next access
+        with _RESOURCES_LOCK:
+            self._get_embed_model.cache_clear()
+            self._get_file_summaries.cache_clear()
+            self._get_or_create_index.cache_clear()
+        return manifest
+
+    def publish_generation(self) -> int:
+        """
+        Publishes the current index as a new read-only generation, for reader processes.
+
+        Returns:
+            int: The generation number.
+        """
+        return self.generation_store.publish(
+            self.index.vector_store._collection,
+            manifest_extra={"embed_model": self.embed_model_name},
+            extra_arrays=self._projection_arrays(),
+        )
+
+    def _projection_arrays(self) -> dict[str, Any] | None:
+        """Projection of the stored embeddings, shipped with snapshots."""
+        if isinstance(self.embed_model, ProjectedEmbedding):
+            return self.embed_model.projection.to_arrays()
+        return None
+
+    def _index_version(self) -> tuple[str, int]:
+        """Changes when chunks are added or deleted, or the collection is replaced."""
+        collection = self.index.vector_store._collection
+        return str(collection.id), collection.count()
+
+    @_locked_cache
+    def _get_generation_publisher(self) -> GenerationPublisher:
+        return GenerationPublisher(
+            self.publish_generation,
+            min_interval=self.rag_config.generation_publish_interval,
+        )
+
+    def _publishing(self, fn: Callable) -> Callable:
+        """
+        Tool function scheduling the publication of its changes, also if it failed midway.
+        Publications are coalesced by `_get_generation_publisher`.
+        """
+
+        @wraps(fn)
+        def publishing(*args: Any, **kwargs: Any) -> Any:
+            version = self._index_version()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                if self._index_version() != version:
+                    self._get_generation_publisher().mark_dirty()
+                raise
+            self._get_generation_publisher().mark_dirty()
+            return result
+
+        return publishing
+
+    def get_index_stats(self) -> dict[str, Any]:
+        """
+        Statistics of the index: numbers of chunks and indexed files, files on disk but not
+        indexed (and indexed but not on disk), orphaned docstore entries, and disk usage,
+        with the HNSW elements left by deleted chunks (reclaimed by `compact_index`).
+        """
+        collection = self.index.vector_store._collection
+        indexed_files, ref_doc_ids = scan_collection(collection)
+        data_dir = Path(self.rag_config.data_dir)
+        disk_files = (
+            {path.name for path in markdown_files(data_dir)}
+            if data_dir.exists()
+            else set()
+        )
+        persist_dir = Path(self.rag_config.persist_dir)
+        nb_chunks = collection.count()
+        stats = {
+            "chunks": nb_chunks,
+            "indexed_files": len(indexed_files),
+            "files_not_indexed": sorted(disk_files - indexed_files)[:MAX_LISTED_FILES],
+            "nb_files_not_indexed": len(disk_files - indexed_files),
+            "indexed_files_not_on_disk": sorted(indexed_files - disk_files)[
+                :MAX_LISTED_FILES
+            ],
+            "nb_indexed_files_not_on_disk": len(indexed_files - disk_files),
+            "orphan_docstore_entries": len(self._orphan_docstore_entries(ref_doc_ids)),
+            "persist_dir_bytes": dir_size(persist_dir),
+        } | collection_disk_stats(persist_dir, collection)
+        if stats["hnsw_elements"]:
+            stats["hnsw_deleted_ratio"] = round(
+                max(stats["hnsw_elements"] - nb_chunks, 0) / stats["hnsw_elements"], 4
+            )
+        if self.file_summaries is not None:
+            stats["summarized_files"] = self.file_summaries.collection.count()
+        return stats
+
+    def compact_index(self) -> dict[str, Any]:
+        """
+        Compacts the index: rebuilds the vector store with its live chunks only, to reclaim
+        the disk space and search speed lost to deleted chunks, and removes orphaned
+        docstore entries. The configured HNSW parameters apply to the rebuilt index.
+        Queries are served by the current index until the compacted one is swapped in, and
+        queries still running on it can finish: its collection is only dropped by the
+        following compaction.
+
+        Returns:
+            index statistics before and after the compaction.
+        """
+        before = self.get_index_stats()
+        _, ref_doc_ids = scan_collection(self.index.vector_store._collection)
+        for doc_id in self._orphan_docstore_entries(ref_doc_ids):
+            self.index.docstore.delete_document(doc_id, raise_error=False)
+        persist_dir = Path(self.rag_config.persist_dir)
+        if self.rag_config.docstore_backend == "json":
+            self.index.storage_context.persist(persist_dir=persist_dir)
+
+        def swap(_compacted) -> None:
+            # The index is rebuilt on the compacted collection, now named `CHROMA_COLLECTION`.
+            # Calls starting meanwhile wait for it, instead of building their own.
+            with _RESOURCES_LOCK:
+                self._get_file_summaries.cache_clear()
+                self._get_or_create_index.cache_clear()
+                _ = self.index
+
+        compact_collection(
+            persist_dir, CHROMA_COLLECTION, swap=swap, hnsw=self._hnsw_configuration()
+        )
+        return {"before": before, "after": self.get_index_stats()}
+
+    def _orphan_docstore_entries(self, ref_doc_ids: set[str]) -> list[str]:
+        """Ids of docstore documents without any chunk left in the vector store."""
+        if self.rag_config.docstore_backend == "none":
+            return []
+        docstore = self.index.docstore
+        # Every document hash entry: `get_all_document_hashes` keeps one id per hash
+        doc_ids = docstore._kvstore.get_all(collection=docstore._metadata_collection)
+        return [doc_id for doc_id in doc_ids if doc_id not in ref_doc_ids]
+
+    def get_metrics(self) -> dict[str, list[dict[str, Any]]]:
+        """
+        Latency percentiles (p50/p95/p99) of tool calls and pipeline stages
+        (chunk, embed, route, retrieve, synthesize, llm, fetch, convert, upsert), tool call
+        and error counters, LLM and embedding token counts, and with adaptive top_k, the number
+        of chunks sent to the LLM per query, and the chunks and tokens spared.
+        """
+        return metrics.snapshot()
+
     def list_markdown_files(self) -> list[str]:
         """
         Lists the names of all Markdown files available in the RAG knowledge base.
@@ -296,6 +970,8 @@ You can ask questions about your documents, and the server will retrieve relevan
                 ).load_data()
                 for document in new_documents:
                     self.index.insert(document)
+                if self.file_summaries is not None:
+                    self.file_summaries.upsert(new_documents)
             else:
                 logger.info(
                     f"File '{file_name}' already exists in index. Skipping index update."
@@ -304,6 +980,46 @@ You can ask questions about your documents, and the server will retrieve relevan
             logger.error(f"Failed to add markdown file: {e}")
             raise e
 
+    def update_markdown_file(self, file_path: str | Path) -> dict[str, int]:
+        """
+        Updates a Markdown file of the knowledge base with a new version of it.
+        Only the chunks whose content changed are embedded again. A file not indexed yet is added.
+        Docstore entries of the previous version are deleted.
+
+        Args:
+            file_path (str): The path to the new version of the file.
+
+        Returns:
+            numbers of unchanged, embedded and deleted chunks.
+        """
+        file_path = Path(file_path)
+        destination_path = self.rag_config.data_dir / file_path.name
+        if not destination_path.exists() or not destination_path.samefile(file_path):
+            shutil.copy(str(file_path), str(destination_path))
+
+        documents = SimpleDirectoryReader(
+            input_files=[destination_path], required_exts=[".md"]
+        ).load_data()
+        indexed = self.index.vector_store._collection.get(
+            where={"file_name": file_path.name}, include=["metadatas"]
+        )
+        previous_doc_ids = {
+            metadata["ref_doc_id"]
+            for metadata in indexed["metadatas"]
+            if metadata and metadata.get("ref_doc_id")
+        }
+        report = update_file_nodes(
+            self.index, file_path.name, split_documents(documents)
+        )
+        for document in documents:
+            self.index.docstore.set_document_hash(document.id_, document.hash)
+        # Chunks of the file now refer to the new documents, the previous ones are orphaned
+        for doc_id in previous_doc_ids - {document.id_ for document in documents}:
+            self.index.docstore.delete_document(doc_id, raise_error=False)
+        if self.file_summaries is not None:
+            self.file_summaries.upsert(documents)
+        return report
+
     def _delete_doc_by_filename(self, file_name: str) -> None:
         """
         Delete nodes using with filename in a ChromaVectorStore.
@@ -323,6 +1039,8 @@ You can ask questions about your documents, and the server will retrieve relevan
         try:
             # Delete from index vector store
             self._delete_doc_by_filename(file_name=file_name)
+            if self.file_summaries is not None:
+                self.file_summaries.delete([file_name])
             # Delete the physical file if it exists
             destination_path = self.rag_config.data_dir / file_name
             if destination_path.exists():
@@ -388,25 +1106,286 @@ You can ask questions about your documents, and the server will retrieve relevan
         downloader.save_as_markdown(output_path)
         self.add_markdown_file(output_path)
 
-    @staticmethod
-    @lru_cache(maxsize=1)
-    def _load_documents(data_dir: str | Path) -> list:
+    def download_web_pages(
+        self, urls: list[str], css_selector: str | None = None
+    ) -> dict[str, str]:
+        """
+        Download several web pages as Markdown files and add them to the vector store.
+        `rag_config.fetch_concurrency` pages are fetched at once, and HTML to Markdown
+        conversion is spread over `rag_config.num_workers` processes.
+
+        Args:
+            urls (list[str]): URLs of the pages to download.
+            css_selector (str | None): A CSS selector to filter HTML before converting to Markdown.
+
+        Returns:
+            dict[str, str]: Failed URLs, with the related error message.
+        """
+        failed_urls = {}
+        with ThreadPoolExecutor(
+            max_workers=self.rag_config.fetch_concurrency
+        ) as executor:
+            futures = {
+                url: executor.submit(
+                    PageDownloader(
+                        url=url, timeout=self.rag_config.fetch_timeout
+                    ).download_html
+                )
+                for url in urls
+            }
+
+        downloaded = {}
+        for url, future in futures.items():
+            try:
+                downloaded[url] = future.result()
+            except (OSError, ValueError) as e:
+                logger.warning(f"Failed to download {url}: {e}")
+                failed_urls[url] = str(e)
+        markdown_pages = map_in_processes(
+            partial(html_to_markdown, css_selector=css_selector),
+            downloaded.values(),
+            num_workers=self.rag_config.num_workers,
+        )
+
+        for url, markdown_content in zip(downloaded, markdown_pages):
+            try:
+                output_path = self.rag_config.data_dir / f"{url_to_filename(url)}.md"
+                output_path.parent.mkdir(exist_ok=True, parents=True)
+                output_path.write_text(markdown_content, encoding="utf-8")
+                self.add_markdown_file(output_path)
+            except Exception as e:
+                logger.warning(f"Failed to ingest {url}: {e}", exc_info=True)
+                failed_urls[url] = str(e)
+        return failed_urls
+
+    def crawl_and_ingest(
+        self,
+        url: str,
+        max_depth: int = 0,
+        css_selector: str | None = None,
+        discovery: Literal["links", "sitemap"] = "links",
+    ) -> dict[str, Any]:
+        """
+        Crawl a website from a URL, and add every crawled page to the vector store.
+        Each page is downloaded once, and is queryable as soon as it is ingested.
+
+        Args:
+            url (str): The URL to start crawling from.
+            max_depth (int): Maximum depth of exploration, 0 for the targeted page only.
+            css_selector (str | None): A CSS selector to filter HTML, for both links and Markdown content.
+            discovery (str): "links" to follow links up to max_depth.
+                "sitemap" to ingest pages listed in the website sitemaps, skipping pages
+                not modified since their last ingestion. Falls back to "links" without sitemap.
+
+        Returns:
+            dict[str, Any]: Crawled, ingested and failed URLs.
+        """
+        crawler = WebsiteCrawler(
+            base_url=url,
+            max_depth=max_depth,
+            css_selector=css_selector,
+            discovery=discovery,
+        )
+        pipeline = CrawlIngestPipeline(
+            crawler=crawler,
+            index=self.index,
+            data_dir=Path(self.rag_config.data_dir),
+            num_fetchers=self.rag_config.fetch_concurrency,
+            fetch_timeout=self.rag_config.fetch_timeout,
+            on_documents=self._summarize_documents(),
+        )
+        return pipeline.run()
+
+    def _get_storage_context(
+        self, vector_store: ChromaVectorStore, from_disk: bool = False
+    ) -> StorageContext:
         """
-        Loads all Markdown documents from the specified directory.
+        Builds the storage context for the configured docstore backend.
+
+        Args:
+            vector_store: the Chroma vector store of the index.
+            from_disk: whether to load JSON docstore and index store from `persist_dir`.
         """
-        p = Path(data_dir)
-        if not p.exists():
-            raise FileNotFoundError(
-                f"Data directory '{data_dir}' not found. Please create it and add Markdown files."
+        persist_dir = Path(self.rag_config.persist_dir)
+        if self.rag_config.docstore_backend == "sqlite":
+            kvstore = SqliteKVStore(persist_dir / SQLITE_DOCSTORE_FILE)
+            return StorageContext.from_defaults(
+                vector_store=vector_store,
+                docstore=KVDocumentStore(kvstore),
+                index_store=KVIndexStore(kvstore),
             )
+        if self.rag_config.docstore_backend == "json" and from_disk:
+            return StorageContext.from_defaults(
+                vector_store=vector_store, persist_dir=str(persist_dir)
+            )
+        return StorageContext.from_defaults(vector_store=vector_store)
 
-        reader = SimpleDirectoryReader(input_dir=data_dir, required_exts=[".md"])
-        documents = reader.load_data()
+    def _build_index(self, index: VectorStoreIndex) -> IndexBuildState:
+        """
+        Indexes the documents of `data_dir` by batches, resuming an interrupted build.
+        JSON stores are persisted after each batch, SQLite and Chroma are written on the fly.
+        """
+        persist_dir = Path(self.rag_config.persist_dir)
+        on_checkpoint = None
+        if self.rag_config.docstore_backend == "json":
+            on_checkpoint = partial(
+                index.storage_context.persist, persist_dir=persist_dir
+            )
+        return StreamingIndexBuilder(
+            index=index,
+            data_dir=Path(self.rag_config.data_dir),
+            state_path=persist_dir / BUILD_STATE_FILE,
+            batch_size=self.rag_config.build_batch_size,
+            batch_bytes=self.rag_config.build_batch_bytes,
+            num_workers=self.rag_config.num_workers,
+            on_documents=self._summarize_documents(),
+            on_checkpoint=on_checkpoint,
+        ).run()
+
+    def _summarize_documents(self) -> Callable[[list], None] | None:
+        """Ingestion callback updating the file summaries, if file routing is enabled."""
+        file_summaries = self.file_summaries
+        return file_summaries.upsert if file_summaries is not None else None
+
+    @_locked_cache
+    def _get_file_summaries(self) -> FileSummaryIndex:
+        """
+        Summaries of the indexed files, in their own collection next to the index,
+        embedded with the model of the chunks. Cleared with the index when its collection
+        is replaced.
+        """
+        db = chromadb.PersistentClient(path=Path(self.rag_config.persist_dir))
+        hnsw = self._hnsw_configuration()
+        collection = db.get_or_create_collection(
+            FILE_SUMMARY_COLLECTION, configuration={"hnsw": hnsw} if hnsw else None
+        )
+        return FileSummaryIndex(
+            collection,
+            chunks_collection=self._get_chroma_collection(),
+            embed_model=self.embed_model,
+            mode=self.rag_config.file_summary_mode,
+            max_chars=self.rag_config.file_summary_chars,
+        )
 
-        logger.debug(f"Loaded {len(documents)} documents from '{data_dir}'.")
-        return documents
+    def _get_chroma_collection(self):
+        """
+        Opens (or creates) the Chroma collection of the index, in `persist_dir`,
+        with the configured HNSW parameters.
+        """
+        hnsw = self._hnsw_configuration()
+        with _RESOURCES_LOCK:
+            db = chromadb.PersistentClient(path=Path(self.rag_config.persist_dir))
+            collection = db.get_or_create_collection(
+                CHROMA_COLLECTION, configuration={"hnsw": hnsw} if hnsw else None
+            )
+        current = collection.configuration_json.get("hnsw") or {}
+        if "ef_search" in hnsw and current.get("ef_search") != hnsw["ef_search"]:
+            collection.modify(configuration={"hnsw": {"ef_search": hnsw["ef_search"]}})
+        if mismatched := [
+            key
+            for key, value in hnsw.items()
+            if key != "ef_search" and current.get(key) != value
+        ]:
+            logger.warning(
+                f"Collection created with other HNSW parameters ({', '.join(mismatched)}). "
+                "Run `compact_index` to rebuild it with the configured ones."
+            )
+        return collection
+
+    def _hnsw_configuration(self) -> dict[str, Any]:
+        """Configured HNSW parameters, under their Chroma names."""
+        hnsw = {
+            "space": self.rag_config.hnsw_space,
+            "max_neighbors": self.rag_config.hnsw_max_neighbors,
+            "ef_construction": self.rag_config.hnsw_ef_construction,
+            "ef_search": self.rag_config.hnsw_ef_search,
+        }
+        return {key: value for key, value in hnsw.items() if value is not None}
 
-    @lru_cache(maxsize=1)
+    @staticmethod
+    def _build_generation_index(collection, snapshot_path: Path) -> VectorStoreIndex:
+        """Index of a generation loaded in `collection`, with its embedding projection."""
+        embed_model = Settings.embed_model
+        projection_arrays = read_arrays(snapshot_path, prefix="projection_")
+        if projection_arrays:
+            embed_model = ProjectedEmbedding(
+                embed_model, EmbeddingProjection.from_arrays(projection_arrays)
+            )
+        return VectorStoreIndex.from_vector_store(
+            TimedChromaVectorStore(chroma_collection=collection),
+            embed_model=embed_model,
+        )
+
+    @_locked_cache
+    def _get_embed_model(self) -> BaseEmbedding:
+        """
+        Configured embedding model, projected to `rag_config.embed_dim` dimensions if set.
+        The projection is fitted once, and persisted next to the index.
+        """
+        if self.rag_config.embed_dim is None:
+            return Settings.embed_model
+
+        persist_dir = Path(self.rag_config.persist_dir)
+        projection_path = persist_dir / PROJECTION_FILE
+        if projection_path.exists():
+            projection = EmbeddingProjection.load(projection_path)
+        elif self._get_chroma_collection().count() > 0:
+            raise ValueError(
+                "The index holds full size embeddings. "
+                "Delete the vector store to index documents with a projection."
+            )
+        else:
+            projection = self._fit_projection()
+            persist_dir.mkdir(parents=True, exist_ok=True)
+            projection.save(projection_path)
+
+        if (projection.method, projection.dim) != (
+            self.rag_config.embed_projection,
+            self.rag_config.embed_dim,
+        ):
+            raise ValueError(
+                f"The index is projected by {projection.method} to {projection.dim} "
+                "dimensions. Delete the vector store to change the projection."
+            )
+        return ProjectedEmbedding(Settings.embed_model, projection)
+
+    def _fit_projection(self) -> EmbeddingProjection:
+        """Fits the embedding projection on a sample of the document chunks."""
+        method, dim = self.rag_config.embed_projection, self.rag_config.embed_dim
+        if method == "truncate":
+            return EmbeddingProjection(method, dim)
+
+        # Chunks of files in random order, read until the sample is large enough
+        files = markdown_files(self.rag_config.data_dir)
+        nodes = []
+        for path in random.Random(0).sample(files, len(files)):
+            documents = SimpleDirectoryReader(input_files=[path]).load_data()
+            nodes += Settings.node_parser.get_nodes_from_documents(documents)
+            if len(nodes) >= self.rag_config.projection_sample_size:
+                break
+        sample = random.Random(0).sample(
+            nodes, min(len(nodes), self.rag_config.projection_sample_size)
+        )
+        embeddings = Settings.embed_model.get_text_embedding_batch(
+            [node.get_content(metadata_mode=MetadataMode.EMBED) for node in sample]
+        )
+        logger.info(f"Fitting PCA projection on {len(sample)} chunks...")
+        return EmbeddingProjection.fit(np.array(embeddings), dim, method)
+
+    @_locked_cache
+    def _get_generation_reader(self) -> GenerationReader:
+        """Follows the generations published by the writer, checked in a background thread."""
+        reader = GenerationReader(
+            self.generation_store,
+            build_index=self._build_generation_index,
+            poll_interval=self.rag_config.generation_poll_interval,
+            embed_model=self.embed_model_name,
+            hnsw=self._hnsw_configuration(),
+        )
+        reader.start()
+        return reader
+
+    @_locked_cache
     def _get_or_create_index(self):
         """
         Loads an existing LlamaIndex from the disk or creates a new one if it doesn't exist.
@@ -417,56 +1396,98 @@ You can ask questions about your documents, and the server will retrieve relevan
             persist_dir.mkdir(parents=True)
 
         # Initialize ChromaDB client, collection and vector store
-        db = chromadb.PersistentClient(path=persist_dir)
-        chroma_collection = db.get_or_create_collection("markdown_rag_collection")
-        vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
+        chroma_collection = self._get_chroma_collection()
+        vector_store = TimedChromaVectorStore(chroma_collection=chroma_collection)
+
+        build_state = IndexBuildState.load(persist_dir / BUILD_STATE_FILE)
+        if (
+            build_state is not None
+            and build_state.complete
+            and chroma_collection.count() == 0
+        ):
+            # Every file was deleted since, the files now in `data_dir` are indexed anew
+            (persist_dir / BUILD_STATE_FILE).unlink()
+            build_state = None
+        interrupted_build = build_state is not None and not build_state.complete
+        needs_build = chroma_collection.count() == 0 or interrupted_build
+
+        index = None
+        if self.rag_config.docstore_backend != "none":
+            try:
+                # Attempt to load an existing index from storage context
+                # Note: For ChromaDB, `load_index_from_storage` needs the vector_store in storage_context
+                storage_context = self._get_storage_context(
+                    vector_store, from_disk=True
+                )
+                index = load_index_from_storage(
+                    storage_context=storage_context, embed_model=self.embed_model
+                )
+                logger.debug("Loaded existing LlamaIndex from disk using ChromaDB.")
+            except Exception as e:  # TODO : Catching a broad exception for demonstration, be more specific in production
+                logger.warning(f"Could not load existing index ({e})...")
 
-        try:
-            # Attempt to load an existing index from storage context
-            # Note: For ChromaDB, `load_index_from_storage` needs the vector_store in storage_context
-            storage_context = StorageContext.from_defaults(
-                vector_store=vector_store, persist_dir=str(persist_dir)
-            )
-            index = load_index_from_storage(storage_context=storage_context)
-            logger.debug("Loaded existing LlamaIndex from disk using ChromaDB.")
-        except Exception as e:  # TODO : Catching a broad exception for demonstration, be more specific in production
-            logger.warning(f"Could not load existing index ({e})...")
-            if chroma_collection.count() > 0:
+        if index is None:
+            storage_context = self._get_storage_context(vector_store)
+            if not needs_build:
                 logger.warning(
                     "Vector store is not empty. Reconstructing index from existing vector store."
                 )
-                index = VectorStoreIndex.from_vector_store(vector_store=vector_store)
-                logger.debug("Reconstructed index from vector store.")
             else:
                 logger.warning("Vector store is empty. Creating a new LlamaIndex...")
-                storage_context = StorageContext.from_defaults(
-                    vector_store=vector_store
-                )
-                index = VectorStoreIndex.from_documents(
-                    self.documents,
-                    storage_context=storage_context,
-                )
-                logger.debug("New LlamaIndex created.")
+            # Same as `VectorStoreIndex.from_vector_store`, but keeps the configured docstore
+            index = VectorStoreIndex(
+                nodes=[], storage_context=storage_context, embed_model=self.embed_model
+            )
 
             # Persist the newly created/reconstructed index
-            index.storage_context.persist(persist_dir=persist_dir)
-            logger.debug("Index persisted to disk.")
+            # SQLite backend is written on the fly, "none" backend has nothing to persist
+            if self.rag_config.docstore_backend == "json":
+                index.storage_context.persist(persist_dir=persist_dir)
+                logger.debug("Index persisted to disk.")
+
+        if needs_build:
+            self._build_index(index)
+            logger.debug("New LlamaIndex created.")
+
+        # Files indexed before routing was enabled, or by another process
+        if self.file_summaries is not None:
+            indexed_files, _ = scan_collection(chroma_collection)
+            self.file_summaries.sync(indexed_files, self.rag_config.data_dir)
 
         return index
 
     @staticmethod
     @lru_cache(maxsize=1)
     def _instantiate_rag_query_engine(
-        index: VectorStoreIndex, top_k: int = 3
+        index: VectorStoreIndex,
+        top_k: int = 3,
+        response_mode: ResponseMode = "compact",
+        synthesis_concurrency: int = 4,
+        file_summaries: FileSummaryIndex | None = None,
+        route_top_files: int | None = None,
+        adaptive_top_k: AdaptiveTopK | None = None,
     ) -> RetrieverQueryEngine:
         """
         Creates and returns a LlamaIndex query engine for RAG.
         """
-        retriever = VectorIndexRetriever(index=index, similarity_top_k=top_k)
-        response_synthesizer = CompactAndRefine()
+        retriever = DirectoryRagServer._make_retriever(
+            index,
+            adaptive_top_k.max_k if adaptive_top_k else top_k,
+            file_summaries=file_summaries,
+            route_top_files=route_top_files,
+        )
+        response_synthesizer = get_response_synthesizer(
+            response_mode, max_concurrency=synthesis_concurrency
+        )
 
         query_engine = RetrieverQueryEngine(
-            retriever=retriever, response_synthesizer=response_synthesizer
+            retriever=retriever,
+            response_synthesizer=response_synthesizer,
+            node_postprocessors=(
+                [AdaptiveTopKPostprocessor(config=adaptive_top_k)]
+                if adaptive_top_k
+                else []
+            ),
         )
         logger.debug("LlamaIndex query engine created.")
         return query_engine
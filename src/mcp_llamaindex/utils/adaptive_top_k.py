@@ -0,0 +1,75 @@
+"""
+Adaptive number of chunks sent to the LLM: queries over-fetch `max_k` chunks, then keep those
+scoring at least `min_score`, cut at the largest drop of score between consecutive chunks, and
+keep at least `min_k`. A query matching a single chunk sends one chunk to the LLM, a broad
+one up to `max_k`, instead of always `top_k`.
+"""
+
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from llama_index.core.utils import get_tokenizer
+from pydantic import BaseModel, Field, model_validator
+
+from mcp_llamaindex.utils.metrics import metrics
+
+
+class AdaptiveTopK(BaseModel, frozen=True):
+    """Bounds and cutoffs of adaptive retrieval."""
+
+    min_k: int = Field(1, ge=1)
+    max_k: int = Field(10, ge=1)
+    # Chunks scoring less are dropped, down to `min_k` chunks. No threshold if None.
+    min_score: float | None = None
+    # The list is cut at its largest score gap, if at least `min_gap`
+    min_gap: float = Field(0.05, ge=0)
+
+    @model_validator(mode="after")
+    def check_bounds(self) -> "AdaptiveTopK":
+        if self.min_k > self.max_k:
+            raise ValueError(f"min_k ({self.min_k}) exceeds max_k ({self.max_k}).")
+        return self
+
+
+def adaptive_cutoff(scores: list[float], config: AdaptiveTopK) -> int:
+    """Number of chunks to keep, of chunks sorted by decreasing score."""
+    min_k = min(config.min_k, len(scores))
+    k = min(config.max_k, len(scores))
+    if config.min_score is not None:
+        k = max(min_k, sum(score >= config.min_score for score in scores[:k]))
+    # Cutting before chunk i keeps i chunks
+    gaps = [scores[i - 1] - scores[i] for i in range(min_k, k)]
+    if gaps and max(gaps) > 0 and max(gaps) >= config.min_gap:
+        k = min_k + gaps.index(max(gaps))
+    return k
+
+
+def cut_nodes(nodes: list[NodeWithScore], config: AdaptiveTopK) -> list[NodeWithScore]:
+    """
+    Leading nodes kept by `adaptive_cutoff`. Records the number of kept nodes, and the nodes
+    and tokens dropped, against sending all fetched nodes to the LLM.
+    """
+    k = adaptive_cutoff([node.score or 0.0 for node in nodes], config)
+    dropped = nodes[k:]
+    tokenizer = get_tokenizer()
+    metrics.observe("context_nodes", k)
+    metrics.increment("adaptive_dropped_nodes_total", len(dropped))
+    metrics.increment(
+        "adaptive_dropped_tokens_total",
+        sum(len(tokenizer(node.node.get_content())) for node in dropped),
+    )
+    return nodes[:k]
+
+
+class AdaptiveTopKPostprocessor(BaseNodePostprocessor):
+    """Query engine postprocessor cutting retrieved nodes with `cut_nodes`."""
+
+    config: AdaptiveTopK = Field(default_factory=AdaptiveTopK)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "AdaptiveTopKPostprocessor"
+
+    def _postprocess_nodes(
+        self, nodes: list[NodeWithScore], query_bundle: QueryBundle | None = None
+    ) -> list[NodeWithScore]:
+        return cut_nodes(nodes, self.config)
@@ -0,0 +1,210 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+
+from mcp_llamaindex.utils.metrics import MetricsRegistry, metrics
+
+DEFAULT_PRIORITY = 10
+
+
+class GatewayBusyError(RuntimeError):
+    """Too many requests are already waiting."""
+
+
+class GatewayTimeoutError(TimeoutError):
+    """The request deadline passed."""
+
+
+class Ticket:
+    """Place of a request in a gateway queue."""
+
+    def __init__(self, on_grant: Callable[[], bool] | None = None):
+        self.granted = False
+        self.released = False
+        self.event = threading.Event()
+        self.on_grant = on_grant
+
+
+class Gateway:
+    """
+    Admission of requests: at most `max_concurrency` requests run at once,
+    the others wait in a queue served by priority (lower first), then FIFO.
+
+    When `max_queue_size` requests are already waiting, new ones are rejected with
+    GatewayBusyError, instead of piling up until they all time out.
+    Works for both threads and event loops.
+
+    Queue depth, running requests, waiting time and rejections are reported in `registry`,
+    as `<metrics_prefix>_queue_depth`, `<metrics_prefix>_active_requests`,
+    `<metrics_prefix>_queue_wait_seconds` and `<metrics_prefix>_rejected_total`.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 2,
+        max_queue_size: int = 32,
+        registry: MetricsRegistry = metrics,
+        metrics_prefix: str = "gateway",
+        **metrics_labels: str,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self.registry = registry
+        self.metrics_prefix = metrics_prefix
+        self.metrics_labels = metrics_labels
+        self._lock = threading.Lock()
+        self._queue: list[tuple[int, int, Ticket]] = []
+        self._sequence = itertools.count()
+        self._active = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def _enqueue(
+        self, priority: int, on_grant: Callable[[], bool] | None = None
+    ) -> Ticket:
+        with self._lock:
+            queue_full = len(self._queue) >= self.max_queue_size
+            if queue_full and self._active >= self.max_concurrency:
+                self.registry.increment(
+                    f"{self.metrics_prefix}_rejected_total",
+                    reason="busy",
+                    **self.metrics_labels,
+                )
+                raise GatewayBusyError(
+                    f"{len(self._queue)} requests already waiting. Retry later."
+                )
+            ticket = Ticket(on_grant)
+            heapq.heappush(self._queue, (priority, next(self._sequence), ticket))
+            self._grant()
+        return ticket
+
+    def _grant(self) -> None:
+        """Starts queued requests while there are free slots. Lock must be held."""
+        while self._queue and self._active < self.max_concurrency:
+            _, _, ticket = heapq.heappop(self._queue)
+            ticket.granted = True
+            self._active += 1
+            ticket.event.set()
+            if ticket.on_grant and not ticket.on_grant():
+                # The waiter is gone (closed event loop), the slot is free again
+                ticket.released = True
+                self._active -= 1
+        self.registry.set_gauge(
+            f"{self.metrics_prefix}_queue_depth",
+            len(self._queue),
+            **self.metrics_labels,
+        )
+        self.registry.set_gauge(
+            f"{self.metrics_prefix}_active_requests",
+            self._active,
+            **self.metrics_labels,
+        )
+
+    def release(self, ticket: Ticket) -> None:
+        """Removes a request from the queue, or frees its slot if it already started."""
+        with self._lock:
+            if ticket.released:
+                return
+            ticket.released = True
+            if ticket.granted:
+                self._active -= 1
+            else:
+                self._queue = [item for item in self._queue if item[2] is not ticket]
+                heapq.heapify(self._queue)
+            self._grant()
+
+    def _timed_out(self, ticket: Ticket) -> GatewayTimeoutError:
+        self.release(ticket)
+        self.registry.increment(
+            f"{self.metrics_prefix}_rejected_total",
+            reason="timeout",
+            **self.metrics_labels,
+        )
+        return GatewayTimeoutError("Deadline passed while waiting for a free slot.")
+
+    def _observe_wait(self, start: float) -> None:
+        self.registry.observe(
+            f"{self.metrics_prefix}_queue_wait_seconds",
+            time.monotonic() - start,
+            **self.metrics_labels,
+        )
+
+    def acquire(
+        self, priority: int = DEFAULT_PRIORITY, deadline: float | None = None
+    ) -> Ticket:
+        """
+        Waits for a free slot, to `release` when done.
+
+        Args:
+            priority: lower is served first.
+            deadline: `time.monotonic()` after which waiting fails with GatewayTimeoutError.
+        """
+        start = time.monotonic()
+        ticket = self._enqueue(priority)
+        timeout = None if deadline is None else max(0.0, deadline - start)
+        if not ticket.event.wait(timeout) and not ticket.granted:
+            raise self._timed_out(ticket)
+        self._observe_wait(start)
+        return ticket
+
+    async def aacquire(
+        self, priority: int = DEFAULT_PRIORITY, deadline: float | None = None
+    ) -> Ticket:
+        """Async version of `acquire`. Cancelling the waiting task leaves the queue."""
+        start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def on_grant() -> bool:
+            # Called under the gateway lock, maybe from another thread
+            try:
+                loop.call_soon_threadsafe(
+                    lambda: granted.done() or granted.set_result(None)
+                )
+            except RuntimeError:
+                return False
+            return True
+
+        ticket = self._enqueue(priority, on_grant)
+        timeout = None if deadline is None else max(0.0, deadline - start)
+        try:
+            await asyncio.wait_for(granted, timeout)
+        except TimeoutError:
+            raise self._timed_out(ticket) from None
+        except BaseException:
+            self.release(ticket)
+            raise
+        self._observe_wait(start)
+        return ticket
+
+    @contextmanager
+    def slot(
+        self, priority: int = DEFAULT_PRIORITY, deadline: float | None = None
+    ) -> Iterator[None]:
+        """Holds a slot within the block."""
+        ticket = self.acquire(priority, deadline)
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    @asynccontextmanager
+    async def aslot(
+        self, priority: int = DEFAULT_PRIORITY, deadline: float | None = None
+    ) -> AsyncIterator[None]:
+        """Async version of `slot`."""
+        ticket = await self.aacquire(priority, deadline)
+        try:
+            yield
+        finally:
+            self.release(ticket)
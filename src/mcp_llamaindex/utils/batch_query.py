@@ -0,0 +1,70 @@
+"""
+Batched queries: questions embedded in a single model call, and searched in a single
+Chroma request, instead of one model call and one search per question.
+"""
+
+import math
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.callbacks import CBEventType, EventPayload
+from llama_index.core.schema import NodeWithScore
+from llama_index.core.vector_stores.utils import metadata_dict_to_node
+from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+
+from mcp_llamaindex.utils.projection import ProjectedEmbedding
+
+
+def embed_queries(embed_model: BaseEmbedding, queries: list[str]) -> list[list[float]]:
+    """
+    Embeddings of queries, timed and counted as one embedding call.
+
+    HuggingFace models encode all queries at once, with their query prompt. Other models do
+    too if they implement `_get_query_embeddings(queries)`, else queries are embedded one by one.
+    """
+    with embed_model.callback_manager.event(
+        CBEventType.EMBEDDING, payload={EventPayload.SERIALIZED: embed_model.to_dict()}
+    ) as event:
+        embeddings = _query_embeddings(embed_model, queries)
+        event.on_end(
+            payload={EventPayload.CHUNKS: queries, EventPayload.EMBEDDINGS: embeddings}
+        )
+    return embeddings
+
+
+def _query_embeddings(
+    embed_model: BaseEmbedding, queries: list[str]
+) -> list[list[float]]:
+    if isinstance(embed_model, ProjectedEmbedding):
+        return embed_model._project(_query_embeddings(embed_model.base, queries))
+    if isinstance(embed_model, HuggingFaceEmbedding):
+        return embed_model._embed(queries, prompt_name="query")
+    if hasattr(embed_model, "_get_query_embeddings"):
+        return embed_model._get_query_embeddings(queries)
+    return [embed_model._get_query_embedding(query) for query in queries]
+
+
+def search_batch(
+    collection, query_embeddings: list[list[float]], top_k: int
+) -> list[list[NodeWithScore]]:
+    """
+    Closest `top_k` chunks of each query embedding, by decreasing score, in one Chroma request.
+    Nodes and scores are those of `ChromaVectorStore` searches.
+    """
+    if not query_embeddings:
+        return []
+    result = collection.query(
+        query_embeddings=query_embeddings,
+        n_results=top_k,
+        include=["documents", "metadatas", "distances"],
+    )
+    results = []
+    for texts, metadatas, distances in zip(
+        result["documents"], result["metadatas"], result["distances"]
+    ):
+        nodes = []
+        for text, metadata, distance in zip(texts, metadatas, distances):
+            node = metadata_dict_to_node(metadata)
+            node.set_content(text)
+            nodes.append(NodeWithScore(node=node, score=math.exp(-distance)))
+        results.append(nodes)
+    return results
@@ -0,0 +1,92 @@
+import hashlib
+import logging
+from collections import defaultdict
+
+from llama_index.core import VectorStoreIndex
+from llama_index.core.schema import BaseNode, MetadataMode
+from llama_index.core.vector_stores.utils import (
+    metadata_dict_to_node,
+    node_to_metadata_dict,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(node: BaseNode) -> str:
+    """Hash of the content a node is embedded from: same hash, same embedding."""
+    return hashlib.sha256(
+        node.get_content(metadata_mode=MetadataMode.EMBED).encode()
+    ).hexdigest()
+
+
+def _chroma_metadata(node: BaseNode, flat_metadata: bool) -> dict:
+    """Metadata of a node, as `ChromaVectorStore.add` stores it."""
+    metadata = node_to_metadata_dict(
+        node, remove_text=True, flat_metadata=flat_metadata
+    )
+    return {key: "" if value is None else value for key, value in metadata.items()}
+
+
+def update_file_nodes(
+    index: VectorStoreIndex, file_name: str, nodes: list[BaseNode]
+) -> dict[str, int]:
+    """
+    Replaces the indexed nodes of a file by `nodes`, the chunks of its new version,
+    embedding only the chunks whose content changed.
+
+    Chunks are matched to indexed nodes by content hash. A matched chunk takes the id
+    of its indexed node, whose text and vector are kept: only its metadata is rewritten.
+    Other chunks are embedded and added, then indexed nodes left unmatched are deleted.
+
+    Returns:
+        numbers of unchanged, embedded and deleted chunks.
+    """
+    collection = index.vector_store._collection
+    indexed = collection.get(
+        where={"file_name": file_name}, include=["metadatas", "documents"]
+    )
+    indexed_ids: dict[str, list[str]] = defaultdict(list)
+    for node_id, metadata, text in zip(
+        indexed["ids"], indexed["metadatas"], indexed["documents"]
+    ):
+        indexed_ids[content_hash(metadata_dict_to_node(metadata, text=text))].append(
+            node_id
+        )
+
+    # New chunk id -> id of the indexed node with the same content
+    matched_ids: dict[str, str] = {}
+    for node in nodes:
+        if ids := indexed_ids.get(content_hash(node)):
+            matched_ids[node.node_id] = ids.pop(0)
+    # Relationships between chunks (previous, next) follow the ids of matched nodes
+    for node in nodes:
+        for related in node.relationships.values():
+            for info in related if isinstance(related, list) else [related]:
+                info.node_id = matched_ids.get(info.node_id, info.node_id)
+    unchanged = [node for node in nodes if node.node_id in matched_ids]
+    changed = [node for node in nodes if node.node_id not in matched_ids]
+    for node in unchanged:
+        node.id_ = matched_ids[node.node_id]
+    deleted_ids = [node_id for ids in indexed_ids.values() for node_id in ids]
+
+    if unchanged:
+        flat_metadata = index.vector_store.flat_metadata
+        # Without documents, Chroma keeps the vectors (and does not embed them itself)
+        collection.update(
+            ids=[node.node_id for node in unchanged],
+            metadatas=[_chroma_metadata(node, flat_metadata) for node in unchanged],
+        )
+    if changed:
+        index.insert_nodes(changed)
+    if deleted_ids:
+        collection.delete(ids=deleted_ids)
+
+    logger.info(
+        f"Updated '{file_name}': {len(unchanged)} chunks unchanged, "
+        f"{len(changed)} embedded, {len(deleted_ids)} deleted."
+    )
+    return {
+        "unchanged": len(unchanged),
+        "embedded": len(changed),
+        "deleted": len(deleted_ids),
+    }
@@ -0,0 +1,121 @@
+from collections.abc import Callable
+from itertools import groupby
+
+from llama_index.core.schema import NodeWithScore
+from llama_index.core.utils import get_tokenizer
+from pydantic import BaseModel
+
+
+class PackedChunk(BaseModel):
+    """Text of one or more merged chunks, from the same document."""
+
+    file_name: str | None
+    text: str
+    score: float
+    nb_tokens: int
+    start_char_idx: int | None = None
+    end_char_idx: int | None = None
+
+
+def merge_adjacent_chunks(nodes: list[NodeWithScore]) -> list[PackedChunk]:
+    """
+    Merges chunks of the same document that overlap or touch each other, dropping
+    the overlapping text. A merged chunk keeps the best score of its chunks.
+    Chunks without char offsets are kept as is.
+    """
+    chunks = []
+
+    def document_key(node_with_score: NodeWithScore) -> str:
+        return node_with_score.node.ref_doc_id or node_with_score.node.node_id
+
+    for _, doc_nodes in groupby(sorted(nodes, key=document_key), key=document_key):
+        current = None
+        for node_with_score in sorted(
+            doc_nodes, key=lambda n: n.node.start_char_idx or 0
+        ):
+            node = node_with_score.node
+            chunk = PackedChunk(
+                file_name=node.metadata.get("file_name"),
+                text=node.get_content(),
+                score=node_with_score.score or 0.0,
+                nb_tokens=0,
+                start_char_idx=node.start_char_idx,
+                end_char_idx=node.end_char_idx,
+            )
+            if (
+                current is not None
+                and current.end_char_idx is not None
+                and chunk.start_char_idx is not None
+                and chunk.start_char_idx <= current.end_char_idx
+            ):
+                overlap = current.end_char_idx - chunk.start_char_idx
+                current.text += chunk.text[overlap:]
+                current.end_char_idx = max(current.end_char_idx, chunk.end_char_idx)
+                current.score = max(current.score, chunk.score)
+                continue
+            if current is not None:
+                chunks.append(current)
+            current = chunk
+        chunks.append(current)
+    return chunks
+
+
+def _truncate_to_tokens(
+    text: str, max_tokens: int, tokenizer: Callable[[str], list]
+) -> str:
+    """Longest prefix of `text`, cut on whitespace, within `max_tokens` tokens."""
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if len(tokenizer(text[:middle])) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    prefix = text[:low]
+    if low < len(text) and " " in prefix:
+        prefix = prefix.rsplit(" ", 1)[0]
+    return prefix
+
+
+def pack_context(
+    nodes: list[NodeWithScore],
+    token_budget: int,
+    tokenizer: Callable[[str], list] | None = None,
+) -> list[PackedChunk]:
+    """
+    Packs retrieved nodes into a context of at most `token_budget` tokens.
+
+    Adjacent chunks of a same document are merged, duplicated texts are dropped,
+    then chunks are added by decreasing score until the budget is reached.
+    The first chunk overflowing the budget is truncated to fit.
+
+    Args:
+        nodes: retrieved nodes, with their score.
+        token_budget: maximum number of tokens of the packed chunks text.
+        tokenizer: text to tokens function. LlamaIndex global tokenizer if None.
+
+    Returns:
+        packed chunks, by decreasing score.
+    """
+    tokenizer = tokenizer or get_tokenizer()
+    packed = []
+    seen_texts = []
+    remaining_tokens = token_budget
+    for chunk in sorted(
+        merge_adjacent_chunks(nodes), key=lambda c: c.score, reverse=True
+    ):
+        if remaining_tokens <= 0:
+            break
+        text = chunk.text.strip()
+        if not text or any(text in seen for seen in seen_texts):
+            continue
+        nb_tokens = len(tokenizer(text))
+        if nb_tokens > remaining_tokens:
+            text = _truncate_to_tokens(text, remaining_tokens, tokenizer)
+            if not text:
+                break
+            nb_tokens = len(tokenizer(text))
+        seen_texts.append(text)
+        packed.append(chunk.model_copy(update={"text": text, "nb_tokens": nb_tokens}))
+        remaining_tokens -= nb_tokens
+    return packed
@@ -1,10 +1,18 @@
 import logging
 import re
 import requests
+from datetime import datetime
+from functools import cached_property
+from html.parser import HTMLParser
 from urllib.parse import urlparse, unquote, urljoin
 
 from bs4 import BeautifulSoup
 from pydantic import BaseModel, Field
+from typing import Literal
+
+from mcp_llamaindex.utils.sitemap import find_sitemaps, read_sitemaps
+
+logger = logging.getLogger(__name__)
 
 
 def url_to_filename(url: str) -> str:
@@ -38,6 +46,113 @@ def url_to_filename(url: str) -> str:
     return filename
 
 
+# CSS selectors made of a tag name, an id and classes only, e.g. "main", "div#content.docs"
+SIMPLE_CSS_SELECTOR = re.compile(
+    r"^(?P<tag>[a-zA-Z][\w-]*)?(?:#(?P<id>[\w-]+))?(?P<classes>(?:\.[\w-]+)*)$"
+)
+
+
+class LinkParser(HTMLParser):
+    """
+    Streams the `href` values of `<a>` tags, without building a DOM.
+
+    Links inside the first tag matching a simple CSS selector (tag name, id and classes)
+    are collected apart, as `BeautifulSoup.select_one` would select them.
+    """
+
+    def __init__(
+        self,
+        tag: str | None = None,
+        tag_id: str | None = None,
+        classes: set[str] | None = None,
+    ):
+        super().__init__(convert_charrefs=True)
+        self.links: list[str] = []
+        self.selected_links: list[str] = []
+        self.selection_found = False
+
+        self._has_selector = bool(tag or tag_id or classes)
+        self._tag = tag.lower() if tag else None
+        self._tag_id = tag_id
+        self._classes = classes or set()
+        self._selected_tag: str | None = None
+        self._selection_depth = 0  # Number of open tags named as the selected one
+
+    def _matches_selector(self, tag: str, attrs: dict) -> bool:
+        if self._tag and tag != self._tag:
+            return False
+        if self._tag_id and attrs.get("id") != self._tag_id:
+            return False
+        tag_classes = set((attrs.get("class") or "").split())
+        return self._classes.issubset(tag_classes)
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        attrs = dict(attrs)
+        if self._selection_depth:
+            if tag == self._selected_tag:
+                self._selection_depth += 1
+        elif (
+            self._has_selector
+            and not self.selection_found
+            and self._matches_selector(tag, attrs)
+        ):
+            self.selection_found = True
+            self._selected_tag = tag
+            self._selection_depth = 1
+
+        if tag == "a" and attrs.get("href"):
+            self.links.append(attrs["href"])
+            if self._selection_depth:
+                self.selected_links.append(attrs["href"])
+
+    def handle_endtag(self, tag: str) -> None:
+        if self._selection_depth and tag == self._selected_tag:
+            self._selection_depth -= 1
+
+
+def extract_hrefs(html: str, css_selector: str | None = None) -> tuple[list[str], bool]:
+    """
+    Extracts the `href` values of `<a>` tags from an HTML page.
+
+    Simple CSS selectors are handled while streaming through the page.
+    Other selectors fall back to a full BeautifulSoup DOM.
+
+    Args:
+        html: HTML content of the page.
+        css_selector: CSS selector of the region to extract the links from.
+            If None or empty string, extract from the full page.
+
+    Returns:
+        the list of href values, and whether the CSS selector matched a tag.
+        When the selector did not match, links of the full page are returned.
+    """
+    simple_selector = SIMPLE_CSS_SELECTOR.match(css_selector) if css_selector else None
+    if css_selector and not simple_selector:
+        soup = BeautifulSoup(html, "html.parser")
+        selected_section = soup.select_one(css_selector)
+        hrefs = [
+            a_tag.get("href")
+            for a_tag in (selected_section or soup).find_all("a", href=True)
+        ]
+        return [href for href in hrefs if href], selected_section is not None
+
+    if simple_selector:
+        classes = simple_selector.group("classes")
+        parser = LinkParser(
+            tag=simple_selector.group("tag"),
+            tag_id=simple_selector.group("id"),
+            classes=set(classes.split(".")[1:]) if classes else None,
+        )
+    else:
+        parser = LinkParser()
+    parser.feed(html)
+    parser.close()
+
+    if simple_selector and parser.selection_found:
+        return parser.selected_links, True
+    return parser.links, not css_selector
+
+
 class WebsiteCrawler(BaseModel):
     """
     Crawl a website to get all internal links up to a specific depth.
@@ -65,15 +180,26 @@ class WebsiteCrawler(BaseModel):
         False,
         description="Only include links that are subpaths of the base URL.",
     )
+    discovery: Literal["links", "sitemap"] = Field(
+        "links",
+        description="How pages are discovered. "
+        "'links' follows links from page to page up to max_depth. "
+        "'sitemap' lists pages from the sitemaps declared in robots.txt (or /sitemap.xml), "
+        "and falls back to following links when no sitemap is found.",
+    )
 
     _visited: set = set()
     _links: set = set()
 
-    @property
+    @cached_property
     def netloc(self) -> str:
         parsed_url = urlparse(self.base_url)
         return parsed_url.netloc
 
+    @cached_property
+    def base_url_path(self) -> str:
+        return urlparse(self.base_url).path
+
     def _crawl_and_gather_links(self, url: str) -> set[str]:
         """
         For one url, get all new links not previously visited.
@@ -87,24 +213,31 @@ class WebsiteCrawler(BaseModel):
             response = requests.get(url)
             response.raise_for_status()
         except requests.RequestException as e:
-            logging.warning(f"Error fetching {url}: {e}")
+            logger.warning(f"Error fetching {url}: {e}")
             return set()
 
-        soup = BeautifulSoup(response.text, "html.parser")
-        if self.css_selector:
-            selected_section = soup.select_one(self.css_selector)
-            if selected_section:
-                soup = selected_section
-            else:
-                logging.warning(
-                    f"The CSS selector {self.css_selector} did not match any Tag from {url}."
-                    "Searching links from the full page instead."
-                )
+        return self.gather_links(url, response.text)
+
+    def gather_links(self, url: str, html: str) -> set[str]:
+        """
+        Extract the links of an already fetched page, filtered by the crawler rules.
+        Args:
+            url: url of the page, to resolve relative links
+            html: HTML content of the page
+
+        Returns:
+            set of links
+        """
+        hrefs, selector_matched = extract_hrefs(html, self.css_selector)
+        if not selector_matched:
+            logger.warning(
+                f"The CSS selector {self.css_selector} did not match any Tag from {url}."
+                "Searching links from the full page instead."
+            )
 
         links = set()
-        for a_tag in soup.find_all("a", href=True):
-            href = a_tag.get("href")
-            if not href or href.startswith("#"):
+        for href in hrefs:
+            if href.startswith("#"):
                 continue
 
             # Handle relative paths
@@ -112,19 +245,35 @@ class WebsiteCrawler(BaseModel):
             parsed_url = urlparse(link_url)
             full_url = parsed_url._replace(fragment="").geturl()
 
-            fill_domain_requirements = (
-                not self.only_domain_links or self.netloc == urlparse(link_url).netloc
-            )
-            base_url_path = urlparse(self.base_url).path
-            url_path = parsed_url.path
-            fill_subpath_requirements = (
-                not self.only_subpath_links or url_path.startswith(base_url_path)
-            )
-            if fill_domain_requirements and fill_subpath_requirements:
+            if self._fill_requirements(parsed_url.netloc, parsed_url.path):
                 links.add(full_url)
 
         return links
 
+    def _fill_requirements(self, netloc: str, path: str) -> bool:
+        """Whether a link fills the domain and subpath rules of the crawler."""
+        fill_domain_requirements = not self.only_domain_links or self.netloc == netloc
+        fill_subpath_requirements = not self.only_subpath_links or path.startswith(
+            self.base_url_path
+        )
+        return fill_domain_requirements and fill_subpath_requirements
+
+    def discover_from_sitemaps(self) -> dict[str, datetime | None]:
+        """
+        List pages from the website sitemaps, filtered by the crawler rules.
+
+        Returns:
+            mapping of page URLs to their last modification date (None if unknown).
+            Empty if the website has no sitemap.
+        """
+        pages = read_sitemaps(find_sitemaps(self.base_url))
+        filtered_pages = {}
+        for url, lastmod in pages.items():
+            parsed_url = urlparse(url)
+            if self._fill_requirements(parsed_url.netloc, parsed_url.path):
+                filtered_pages[parsed_url._replace(fragment="").geturl()] = lastmod
+        return filtered_pages
+
     def _iterative_crawl(self, current_url: str, current_depth=0) -> None:
         """
         Recursively explores a website from a base URL to a specified maximum depth,
@@ -149,6 +298,15 @@ class WebsiteCrawler(BaseModel):
                 self._iterative_crawl(link, current_depth + 1)
 
     def crawl(self) -> set[str]:
+        if self.discovery == "sitemap":
+            sitemap_links = self.discover_from_sitemaps()
+            if sitemap_links:
+                self._links.update(sitemap_links)
+                return self._links
+            logger.info(
+                f"No sitemap found for {self.base_url}. Following links instead."
+            )
+
         self._iterative_crawl(self.base_url)
         return self._links
 
@@ -8,15 +8,38 @@ from pydantic import BaseModel
 
 from html2text import HTML2Text
 
+from mcp_llamaindex.utils.metrics import metrics
+
+
+def html_to_markdown(html_content: str, css_selector: str | None = None) -> str:
+    """Converts HTML content to Markdown.
+
+    Module-level function so that it can be dispatched to worker processes.
+
+    Args:
+        html_content: the HTML content to convert.
+        css_selector: a CSS selector to filter HTML before converting to Markdown.
+
+    Returns:
+        The Markdown content.
+    """
+    if css_selector:
+        soup = BeautifulSoup(html_content, "html.parser")
+        selected_content = soup.select(css_selector)
+        html_content = "".join(str(tag) for tag in selected_content)
+
+    return HTML2Text().handle(html_content)
+
 
 class PageDownloader(BaseModel):
     url: str
     css_selector: Optional[str] = None
     encoding: str = "utf-8"
+    # Seconds to connect, and to wait for each read. None for the default socket timeout
+    timeout: float | None = None
 
     @property
     def html_content(self) -> str:
-        logging.info(f"Downloading page: {self.url}")
         return self._download_page()
 
     @property
@@ -26,26 +49,34 @@ class PageDownloader(BaseModel):
     def _download_page(self) -> str:
         """Downloads the HTML content of the page."""
         try:
-            with urllib.request.urlopen(self.url) as response:
-                if response.getcode() == 200:
-                    return response.read().decode(self.encoding)
-                else:
-                    logging.warning(
-                        f"Failed to download page, status code: {response.getcode()}"
-                    )
+            return self.download_html()
         except Exception as e:
             logging.warning(f"An error occurred: {e}")
 
+    def download_html(self) -> str:
+        """
+        Downloads the HTML content of the page.
+
+        Raises:
+            OSError: if the page could not be downloaded, with the HTTP status or network error.
+            ValueError: if the URL is invalid, or the page is not encoded with `encoding`.
+        """
+        logging.info(f"Downloading page: {self.url}")
+        with (
+            metrics.timer("stage_seconds", stage="fetch"),
+            urllib.request.urlopen(self.url, timeout=self.timeout) as response,
+        ):
+            if response.getcode() != 200:
+                raise OSError(
+                    f"Failed to download page, status code: {response.getcode()}"
+                )
+            return response.read().decode(self.encoding)
+
     def _convert_to_markdown(self):
         """Converts the HTML content to Markdown."""
-        if self.css_selector:
-            soup = BeautifulSoup(self.html_content, "html.parser")
-            selected_content = soup.select(self.css_selector)
-            html_content = "".join(str(tag) for tag in selected_content)
-        else:
-            html_content = self.html_content
-
-        return HTML2Text().handle(html_content)
+        html_content = self.html_content
+        with metrics.timer("stage_seconds", stage="convert"):
+            return html_to_markdown(html_content, self.css_selector)
 
     def save_as_markdown(self, output_path: str | Path) -> None:
         """Saves the Markdown content to a file.
@@ -0,0 +1,326 @@
+"""
+Local embedding server, sharing one copy of the embedding model between processes
+(MCP server, Gradio app, workers), over a unix socket or HTTP on localhost.
+
+Concurrent requests from all clients are grouped into batches (micro-batching):
+a batch is embedded as soon as `max_batch_size` texts are waiting, or `max_wait_s`
+after its first request arrived.
+
+Usage:
+    python -m mcp_llamaindex.utils.embedding_server --url unix:///tmp/mcp_llamaindex_embed.sock
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socketserver
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Literal
+from urllib.parse import urlparse
+
+import httpx
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from pydantic import Field, PrivateAttr
+
+from mcp_llamaindex.utils.embeddings import make_embed_model
+from mcp_llamaindex.utils.metrics import MetricsRegistry, metrics
+
+logger = logging.getLogger(__name__)
+
+EmbeddingKind = Literal["text", "query"]
+# Host of HTTP requests sent over a unix socket, only used in request headers
+UNIX_SOCKET_HOST = "http://embedding-server"
+
+
+class MicroBatcher:
+    """
+    Groups concurrent embedding requests into batches, embedded by one worker thread.
+
+    Requests of the same kind (texts or queries) are batched together, by arrival order.
+    A request larger than `max_batch_size` is embedded alone.
+
+    Args:
+        embed_fn: embeds a batch of texts of a kind.
+        max_batch_size: number of texts from which a batch starts without waiting.
+        max_wait_s: maximum delay of the first request of a batch.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[list[str], EmbeddingKind], list[list[float]]],
+        max_batch_size: int = 64,
+        max_wait_s: float = 0.005,
+        registry: MetricsRegistry = metrics,
+    ):
+        self.embed_fn = embed_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_s
+        self.registry = registry
+        self._pending: deque[tuple[float, EmbeddingKind, list[str], Future]] = deque()
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def embed(
+        self, texts: list[str], kind: EmbeddingKind = "text"
+    ) -> list[list[float]]:
+        """Embeds texts within the next batch of their kind, blocking until done."""
+        if not texts:
+            return []
+        future: Future = Future()
+        with self._condition:
+            self._pending.append((time.monotonic(), kind, texts, future))
+            self._condition.notify()
+        return future.result()
+
+    def _nb_waiting(self, kind: EmbeddingKind) -> int:
+        return sum(len(texts) for _, k, texts, _ in self._pending if k == kind)
+
+    def _next_batch(self) -> tuple[EmbeddingKind, list[tuple[list[str], Future]]]:
+        """Waits for a full batch, or for the oldest request to reach `max_wait_s`."""
+        with self._condition:
+            while not self._pending:
+                self._condition.wait()
+            arrival, kind, _, _ = self._pending[0]
+            deadline = arrival + self.max_wait_s
+            while self._nb_waiting(kind) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            requests, nb_texts, kept = [], 0, deque()
+            while self._pending:
+                request = self._pending.popleft()
+                _, request_kind, texts, future = request
+                fits = nb_texts + len(texts) <= self.max_batch_size or not requests
+                if request_kind == kind and fits:
+                    requests.append((texts, future))
+                    nb_texts += len(texts)
+                else:
+                    kept.append(request)
+            self._pending = kept
+        self.registry.observe(
+            "embedding_queue_wait_seconds", time.monotonic() - arrival
+        )
+        return kind, requests
+
+    def _run(self) -> None:
+        while True:
+            kind, requests = self._next_batch()
+            texts = [text for request_texts, _ in requests for text in request_texts]
+            self.registry.observe("embedding_batch_size", len(texts), kind=kind)
+            try:
+                embeddings = self.embed_fn(texts, kind)
+            except Exception as e:  # noqa: BLE001 - raised to the callers
+                for _, future in requests:
+                    future.set_exception(e)
+                continue
+            start = 0
+            for request_texts, future in requests:
+                future.set_result(embeddings[start : start + len(request_texts)])
+                start += len(request_texts)
+
+
+def embed_with_model(
+    model: BaseEmbedding, texts: list[str], kind: EmbeddingKind
+) -> list[list[float]]:
+    """Embeds a batch of texts or queries, as the model would in process."""
+    if kind == "text":
+        return model.get_text_embedding_batch(texts)
+    if isinstance(model, HuggingFaceEmbedding):
+        # Encodes the whole batch at once, with the model query prompt
+        return model._embed(texts, prompt_name="query")
+    return [model.get_query_embedding(query) for query in texts]
+
+
+class EmbeddingRequestHandler(BaseHTTPRequestHandler):
+    # Set on the server by `make_server`
+    server: "EmbeddingHTTPServer | EmbeddingUnixServer"
+
+    def do_GET(self):
+        if self.path != "/health":
+            self.send_error(404)
+            return
+        self._send_json(200, {"model": self.server.model_name})
+
+    def do_POST(self):
+        if self.path != "/embed":
+            self.send_error(404)
+            return
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        model_name = payload.get("model")
+        if model_name and model_name != self.server.model_name:
+            self._send_json(
+                400,
+                {
+                    "error": f"Server embeds with '{self.server.model_name}', "
+                    f"not '{model_name}'."
+                },
+            )
+            return
+        try:
+            embeddings = self.server.batcher.embed(
+                payload["texts"], payload.get("kind", "text")
+            )
+        except Exception as e:
+            logger.exception("Embedding failed")
+            self._send_json(500, {"error": str(e)})
+            return
+        self._send_json(200, {"embeddings": embeddings})
+
+    def _send_json(self, status: int, data: dict) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(format % args)
+
+
+class EmbeddingHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    model_name: str
+    batcher: MicroBatcher
+
+
+class EmbeddingUnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    model_name: str
+    batcher: MicroBatcher
+
+
+def make_server(
+    model: BaseEmbedding,
+    url: str,
+    max_batch_size: int = 64,
+    max_wait_s: float = 0.005,
+) -> EmbeddingHTTPServer | EmbeddingUnixServer:
+    """
+    Embedding server listening on `url`, "unix:///path/to.sock" or "http://127.0.0.1:port".
+    Call `serve_forever` to serve requests.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme == "unix":
+        if os.path.exists(parsed.path):
+            os.unlink(parsed.path)
+        server = EmbeddingUnixServer(parsed.path, EmbeddingRequestHandler)
+    else:
+        server = EmbeddingHTTPServer(
+            (parsed.hostname or "127.0.0.1", parsed.port or 0),
+            EmbeddingRequestHandler,
+        )
+    server.model_name = model.model_name
+    server.batcher = MicroBatcher(
+        lambda texts, kind: embed_with_model(model, texts, kind),
+        max_batch_size=max_batch_size,
+        max_wait_s=max_wait_s,
+    )
+    return server
+
+
+class RemoteEmbedding(BaseEmbedding):
+    """
+    Embedding model served by a local embedding server, drop-in replacement of the
+    in-process model. `model_name` must be the model of the server.
+    """
+
+    url: str = Field(
+        description="Embedding server URL: unix:///path/to.sock or http://host:port."
+    )
+    timeout: float = Field(60.0, gt=0)
+    _client: httpx.Client = PrivateAttr()
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        parsed = urlparse(self.url)
+        if parsed.scheme == "unix":
+            self._client = httpx.Client(
+                base_url=UNIX_SOCKET_HOST,
+                transport=httpx.HTTPTransport(uds=parsed.path),
+                timeout=self.timeout,
+            )
+        else:
+            self._client = httpx.Client(base_url=self.url, timeout=self.timeout)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "RemoteEmbedding"
+
+    def _embed(self, texts: list[str], kind: EmbeddingKind) -> list[list[float]]:
+        response = self._client.post(
+            "/embed", json={"texts": texts, "kind": kind, "model": self.model_name}
+        )
+        if response.status_code != 200:
+            raise RuntimeError(
+                f"Embedding server error: {response.json().get('error', response.text)}"
+            )
+        return response.json()["embeddings"]
+
+    def _get_query_embedding(self, query: str) -> list[float]:
+        return self._embed([query], "query")[0]
+
+    def _get_query_embeddings(self, queries: list[str]) -> list[list[float]]:
+        return self._embed(queries, "query")
+
+    def _get_text_embedding(self, text: str) -> list[float]:
+        return self._embed([text], "text")[0]
+
+    def _get_text_embeddings(self, texts: list[str]) -> list[list[float]]:
+        return self._embed(texts, "text")
+
+    async def _aget_query_embedding(self, query: str) -> list[float]:
+        return await asyncio.to_thread(self._get_query_embedding, query)
+
+    async def _aget_text_embedding(self, text: str) -> list[float]:
+        return await asyncio.to_thread(self._get_text_embedding, text)
+
+    async def _aget_text_embeddings(self, texts: list[str]) -> list[list[float]]:
+        return await asyncio.to_thread(self._get_text_embeddings, texts)
+
+
+def main():
+    from mcp_llamaindex.config import settings
+
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--url", default="unix:///tmp/mcp_llamaindex_embed.sock")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    # Embedding model configured by the EMBED_* settings
+    model = make_embed_model(
+        settings.EMBED_MODEL,
+        backend=settings.EMBED_BACKEND,
+        precision=settings.EMBED_PRECISION,
+        batch_size=settings.EMBED_BATCH_SIZE,
+        max_batch_tokens=settings.EMBED_MAX_BATCH_TOKENS,
+        max_length=settings.EMBED_MAX_LENGTH,
+        num_threads=settings.EMBED_NUM_THREADS,
+    )
+    server = make_server(
+        model,
+        args.url,
+        max_batch_size=args.max_batch_size,
+        max_wait_s=args.max_wait_ms / 1e3,
+    )
+    logger.info(f"Embedding server of '{model.model_name}' listening on {args.url}.")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import logging
+import platform
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Literal
+
+import torch
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from llama_index.embeddings.huggingface.utils import (
+    get_query_instruct_for_model_name,
+    get_text_instruct_for_model_name,
+)
+from pydantic import Field
+
+logger = logging.getLogger(__name__)
+
+EmbeddingBackend = Literal["torch", "onnx"]
+EmbeddingPrecision = Literal["fp32", "int8"]
+
+# Texts sorted by length together, then split into batches
+LENGTH_BUCKET_WINDOW = 256
+QUANTIZED_MODELS_DIR = Path.home() / ".cache" / "mcp_llamaindex" / "onnx_int8"
+
+
+def length_buckets(
+    lengths: list[int], max_batch_size: int, max_batch_tokens: int
+) -> list[list[int]]:
+    """
+    Groups texts of similar lengths, to reduce padding: indices sorted by decreasing
+    length, in batches of at most `max_batch_size` texts and `max_batch_tokens`
+    tokens once padded to their longest text.
+    """
+    buckets: list[list[int]] = []
+    bucket: list[int] = []
+    for i in sorted(range(len(lengths)), key=lambda i: -lengths[i]):
+        # Longest text of the bucket comes first
+        padded_tokens = (len(bucket) + 1) * (lengths[bucket[0]] if bucket else 0)
+        if bucket and (
+            len(bucket) >= max_batch_size or padded_tokens > max_batch_tokens
+        ):
+            buckets.append(bucket)
+            bucket = []
+        bucket.append(i)
+    if bucket:
+        buckets.append(bucket)
+    return buckets
+
+
+class BucketedHuggingFaceEmbedding(HuggingFaceEmbedding):
+    """
+    HuggingFace embedding, encoding texts in batches of similar lengths.
+
+    LlamaIndex batches of `embed_batch_size` texts are sorted by token length, then encoded
+    in batches of `encode_batch_size` texts and `max_batch_tokens` padded tokens.
+    """
+
+    encode_batch_size: int = Field(16, gt=0)
+    max_batch_tokens: int = Field(8192, gt=0)
+
+    def __init__(
+        self, encode_batch_size: int = 16, max_batch_tokens: int = 8192, **kwargs: Any
+    ):
+        super().__init__(**kwargs)
+        self.encode_batch_size = encode_batch_size
+        self.max_batch_tokens = max_batch_tokens
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "BucketedHuggingFaceEmbedding"
+
+    def _embed(
+        self, inputs: list[str | BytesIO], prompt_name: str | None = None
+    ) -> list[list[float]]:
+        if len(inputs) <= 1 or not all(isinstance(text, str) for text in inputs):
+            return super()._embed(inputs, prompt_name)
+
+        lengths = [
+            len(ids)
+            for ids in self._model.tokenizer(
+                inputs, truncation=True, max_length=self.max_length
+            )["input_ids"]
+        ]
+        embeddings: list[list[float]] = [[] for _ in inputs]
+        for bucket in length_buckets(
+            lengths, self.encode_batch_size, self.max_batch_tokens
+        ):
+            bucket_embeddings = super()._embed([inputs[i] for i in bucket], prompt_name)
+            for i, embedding in zip(bucket, bucket_embeddings):
+                embeddings[i] = embedding
+        return embeddings
+
+
+def _onnx_quantization_config() -> str:
+    """ONNX Runtime dynamic quantization matching the CPU instruction set."""
+    if platform.machine().lower() in {"arm64", "aarch64"}:
+        return "arm64"
+    try:
+        flags = Path("/proc/cpuinfo").read_text()
+    except OSError:
+        flags = ""
+    return "avx512_vnni" if "avx512_vnni" in flags else "avx2"
+
+
+def _quantized_onnx_model(model_name: str, model_kwargs: dict) -> tuple[Path, str]:
+    """
+    Exports the model to ONNX and quantizes it to int8, once.
+    Returns the exported model directory and the quantized ONNX file in it.
+    """
+    from sentence_transformers import (
+        SentenceTransformer,
+        export_dynamic_quantized_onnx_model,
+    )
+
+    quantization_config = _onnx_quantization_config()
+    model_dir = QUANTIZED_MODELS_DIR / model_name.replace("/", "__")
+    file_name = f"onnx/model_qint8_{quantization_config}.onnx"
+    if not (model_dir / file_name).exists():
+        logger.info(f"Quantizing '{model_name}' to int8 ({quantization_config})...")
+        model = SentenceTransformer(
+            model_name, backend="onnx", device="cpu", model_kwargs=model_kwargs
+        )
+        model.save_pretrained(str(model_dir))
+        export_dynamic_quantized_onnx_model(model, quantization_config, str(model_dir))
+    return model_dir, file_name
+
+
+def embed_model_name(model_name: str, precision: EmbeddingPrecision = "fp32") -> str:
+    """Name of the embeddings of a model: int8 embeddings slightly differ from fp32 ones."""
+    return model_name + ("+int8" if precision == "int8" else "")
+
+
+def make_embed_model(
+    model_name: str,
+    backend: EmbeddingBackend = "torch",
+    precision: EmbeddingPrecision = "fp32",
+    batch_size: int = 16,
+    max_batch_tokens: int = 8192,
+    max_length: int | None = None,
+    num_threads: int | None = None,
+) -> BaseEmbedding:
+    """
+    Embedding model for CPU or GPU, with length-bucketed batching.
+
+    Args:
+        model_name: HuggingFace model name.
+        backend: "torch", or "onnx" for ONNX Runtime on CPU (needs `optimum[onnxruntime]`).
+        precision: "fp32", or "int8" for a dynamically quantized ONNX model, exported once
+            in `QUANTIZED_MODELS_DIR`. The model name gets a "+int8" suffix,
+            so that snapshots of fp32 embeddings are not mixed with int8 ones.
+        batch_size: maximum number of texts encoded at once.
+        max_batch_tokens: maximum number of padded tokens encoded at once.
+        max_length: maximum number of tokens of a text, model default if None.
+        num_threads: intra-op threads of torch or ONNX Runtime, their default if None.
+    """
+    if precision == "int8" and backend != "onnx":
+        raise ValueError("int8 precision needs the onnx backend.")
+
+    model_kwargs: dict[str, Any] = {}
+    device = None
+    if backend == "onnx":
+        import onnxruntime
+
+        session_options = onnxruntime.SessionOptions()
+        if num_threads:
+            session_options.intra_op_num_threads = num_threads
+            session_options.inter_op_num_threads = 1
+        model_kwargs = {
+            "provider": "CPUExecutionProvider",
+            "session_options": session_options,
+        }
+        device = "cpu"
+    elif num_threads:
+        torch.set_num_threads(num_threads)
+
+    model_path = model_name
+    if precision == "int8":
+        model_dir, model_kwargs["file_name"] = _quantized_onnx_model(
+            model_name, model_kwargs
+        )
+        model_path = str(model_dir)
+
+    embed_model = BucketedHuggingFaceEmbedding(
+        model_name=model_path,
+        # Prompts are found by model name, not by the path of the quantized model
+        query_instruction=get_query_instruct_for_model_name(model_name),
+        text_instruction=get_text_instruct_for_model_name(model_name),
+        max_length=max_length,
+        embed_batch_size=LENGTH_BUCKET_WINDOW,
+        encode_batch_size=batch_size,
+        max_batch_tokens=max_batch_tokens,
+        device=device,
+        backend=backend,
+        model_kwargs=model_kwargs,
+    )
+    embed_model.model_name = embed_model_name(model_name, precision)
+    return embed_model
@@ -0,0 +1,390 @@
+"""
+Two-stage retrieval for large corpora: queries first select the files whose summary is
+the closest, then search the chunks of these files only.
+
+Each file has a short summary, embedded in a collection of its own: its headings, each
+with the first sentence of its section. Summaries can then be rewritten by the LLM,
+in the background, without delaying ingestion.
+
+Summaries also hold the ids of the chunks of their file: chunks of the selected files are
+fetched by id and scored exactly, as filtered searches of Chroma scan the metadata of the
+whole collection, and get slower than a full search as it grows.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import re
+import threading
+from collections import defaultdict
+from collections.abc import Iterable
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Literal
+
+import numpy as np
+from llama_index.core import Settings, SimpleDirectoryReader, VectorStoreIndex
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.llms import LLM
+from llama_index.core.retrievers import VectorIndexRetriever
+from llama_index.core.schema import Document, NodeWithScore, QueryBundle
+from llama_index.core.vector_stores import MetadataFilters
+from llama_index.core.vector_stores.utils import metadata_dict_to_node
+
+from mcp_llamaindex.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+FileSummaryMode = Literal["extractive", "llm"]
+
+# Collection of file summaries, next to the chunks collection
+FILE_SUMMARY_COLLECTION = "markdown_rag_file_summaries"
+# Number of files read at once to summarize indexed files
+SUMMARY_BATCH_SIZE = 64
+# Characters of a file sent to the LLM, to fit in its context window
+LLM_SUMMARY_INPUT_CHARS = 8000
+LLM_SUMMARY_PROMPT = (
+    "Summarize the following document in a few sentences, naming the topics it covers. "
+    "Answer with the summary only.\n\n{text}"
+)
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def extractive_summary(text: str, max_chars: int = 1000) -> str:
+    """
+    Summary of a Markdown text: its headings, each followed by the first sentence of its
+    section (and the first sentence of the text before any heading), up to `max_chars`.
+    """
+    parts = []
+    needs_sentence = True
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("#"):
+            parts.append(line.lstrip("#").strip())
+            needs_sentence = True
+        elif line and needs_sentence:
+            parts.append(SENTENCE_END.split(line, maxsplit=1)[0])
+            needs_sentence = False
+    return "\n".join(part for part in parts if part)[:max_chars]
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def chroma_distances(
+    embeddings: np.ndarray, query: np.ndarray, space: str = "l2"
+) -> np.ndarray:
+    """Distances of embeddings to a query, as Chroma computes them in an HNSW `space`."""
+    if space == "cosine":
+        embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        query = query / np.linalg.norm(query)
+    if space in ("cosine", "ip"):
+        return 1.0 - embeddings @ query
+    return np.sum((embeddings - query) ** 2, axis=1)
+
+
+class FileSummaryIndex:
+    """
+    Summary embeddings of the files of an index, one per file, to route queries.
+
+    Args:
+        collection: Chroma collection of the summaries, with file names as ids.
+        chunks_collection: Chroma collection of the chunks of the index.
+        embed_model: embedding model of the chunks, so that summaries share their space.
+        mode: "extractive" summaries, or extractive ones rewritten by the LLM in the background.
+        llm: LLM writing summaries, `Settings.llm` if None.
+        max_chars: maximum number of characters of a summary.
+    """
+
+    def __init__(
+        self,
+        collection: Any,
+        chunks_collection: Any,
+        embed_model: BaseEmbedding,
+        mode: FileSummaryMode = "extractive",
+        llm: LLM | None = None,
+        max_chars: int = 1000,
+    ):
+        self.collection = collection
+        self.chunks_collection = chunks_collection
+        self.embed_model = embed_model
+        self.mode = mode
+        self.llm = llm
+        self.max_chars = max_chars
+        # One LLM summary at a time, queries keep priority on the LLM server
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending: set[Future] = set()
+        self._lock = threading.Lock()
+
+    def file_names(self) -> set[str]:
+        return set(self.collection.get(include=[])["ids"])
+
+    def upsert(self, documents: Iterable[Document]) -> None:
+        """
+        Summarizes the files of documents (as loaded from a directory), once their chunks
+        are indexed. Files with an unchanged content keep their summary, with new chunk ids.
+        """
+        texts: dict[str, list[str]] = defaultdict(list)
+        for document in documents:
+            if file_name := document.metadata.get("file_name"):
+                texts[file_name].append(document.text)
+        if not texts:
+            return
+        contents = {file_name: "\n\n".join(parts) for file_name, parts in texts.items()}
+        hashes = {file_name: hash_text(text) for file_name, text in contents.items()}
+
+        current = self.collection.get(ids=list(contents), include=["metadatas"])
+        unchanged = {
+            file_name: metadata
+            for file_name, metadata in zip(current["ids"], current["metadatas"])
+            if metadata.get("content_hash") == hashes[file_name]
+        }
+        if unchanged:
+            chunk_ids = self._chunk_ids(list(unchanged))
+            self.collection.update(
+                ids=list(unchanged),
+                metadatas=[
+                    metadata | {"chunk_ids": json.dumps(chunk_ids[file_name])}
+                    for file_name, metadata in unchanged.items()
+                ],
+            )
+        changed = {
+            file_name: text
+            for file_name, text in contents.items()
+            if file_name not in unchanged
+        }
+        if not changed:
+            return
+        self._write(
+            {
+                file_name: extractive_summary(text, self.max_chars)
+                for file_name, text in changed.items()
+            },
+            hashes,
+            "extractive",
+        )
+        if self.mode == "llm":
+            for file_name, text in changed.items():
+                self._submit(file_name, text, hashes[file_name])
+
+    def delete(self, file_names: list[str]) -> None:
+        if file_names:
+            self.collection.delete(ids=file_names)
+
+    def sync(self, file_names: set[str], data_dir: str | Path) -> None:
+        """
+        Summarizes the indexed files (`file_names`) without summary, read from `data_dir`,
+        and deletes the summaries of files no longer indexed. With LLM summaries, files
+        still summarized extractively (e.g. when the server stopped) are queued again.
+        """
+        data_dir = Path(data_dir)
+        summarized = self.file_names()
+        self.delete(sorted(summarized - file_names))
+        missing = [
+            data_dir / file_name
+            for file_name in sorted(file_names - summarized)
+            if (data_dir / file_name).exists()
+        ]
+        if missing:
+            logger.info(f"Summarizing {len(missing)} indexed files for routing...")
+        for start in range(0, len(missing), SUMMARY_BATCH_SIZE):
+            self.upsert(
+                SimpleDirectoryReader(
+                    input_files=missing[start : start + SUMMARY_BATCH_SIZE]
+                ).load_data()
+            )
+
+        if self.mode == "llm":
+            extractive = self.collection.get(
+                where={"summary_mode": "extractive"}, include=["metadatas"]
+            )
+            just_queued = {path.name for path in missing}
+            for file_name, metadata in zip(extractive["ids"], extractive["metadatas"]):
+                path = data_dir / file_name
+                if file_name in just_queued or not path.exists():
+                    continue
+                text = path.read_text(encoding="utf-8")
+                if hash_text(text) == metadata.get("content_hash"):
+                    self._submit(file_name, text, metadata["content_hash"])
+
+    def route(
+        self, query_embedding: list[float], top_files: int
+    ) -> dict[str, list[str]] | None:
+        """
+        Chunk ids of the `top_files` files closest to a query, by file name.
+        None without any summary.
+        """
+        if self.collection.count() == 0:
+            return None
+        with metrics.timer("stage_seconds", stage="route"):
+            result = self.collection.query(
+                query_embeddings=[query_embedding],
+                n_results=top_files,
+                include=["metadatas"],
+            )
+        return {
+            file_name: json.loads(metadata.get("chunk_ids") or "[]")
+            for file_name, metadata in zip(result["ids"][0], result["metadatas"][0])
+        }
+
+    def wait(self) -> None:
+        """Waits for the LLM summaries in progress."""
+        with self._lock:
+            pending = list(self._pending)
+        wait(pending)
+
+    def _chunk_ids(self, file_names: list[str]) -> dict[str, list[str]]:
+        chunks = self.chunks_collection.get(
+            where={"file_name": {"$in": file_names}}, include=["metadatas"]
+        )
+        chunk_ids: dict[str, list[str]] = {file_name: [] for file_name in file_names}
+        for chunk_id, metadata in zip(chunks["ids"], chunks["metadatas"]):
+            chunk_ids[metadata["file_name"]].append(chunk_id)
+        return chunk_ids
+
+    def _write(
+        self, summaries: dict[str, str], hashes: dict[str, str], mode: FileSummaryMode
+    ) -> None:
+        file_names = list(summaries)
+        chunk_ids = self._chunk_ids(file_names)
+        self.collection.upsert(
+            ids=file_names,
+            embeddings=self.embed_model.get_text_embedding_batch(
+                [summaries[file_name] for file_name in file_names]
+            ),
+            documents=[summaries[file_name] for file_name in file_names],
+            metadatas=[
+                {
+                    "file_name": file_name,
+                    "summary_mode": mode,
+                    "content_hash": hashes[file_name],
+                    "chunk_ids": json.dumps(chunk_ids[file_name]),
+                }
+                for file_name in file_names
+            ],
+        )
+
+    def _submit(self, file_name: str, text: str, text_hash: str) -> None:
+        future = self._executor.submit(self._llm_summary, file_name, text, text_hash)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+
+    def _done(self, future: Future) -> None:
+        with self._lock:
+            self._pending.discard(future)
+
+    def _is_current(self, file_name: str, text_hash: str) -> bool:
+        """Whether the summary of a file is still that of this content."""
+        current = self.collection.get(ids=[file_name], include=["metadatas"])
+        return bool(current["ids"]) and (
+            current["metadatas"][0].get("content_hash") == text_hash
+        )
+
+    def _llm_summary(self, file_name: str, text: str, text_hash: str) -> None:
+        """Replaces the extractive summary of a file by one of the LLM."""
+        try:
+            # The file may have been updated or deleted since it was queued
+            if not self._is_current(file_name, text_hash):
+                return
+            llm = self.llm or Settings.llm
+            summary = llm.complete(
+                LLM_SUMMARY_PROMPT.format(text=text[:LLM_SUMMARY_INPUT_CHARS])
+            ).text.strip()
+            if summary and self._is_current(file_name, text_hash):
+                self._write(
+                    {file_name: summary[: self.max_chars]},
+                    {file_name: text_hash},
+                    "llm",
+                )
+        except Exception as e:
+            # The extractive summary is kept, the file is queued again on next start
+            logger.warning(
+                f"Could not summarize '{file_name}' with the LLM: {e}", exc_info=True
+            )
+
+
+class FileRoutingRetriever(BaseRetriever):
+    """
+    Two-stage retriever: selects the `top_files` files whose summary is the closest to the
+    query, then scores the chunks of these files exactly, and returns the `similarity_top_k`
+    closest ones. The query is embedded once, for both stages.
+
+    Explicit `filters` (e.g. on file names) disable routing, as they already narrow the search.
+    """
+
+    def __init__(
+        self,
+        index: VectorStoreIndex,
+        file_summaries: FileSummaryIndex,
+        top_files: int,
+        similarity_top_k: int,
+        filters: MetadataFilters | None = None,
+    ):
+        self._index = index
+        self._file_summaries = file_summaries
+        self._top_files = top_files
+        self._similarity_top_k = similarity_top_k
+        self._filters = filters
+        super().__init__(callback_manager=Settings.callback_manager)
+
+    def _retrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
+        routed = None
+        if self._filters is None:
+            if query_bundle.embedding is None:
+                query_bundle.embedding = (
+                    self._index._embed_model.get_agg_embedding_from_queries(
+                        query_bundle.embedding_strs
+                    )
+                )
+            routed = self._file_summaries.route(query_bundle.embedding, self._top_files)
+        if routed is None:
+            retriever = VectorIndexRetriever(
+                index=self._index,
+                similarity_top_k=self._similarity_top_k,
+                filters=self._filters,
+            )
+            # Not `retrieve`: the search is timed once, as the retrieval of this retriever
+            return retriever._retrieve(query_bundle)
+        return self._search_chunks(
+            [chunk_id for chunk_ids in routed.values() for chunk_id in chunk_ids],
+            query_bundle.embedding,
+        )
+
+    def _search_chunks(
+        self, chunk_ids: list[str], query_embedding: list[float]
+    ) -> list[NodeWithScore]:
+        """Closest chunks among `chunk_ids`, scored like Chroma search results."""
+        collection = self._index.vector_store._collection
+        candidates = collection.get(ids=chunk_ids, include=["embeddings"])
+        if not candidates["ids"]:
+            return []
+        distances = chroma_distances(
+            np.asarray(candidates["embeddings"], dtype=np.float32),
+            np.asarray(query_embedding, dtype=np.float32),
+            collection.configuration_json["hnsw"]["space"],
+        )
+        top = np.argsort(distances)[: self._similarity_top_k]
+        chunks = collection.get(
+            ids=[candidates["ids"][i] for i in top],
+            include=["documents", "metadatas"],
+        )
+        chunks_by_id = {
+            chunk_id: (text, metadata)
+            for chunk_id, text, metadata in zip(
+                chunks["ids"], chunks["documents"], chunks["metadatas"]
+            )
+        }
+        nodes = []
+        for i in top:
+            if candidates["ids"][i] not in chunks_by_id:
+                continue  # Deleted since
+            text, metadata = chunks_by_id[candidates["ids"][i]]
+            node = metadata_dict_to_node(metadata)
+            node.set_content(text)
+            nodes.append(NodeWithScore(node=node, score=math.exp(-float(distances[i]))))
+        return nodes
@@ -0,0 +1,241 @@
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import chromadb
+
+from mcp_llamaindex.utils.metrics import metrics
+from mcp_llamaindex.utils.snapshot import (
+    export_collection,
+    import_collection,
+    read_manifest,
+)
+
+logger = logging.getLogger(__name__)
+
+CURRENT_GENERATION_FILE = "CURRENT"
+
+
+class GenerationStore:
+    """
+    Read-only generations of an index, published by one writer process for many readers.
+
+    Each generation is a snapshot file. The `CURRENT` file points to the last one,
+    and is replaced atomically once the snapshot is complete, so readers never see
+    a partial generation. Only the `keep` last generations are kept on disk.
+    """
+
+    def __init__(self, root: str | Path, keep: int = 3):
+        self.root = Path(root)
+        self.keep = keep
+
+    def _path(self, generation: int) -> Path:
+        return self.root / f"generation-{generation:06d}.npz"
+
+    def current(self) -> tuple[int, Path] | None:
+        """Number and snapshot file of the last published generation, None if none."""
+        try:
+            pointer = json.loads((self.root / CURRENT_GENERATION_FILE).read_text())
+        except FileNotFoundError:
+            return None
+        return pointer["generation"], self.root / pointer["file"]
+
+    def publish(
+        self,
+        collection,
+        manifest_extra: dict[str, Any] | None = None,
+        extra_arrays: dict[str, Any] | None = None,
+    ) -> int:
+        """
+        Writes a new generation from a Chroma collection, and returns its number.
+        See `export_collection` for `manifest_extra` and `extra_arrays`.
+        """
+        current = self.current()
+        generation = current[0] + 1 if current else 1
+        path = self._path(generation)
+        tmp_path = path.with_suffix(".tmp")
+        export_collection(
+            collection,
+            tmp_path,
+            manifest_extra={"generation": generation, **(manifest_extra or {})},
+            extra_arrays=extra_arrays,
+        )
+        os.replace(tmp_path, path)
+
+        tmp_pointer = self.root / f"{CURRENT_GENERATION_FILE}.tmp"
+        tmp_pointer.write_text(
+            json.dumps({"generation": generation, "file": path.name})
+        )
+        os.replace(tmp_pointer, self.root / CURRENT_GENERATION_FILE)
+
+        for old_path in self.root.glob("generation-*.npz"):
+            if int(old_path.stem.split("-")[1]) <= generation - self.keep:
+                old_path.unlink(missing_ok=True)
+        logger.info(f"Published index generation {generation}.")
+        return generation
+
+
+class GenerationPublisher:
+    """
+    Coalesces the publications of a writer: changes marked within `min_interval` seconds
+    of the last generation are published together, in one generation, from a timer thread.
+    Writes then don't each pay for a full export, nor readers for a full import.
+
+    Args:
+        publish: publishes a generation of the current index.
+        min_interval: minimum seconds between two publications.
+    """
+
+    def __init__(self, publish: Callable[[], int], min_interval: float = 10.0):
+        self.publish = publish
+        self.min_interval = min_interval
+        self._last = -math.inf
+        self._timer: threading.Timer | None = None
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()
+
+    def mark_dirty(self) -> None:
+        """Schedules a publication of the changes, unless one is already pending."""
+        with self._lock:
+            if self._timer is not None:
+                return
+            delay = max(0.0, self._last + self.min_interval - time.monotonic())
+            self._timer = threading.Timer(delay, self._run)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> None:
+        """Publishes the pending changes now, and waits for publications in progress."""
+        with self._publish_lock:
+            with self._lock:
+                timer, self._timer = self._timer, None
+            if timer is not None:
+                timer.cancel()
+                self._publish()
+
+    def _run(self) -> None:
+        with self._publish_lock:
+            with self._lock:
+                if self._timer is None:  # Flushed meanwhile
+                    return
+                self._timer = None
+            self._publish()
+
+    def _publish(self) -> None:
+        # Changes marked from now on are published by the next generation
+        self._last = time.monotonic()
+        try:
+            self.publish()
+        except Exception as e:
+            logger.warning(f"Could not publish index generation: {e}", exc_info=True)
+
+
+class GenerationReader:
+    """
+    Read-only index following the generations of a store.
+
+    Each new generation is loaded in an in-memory Chroma collection, then swapped in.
+    Queries keep running on the previous generation while the next one loads, and
+    the previous collection is only dropped on the following swap.
+
+    Args:
+        store: the generations to follow.
+        build_index: builds the index served from a loaded collection, and its snapshot file.
+        poll_interval: seconds between checks for a new generation, once started.
+        embed_model: name of the embedding model used for queries. Generations
+            embedded with another model are rejected.
+        hnsw: HNSW parameters of the loaded collections, under their Chroma names.
+    """
+
+    def __init__(
+        self,
+        store: GenerationStore,
+        build_index: Callable[[Any, Path], Any],
+        poll_interval: float = 2.0,
+        embed_model: str | None = None,
+        hnsw: dict[str, Any] | None = None,
+    ):
+        self.store = store
+        self.build_index = build_index
+        self.poll_interval = poll_interval
+        self.embed_model = embed_model
+        self.hnsw = hnsw
+        self.generation = 0
+        self._index = None
+        self._client = chromadb.EphemeralClient()
+        self._collections: list[str] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def index(self) -> Any:
+        if self._index is None:
+            self.refresh()
+        if self._index is None:
+            raise FileNotFoundError(
+                f"No index generation published in '{self.store.root}' yet. "
+                "Please start the writer first."
+            )
+        return self._index
+
+    def refresh(self) -> bool:
+        """Loads the last published generation if newer. Returns whether it was swapped in."""
+        with self._lock:
+            current = self.store.current()
+            if current is None or current[0] <= self.generation:
+                return False
+            generation, path = current
+
+            embed_model = read_manifest(path).get("embed_model")
+            if self.embed_model and embed_model != self.embed_model:
+                raise ValueError(
+                    f"Generation {generation} embedded with '{embed_model}', "
+                    f"but the configured model is '{self.embed_model}'."
+                )
+            # In-memory clients of a process share collections, names must be unique
+            collection = self._client.create_collection(
+                f"generation_{generation}_{uuid.uuid4().hex}",
+                configuration={"hnsw": self.hnsw} if self.hnsw else None,
+            )
+            try:
+                import_collection(collection, path)
+                index = self.build_index(collection, path)
+            except Exception:
+                self._client.delete_collection(collection.name)
+                raise
+
+            self._index, self.generation = index, generation
+            self._collections.append(collection.name)
+            while len(self._collections) > 2:
+                self._client.delete_collection(self._collections.pop(0))
+        metrics.set_gauge("index_generation", generation)
+        logger.info(f"Swapped in index generation {generation}.")
+        return True
+
+    def _poll(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                # A generation pruned while loading, or rejected: retried on next poll
+                logger.warning(f"Could not load index generation: {e}", exc_info=True)
+
+    def start(self) -> None:
+        """Checks for new generations in a background thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._poll, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
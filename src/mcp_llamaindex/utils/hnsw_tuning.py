@@ -0,0 +1,259 @@
+"""
+Tuning of the HNSW parameters of an index (`RagConfig.hnsw_*`): recall@k of Chroma searches
+against exact search, with their latency and index size, for a sweep of parameters.
+
+The sweep runs on a sample of the chunks of an index, with queries sampled from them:
+a sentence of a chunk, embedded with the configured model. With `--chunk-queries`, queries are
+the embeddings of sampled chunks instead, and no model is loaded. Exact top-k chunks are found
+by brute force, then each parameter set is built in a scratch collection and searched.
+
+Usage:
+    python -m mcp_llamaindex.utils.hnsw_tuning --persist-dir ./vector_store \\
+        --max-neighbors 16 32 --ef-construction 100 200 --ef-search 10 50 100 200
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import chromadb
+import numpy as np
+
+from mcp_llamaindex.utils.maintenance import (
+    CHROMA_COLLECTION,
+    collection_disk_stats,
+    copy_collection,
+)
+from mcp_llamaindex.utils.projection import (
+    PROJECTION_FILE,
+    EmbeddingProjection,
+    ProjectedEmbedding,
+)
+from mcp_llamaindex.utils.snapshot import BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Words of a sentence to be a query
+MIN_QUERY_WORDS = 5
+
+
+def sample_chunks(
+    collection, max_chunks: int, rng: random.Random
+) -> tuple[np.ndarray, list[str]]:
+    """Embeddings and texts of at most `max_chunks` chunks of a collection, picked at random."""
+    ids: list[str] = []
+    offset = 0
+    while batch := collection.get(include=[], limit=BATCH_SIZE, offset=offset)["ids"]:
+        ids += batch
+        offset += len(batch)
+    if len(ids) > max_chunks:
+        ids = rng.sample(ids, max_chunks)
+
+    embeddings, documents = [], []
+    for start in range(0, len(ids), BATCH_SIZE):
+        batch = collection.get(
+            ids=ids[start : start + BATCH_SIZE], include=["embeddings", "documents"]
+        )
+        embeddings.append(np.asarray(batch["embeddings"], dtype=np.float32))
+        documents += [document or "" for document in batch["documents"]]
+    return np.concatenate(embeddings), documents
+
+
+def sample_query(text: str, rng: random.Random) -> str:
+    """A sentence of a chunk, or its first words if it has no sentence long enough."""
+    sentences = [
+        sentence.strip()
+        for sentence in text.replace("\n", " ").split(". ")
+        if len(sentence.split()) >= MIN_QUERY_WORDS
+    ]
+    return rng.choice(sentences) if sentences else " ".join(text.split()[:30])
+
+
+def exact_top_k(
+    embeddings: np.ndarray, queries: np.ndarray, k: int, space: str = "l2"
+) -> np.ndarray:
+    """Indices of the `k` nearest embeddings of each query, by brute force."""
+    if space == "cosine":
+        embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    scores = queries @ embeddings.T
+    if space == "l2":
+        # Ranking by |q - x|² = |q|² - 2 q.x + |x|², |q|² being the same for all x
+        scores = 2 * scores - np.sum(embeddings**2, axis=1)
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def sweep(
+    embeddings: np.ndarray,
+    queries: np.ndarray,
+    k: int = 10,
+    space: str = "l2",
+    max_neighbors: list[int] = (16,),
+    ef_construction: list[int] = (100,),
+    ef_search: list[int] = (100,),
+    work_dir: str | Path | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Recall@k, latency percentiles and index size of Chroma searches for each combination
+    of HNSW parameters, against exact search.
+    """
+    expected = exact_top_k(embeddings, queries, k, space)
+    source = chromadb.EphemeralClient().create_collection(
+        f"tuning_source_{time.monotonic_ns()}"
+    )
+    for start in range(0, len(embeddings), BATCH_SIZE):
+        batch = embeddings[start : start + BATCH_SIZE]
+        source.add(
+            ids=[str(i) for i in range(start, start + len(batch))], embeddings=batch
+        )
+
+    results = []
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        for m, efc in itertools.product(max_neighbors, ef_construction):
+            persist_dir = Path(tmp) / f"m{m}_efc{efc}"
+            client = chromadb.PersistentClient(path=persist_dir)
+            collection = client.create_collection(
+                "tuning",
+                configuration={
+                    "hnsw": {"space": space, "max_neighbors": m, "ef_construction": efc}
+                },
+            )
+            start = time.perf_counter()
+            copy_collection(source, collection)
+            build_s = time.perf_counter() - start
+            index_bytes = collection_disk_stats(persist_dir, collection)[
+                "hnsw_index_bytes"
+            ]
+
+            for ef in ef_search:
+                collection.modify(configuration={"hnsw": {"ef_search": ef}})
+                collection.query(query_embeddings=queries[:1], n_results=k)  # Warm up
+                latencies, recalls = [], []
+                for query, query_expected in zip(queries, expected):
+                    start = time.perf_counter()
+                    found = collection.query(query_embeddings=[query], n_results=k)
+                    latencies.append(time.perf_counter() - start)
+                    found_ids = {int(i) for i in found["ids"][0]}
+                    recalls.append(len(found_ids & set(query_expected)) / k)
+                result = {
+                    "space": space,
+                    "max_neighbors": m,
+                    "ef_construction": efc,
+                    "ef_search": ef,
+                    f"recall@{k}": round(float(np.mean(recalls)), 4),
+                    "p50_ms": round(float(np.percentile(latencies, 50)) * 1e3, 3),
+                    "p99_ms": round(float(np.percentile(latencies, 99)) * 1e3, 3),
+                    "build_s": round(build_s, 3),
+                    "index_mb": round(index_bytes / 2**20, 2),
+                }
+                logger.info(json.dumps(result))
+                results.append(result)
+            del client
+    return results
+
+
+def _query_embed_model(persist_dir: Path):
+    """Configured embedding model, with the projection of the index if any."""
+    from mcp_llamaindex.config import settings
+    from mcp_llamaindex.utils.embeddings import make_embed_model
+
+    embed_model = make_embed_model(
+        settings.EMBED_MODEL,
+        backend=settings.EMBED_BACKEND,
+        precision=settings.EMBED_PRECISION,
+        batch_size=settings.EMBED_BATCH_SIZE,
+        max_batch_tokens=settings.EMBED_MAX_BATCH_TOKENS,
+        max_length=settings.EMBED_MAX_LENGTH,
+        num_threads=settings.EMBED_NUM_THREADS,
+    )
+    if (persist_dir / PROJECTION_FILE).exists():
+        projection = EmbeddingProjection.load(persist_dir / PROJECTION_FILE)
+        embed_model = ProjectedEmbedding(embed_model, projection)
+    return embed_model
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--persist-dir", type=Path, default=Path("./vector_store"))
+    parser.add_argument("--collection", default=CHROMA_COLLECTION)
+    parser.add_argument("--max-chunks", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument(
+        "--space",
+        choices=["l2", "cosine", "ip"],
+        help="Distance of the swept indexes, that of the collection if not set.",
+    )
+    parser.add_argument("--max-neighbors", type=int, nargs="+", default=[16])
+    parser.add_argument("--ef-construction", type=int, nargs="+", default=[100])
+    parser.add_argument(
+        "--ef-search", type=int, nargs="+", default=[10, 20, 50, 100, 200]
+    )
+    parser.add_argument(
+        "--chunk-queries",
+        action="store_true",
+        help="Query with the embeddings of sampled chunks, without loading a model.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="JSON file to write results to.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    rng = random.Random(args.seed)
+    collection = chromadb.PersistentClient(path=args.persist_dir).get_collection(
+        args.collection
+    )
+    space = args.space or collection.configuration_json["hnsw"]["space"]
+    embeddings, documents = sample_chunks(collection, args.max_chunks, rng)
+    query_indices = rng.sample(range(len(documents)), min(args.queries, len(documents)))
+    if args.chunk_queries:
+        queries = embeddings[query_indices]
+    else:
+        embed_model = _query_embed_model(args.persist_dir)
+        queries = np.asarray(
+            [
+                embed_model.get_query_embedding(sample_query(documents[i], rng))
+                for i in query_indices
+            ],
+            dtype=np.float32,
+        )
+    logger.info(
+        f"Sweeping HNSW parameters on {len(embeddings)} chunks, {len(queries)} queries."
+    )
+
+    results = sweep(
+        embeddings,
+        queries,
+        k=args.top_k,
+        space=space,
+        max_neighbors=args.max_neighbors,
+        ef_construction=args.ef_construction,
+        ef_search=args.ef_search,
+    )
+    if args.output:
+        args.output.write_text(
+            json.dumps(
+                {
+                    "config": {
+                        key: str(value) if isinstance(value, Path) else value
+                        for key, value in vars(args).items()
+                    },
+                    "chunks": len(embeddings),
+                    "results": results,
+                },
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import logging
+import os
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import nullcontext
+from pathlib import Path
+from typing import ClassVar
+
+from llama_index.core import SimpleDirectoryReader, VectorStoreIndex
+from llama_index.core.schema import Document
+from pydantic import BaseModel, ConfigDict, Field
+
+from mcp_llamaindex.utils.metrics import metrics
+from mcp_llamaindex.utils.scheduler import raise_if_cancelled
+from mcp_llamaindex.utils.workers import make_process_pool, split_documents
+
+logger = logging.getLogger(__name__)
+
+BUILD_STATE_FILE = "build_state.json"
+
+
+def markdown_files(data_dir: str | Path) -> list[Path]:
+    """Markdown files of a directory, by name. Only their paths are held in memory."""
+    data_dir = Path(data_dir)
+    if not data_dir.exists():
+        raise FileNotFoundError(
+            f"Data directory '{data_dir}' not found. Please create it and add Markdown files."
+        )
+    with os.scandir(data_dir) as entries:
+        names = sorted(
+            entry.name
+            for entry in entries
+            if entry.is_file() and entry.name.endswith(".md")
+        )
+    return [data_dir / name for name in names]
+
+
+def file_batches(
+    paths: Iterable[Path], max_files: int, max_bytes: int
+) -> Iterator[list[Path]]:
+    """
+    Consecutive batches of at most `max_files` files and `max_bytes` bytes.
+    A file larger than `max_bytes` makes a batch on its own.
+    """
+    batch: list[Path] = []
+    batch_bytes = 0
+    for path in paths:
+        size = path.stat().st_size
+        if batch and (len(batch) >= max_files or batch_bytes + size > max_bytes):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(path)
+        batch_bytes += size
+    if batch:
+        yield batch
+
+
+class IndexBuildState(BaseModel):
+    """Progress of an index build, saved after each batch to resume an interrupted build."""
+
+    files_done: int = 0
+    nodes: int = 0
+    # Files are ingested by name order: every file up to this one is indexed
+    last_file: str | None = None
+    complete: bool = False
+
+    @classmethod
+    def load(cls, path: str | Path) -> "IndexBuildState | None":
+        try:
+            return cls.model_validate_json(Path(path).read_text())
+        except FileNotFoundError:
+            return None
+
+    def save(self, path: str | Path) -> None:
+        """Replaces the saved state atomically, so that a crash never leaves a partial one."""
+        tmp_path = Path(path).with_suffix(".tmp")
+        tmp_path.write_text(self.model_dump_json())
+        os.replace(tmp_path, path)
+
+
+class StreamingIndexBuilder(BaseModel):
+    """
+    Builds an index from the Markdown files of a directory, batch by batch, in bounded memory.
+
+    Files are read in name order, by batches of at most `batch_size` files and
+    `batch_bytes` bytes. Each batch is loaded, chunked, embedded and upserted before
+    the next one is read, so memory does not grow with the size of the directory.
+
+    Documents of each indexed batch are passed to `on_documents`, e.g. to summarize them.
+    After each batch, `on_checkpoint` persists the index if needed, then the build state
+    records the last indexed file. An interrupted build resumes after it: nodes of the
+    batch in progress when it stopped are deleted, then indexed again.
+    A cancelled tool call stops the build between batches, the next one resumes it.
+    """
+
+    index: VectorStoreIndex
+    data_dir: Path
+    state_path: Path
+    batch_size: int = Field(64, ge=1, description="Maximum number of files per batch.")
+    batch_bytes: int = Field(
+        8 * 2**20, ge=1, description="Maximum size of the files of a batch."
+    )
+    num_workers: int = Field(
+        1, ge=1, description="Number of worker processes for chunking."
+    )
+    on_documents: Callable[[list[Document]], None] | None = None
+    on_checkpoint: Callable[[], None] | None = None
+
+    model_config: ClassVar[ConfigDict] = ConfigDict(arbitrary_types_allowed=True)
+
+    def run(self) -> IndexBuildState:
+        """Indexes the files not indexed yet, and returns the final build state."""
+        state = IndexBuildState.load(self.state_path) or IndexBuildState()
+        if state.complete:
+            return state
+
+        files = markdown_files(self.data_dir)
+        remaining = [
+            path
+            for path in files
+            if state.last_file is None or path.name > state.last_file
+        ]
+        resuming = state.last_file is not None
+        if resuming:
+            logger.info(
+                f"Resuming index build after '{state.last_file}' "
+                f"({state.files_done}/{len(files)} files done)."
+            )
+        metrics.set_gauge("index_build_files_total", len(files))
+
+        start, files_at_start = time.monotonic(), state.files_done
+        pool = (
+            make_process_pool(self.num_workers)
+            if self.num_workers > 1
+            else nullcontext()
+        )
+        with pool as executor:
+            for batch in file_batches(remaining, self.batch_size, self.batch_bytes):
+                raise_if_cancelled()
+                if resuming:
+                    # The batch may have been partly upserted before the interruption
+                    self.index.vector_store._collection.delete(
+                        where={"file_name": {"$in": [path.name for path in batch]}}
+                    )
+                    resuming = False
+                state.nodes += self._index_batch(batch, executor)
+                state.files_done += len(batch)
+                state.last_file = batch[-1].name
+                if self.on_checkpoint is not None:
+                    self.on_checkpoint()
+                state.save(self.state_path)
+
+                metrics.set_gauge("index_build_files_done", state.files_done)
+                files_per_s = (state.files_done - files_at_start) / (
+                    time.monotonic() - start
+                )
+                eta_s = (len(files) - state.files_done) / files_per_s
+                logger.info(
+                    f"Indexed {state.files_done}/{len(files)} files, {state.nodes} chunks "
+                    f"({files_per_s:.1f} files/s, ETA {eta_s:.0f}s)."
+                )
+
+        state.complete = True
+        state.save(self.state_path)
+        logger.info(f"Index built: {state.files_done} files, {state.nodes} chunks.")
+        return state
+
+    def _index_batch(self, batch: list[Path], executor) -> int:
+        """Loads, chunks, embeds and upserts a batch of files. Returns its number of nodes."""
+        documents = SimpleDirectoryReader(
+            input_files=batch, required_exts=[".md"]
+        ).load_data()
+        nodes = split_documents(
+            documents, num_workers=self.num_workers, executor=executor
+        )
+        self.index.insert_nodes(nodes)
+        for document in documents:
+            self.index.docstore.set_document_hash(document.id_, document.hash)
+        if self.on_documents is not None:
+            self.on_documents(documents)
+        return len(nodes)
@@ -0,0 +1,304 @@
+import logging
+import queue
+import threading
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+from typing import Any, ClassVar
+
+import requests
+from llama_index.core import Settings, SimpleDirectoryReader, VectorStoreIndex
+from llama_index.core.ingestion import run_transformations
+from llama_index.core.schema import Document, MetadataMode
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+
+from mcp_llamaindex.utils.crawler import WebsiteCrawler, url_to_filename
+from mcp_llamaindex.utils.downloader import html_to_markdown
+from mcp_llamaindex.utils.metrics import metrics
+from mcp_llamaindex.utils.scheduler import ToolCancelledError, cancel_event
+
+logger = logging.getLogger(__name__)
+
+# Sent through the queues to stop the next stage
+_STOP = object()
+
+
+class CrawlIngestPipeline(BaseModel):
+    """
+    Crawl a website and ingest every crawled page in a streaming pipeline.
+
+    Each page is fetched once, and goes through the queue stages:
+    fetch -> link extract -> html to markdown -> chunk -> embed -> upsert.
+    Queues between stages are bounded, so that a slow stage (usually embedding)
+    holds back the fetchers instead of piling up pages in memory.
+    Pages are upserted one by one, and become queryable while the crawl is still running.
+
+    With the crawler "sitemap" discovery, pages listed in sitemaps are fetched directly,
+    without following links. Their `lastmod` is stored in nodes metadata, so that
+    a re-sync only re-ingests pages modified since the previous one.
+
+    When the tool call is cancelled, pages left are dropped by every stage, and the pipeline
+    stops with `ToolCancelledError` once pages in progress are done.
+    """
+
+    crawler: WebsiteCrawler
+    index: VectorStoreIndex
+    data_dir: Path
+    num_fetchers: int = Field(4, ge=1, description="Number of fetching threads.")
+    fetch_timeout: float = Field(
+        30.0,
+        gt=0,
+        description="Seconds to connect, and to wait for each read, before a page fails.",
+    )
+    queue_size: int = Field(
+        8, ge=1, description="Maximum number of items waiting between two stages."
+    )
+    on_documents: Callable[[list[Document]], None] | None = Field(
+        None, description="Called with the documents of each ingested page."
+    )
+
+    model_config: ClassVar[ConfigDict] = ConfigDict(arbitrary_types_allowed=True)
+
+    _frontier: queue.Queue = PrivateAttr(default_factory=queue.Queue)
+    _seen: set[str] = PrivateAttr(default_factory=set)
+    _pending: int = PrivateAttr(0)
+    _lastmods: dict[str, datetime | None] = PrivateAttr(default_factory=dict)
+    _ingested_urls: list[str] = PrivateAttr(default_factory=list)
+    _failed_urls: dict[str, str] = PrivateAttr(default_factory=dict)
+    _cancelled: threading.Event = PrivateAttr(default_factory=threading.Event)
+
+    def run(self) -> dict[str, Any]:
+        """
+        Run the pipeline until every reachable page is ingested.
+
+        Returns:
+            report with the crawled, ingested and failed URLs.
+        """
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        # Stage threads don't inherit the context of the tool call
+        self._cancelled = cancel_event()
+        session = requests.Session()  # Keep-alive connections shared by fetchers
+        pages_queue = queue.Queue(maxsize=self.queue_size)
+        markdown_queue = queue.Queue(maxsize=self.queue_size)
+        documents_queue = queue.Queue(maxsize=self.queue_size)
+        nodes_queue = queue.Queue(maxsize=self.queue_size)
+        embedded_queue = queue.Queue(maxsize=self.queue_size)
+
+        self._seed_frontier()
+        if not self._pending:
+            logger.info("Every page is up to date. Nothing to ingest.")
+            return self._report()
+
+        threads = [
+            threading.Thread(target=self._fetch, args=(session, pages_queue))
+            for _ in range(self.num_fetchers)
+        ] + [
+            threading.Thread(
+                target=self._extract_links, args=(pages_queue, markdown_queue)
+            ),
+            threading.Thread(
+                target=self._convert, args=(markdown_queue, documents_queue)
+            ),
+            threading.Thread(target=self._chunk, args=(documents_queue, nodes_queue)),
+            threading.Thread(target=self._embed, args=(nodes_queue, embedded_queue)),
+            threading.Thread(target=self._upsert, args=(embedded_queue,)),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        session.close()
+
+        if self._cancelled.is_set():
+            raise ToolCancelledError(
+                f"Crawl cancelled, after ingesting {len(self._ingested_urls)} pages."
+            )
+        return self._report()
+
+    def _report(self) -> dict[str, Any]:
+        return {
+            "crawled_urls": sorted(self._seen),
+            "ingested_urls": self._ingested_urls,
+            "failed_urls": self._failed_urls,
+        }
+
+    def _seed_frontier(self) -> None:
+        """Enqueue sitemap pages that changed since last ingestion, or the base URL."""
+        if self.crawler.discovery == "sitemap":
+            sitemap_pages = self.crawler.discover_from_sitemaps()
+            for url, lastmod in sitemap_pages.items():
+                if self._is_up_to_date(url, lastmod):
+                    self._seen.add(url)
+                    continue
+                self._lastmods[url] = lastmod
+                # Sitemaps list every page, there is no link to follow
+                self._enqueue(url, depth=self.crawler.max_depth)
+            if sitemap_pages:
+                return
+            logger.info(
+                f"No sitemap found for {self.crawler.base_url}. Following links instead."
+            )
+        self._enqueue(self.crawler.base_url, depth=0)
+
+    def _enqueue(self, url: str, depth: int) -> None:
+        self._seen.add(url)
+        self._pending += 1
+        self._frontier.put((url, depth))
+
+    def _fetch(self, session: requests.Session, pages_queue: queue.Queue) -> None:
+        """Stage 1: fetch pages from the frontier."""
+        while (item := self._frontier.get()) is not _STOP:
+            url, depth = item
+            if self._cancelled.is_set():
+                pages_queue.put((url, depth, None))
+                continue
+            try:
+                with metrics.timer("stage_seconds", stage="fetch"):
+                    response = session.get(url, timeout=self.fetch_timeout)
+                response.raise_for_status()
+                html = response.text
+            except Exception as e:
+                logger.warning(f"Error fetching {url}: {e}", exc_info=True)
+                self._failed_urls[url] = str(e)
+                html = None
+            pages_queue.put((url, depth, html))
+
+    def _extract_links(
+        self, pages_queue: queue.Queue, markdown_queue: queue.Queue
+    ) -> None:
+        """
+        Stage 2: extract links of fetched pages, and feed the frontier with new ones.
+        Only this stage tracks pending pages, so it knows when the crawl is over.
+        """
+        while self._pending:
+            url, depth, html = pages_queue.get()
+            try:
+                if html is not None and not self._cancelled.is_set():
+                    if depth < self.crawler.max_depth:
+                        for link in self.crawler.gather_links(url, html) - self._seen:
+                            self._enqueue(link, depth + 1)
+                    markdown_queue.put((url, html))
+            except Exception as e:
+                logger.warning(f"Error extracting links of {url}: {e}", exc_info=True)
+                self._failed_urls[url] = str(e)
+            finally:
+                self._pending -= 1
+
+        for _ in range(self.num_fetchers):
+            self._frontier.put(_STOP)
+        markdown_queue.put(_STOP)
+
+    def _convert(
+        self, markdown_queue: queue.Queue, documents_queue: queue.Queue
+    ) -> None:
+        """Stage 3: convert HTML to Markdown files, and load them as documents."""
+        while (item := markdown_queue.get()) is not _STOP:
+            url, html = item
+            if self._cancelled.is_set():
+                continue
+            try:
+                file_name = f"{url_to_filename(url)}.md"
+                # Outdated sitemap pages were already checked, and are replaced on upsert
+                if url not in self._lastmods and self._is_indexed(file_name):
+                    logger.info(f"File '{file_name}' already indexed. Skipping {url}.")
+                    continue
+                output_path = self.data_dir / file_name
+                with metrics.timer("stage_seconds", stage="convert"):
+                    markdown_content = html_to_markdown(html, self.crawler.css_selector)
+                output_path.write_text(markdown_content, encoding="utf-8")
+                documents = SimpleDirectoryReader(
+                    input_files=[output_path], required_exts=[".md"]
+                ).load_data()
+                if self._lastmods.get(url):
+                    for document in documents:
+                        document.metadata["lastmod"] = self._lastmods[url].isoformat()
+                        document.excluded_embed_metadata_keys.append("lastmod")
+                        document.excluded_llm_metadata_keys.append("lastmod")
+                documents_queue.put((url, documents))
+            except Exception as e:
+                logger.warning(f"Error converting {url}: {e}", exc_info=True)
+                self._failed_urls[url] = str(e)
+        documents_queue.put(_STOP)
+
+    def _chunk(self, documents_queue: queue.Queue, nodes_queue: queue.Queue) -> None:
+        """Stage 4: split documents into nodes."""
+        while (item := documents_queue.get()) is not _STOP:
+            url, documents = item
+            if self._cancelled.is_set():
+                continue
+            try:
+                nodes = run_transformations(documents, Settings.transformations)
+                nodes_queue.put((url, documents, nodes))
+            except Exception as e:
+                logger.warning(f"Error chunking {url}: {e}", exc_info=True)
+                self._failed_urls[url] = str(e)
+        nodes_queue.put(_STOP)
+
+    def _embed(self, nodes_queue: queue.Queue, embedded_queue: queue.Queue) -> None:
+        """Stage 5: embed nodes, one batch per page."""
+        while (item := nodes_queue.get()) is not _STOP:
+            url, documents, nodes = item
+            if self._cancelled.is_set():
+                continue
+            try:
+                embeddings = self.index._embed_model.get_text_embedding_batch(
+                    [
+                        node.get_content(metadata_mode=MetadataMode.EMBED)
+                        for node in nodes
+                    ]
+                )
+                for node, embedding in zip(nodes, embeddings):
+                    node.embedding = embedding
+                embedded_queue.put((url, documents, nodes))
+            except Exception as e:
+                logger.warning(f"Error embedding {url}: {e}", exc_info=True)
+                self._failed_urls[url] = str(e)
+        embedded_queue.put(_STOP)
+
+    def _upsert(self, embedded_queue: queue.Queue) -> None:
+        """Stage 6: upsert embedded nodes, the page is then queryable."""
+        while (item := embedded_queue.get()) is not _STOP:
+            url, documents, nodes = item
+            if self._cancelled.is_set():
+                continue
+            try:
+                if url in self._lastmods:
+                    self.index.vector_store._collection.delete(
+                        where={"file_name": f"{url_to_filename(url)}.md"}
+                    )
+                # Nodes already hold their embedding, the index does not embed them again
+                self.index.insert_nodes(nodes)
+                for document in documents:
+                    self.index.docstore.set_document_hash(document.id_, document.hash)
+                if self.on_documents is not None:
+                    self.on_documents(documents)
+                self._ingested_urls.append(url)
+                logger.info(f"Page ingested: {url}")
+            except Exception as e:
+                logger.warning(f"Error upserting {url}: {e}", exc_info=True)
+                self._failed_urls[url] = str(e)
+
+    def _is_up_to_date(self, url: str, lastmod: datetime | None) -> bool:
+        """
+        Whether a sitemap page is indexed, and not modified since its ingestion.
+        Without lastmod in the sitemap, any indexed page is considered up to date.
+        """
+        file_metadata = self.index.vector_store.client.get(
+            include=["metadatas"],
+            where={"file_name": f"{url_to_filename(url)}.md"},
+            limit=1,
+        )
+        if not file_metadata["ids"]:
+            return False
+        if lastmod is None:
+            return True
+        indexed_lastmod = file_metadata["metadatas"][0].get("lastmod")
+        return indexed_lastmod is not None and lastmod <= datetime.fromisoformat(
+            indexed_lastmod
+        )
+
+    def _is_indexed(self, file_name: str) -> bool:
+        file_metadata = self.index.vector_store.client.get(
+            include=[], where={"file_name": file_name}, limit=1
+        )
+        return bool(file_metadata["ids"])
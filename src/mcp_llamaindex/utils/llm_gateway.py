@@ -0,0 +1,149 @@
+import asyncio
+import time
+import weakref
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+import httpx
+from llama_index.core.base.llms.types import ChatMessage, ChatResponse
+from llama_index.core.llms.callbacks import llm_chat_callback
+from llama_index.llms.lmstudio import LMStudio
+from pydantic import PrivateAttr
+
+from mcp_llamaindex.utils.admission import (
+    DEFAULT_PRIORITY,
+    Gateway,
+    GatewayBusyError,  # noqa: F401 - re-exported, raised by LLM requests
+    GatewayTimeoutError,
+)
+from mcp_llamaindex.utils.metrics import MetricsRegistry, metrics
+
+# Priority and deadline (time.monotonic) of LLM requests made in the current context
+_request_options: ContextVar[tuple[int, float | None]] = ContextVar(
+    "llm_request_options", default=(DEFAULT_PRIORITY, None)
+)
+
+
+@contextmanager
+def llm_request_options(
+    priority: int = DEFAULT_PRIORITY, timeout: float | None = None
+) -> Iterator[None]:
+    """
+    Sets priority and deadline of LLM requests made within the block, including
+    by LlamaIndex query engines.
+
+    Args:
+        priority: lower is served first. Requests of the same priority are served FIFO.
+        timeout: seconds from now, after which requests fail with GatewayTimeoutError,
+            whether still queued or waiting for the LLM answer.
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    token = _request_options.set((priority, deadline))
+    try:
+        yield
+    finally:
+        _request_options.reset(token)
+
+
+class LLMGateway(Gateway):
+    """
+    Admission of LLM requests, see `Gateway`. Reported as `llm_*` metrics.
+    Shared by threads and event loops, which the LLM calls of LlamaIndex mix.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 2,
+        max_queue_size: int = 32,
+        registry: MetricsRegistry = metrics,
+    ):
+        super().__init__(
+            max_concurrency, max_queue_size, registry=registry, metrics_prefix="llm"
+        )
+
+
+class PooledLMStudio(LMStudio):
+    """
+    LM Studio LLM, with requests admitted by an LLMGateway, and keep-alive
+    HTTP connections shared between requests.
+    Priority and deadline of requests are set with `llm_request_options`.
+    """
+
+    _gateway: LLMGateway = PrivateAttr()
+    _client: httpx.Client = PrivateAttr()
+    # One async client per event loop, async connections can't be shared between loops
+    _async_clients: weakref.WeakKeyDictionary = PrivateAttr(
+        default_factory=weakref.WeakKeyDictionary
+    )
+
+    def __init__(self, gateway: LLMGateway | None = None, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._gateway = gateway or LLMGateway()
+        self._client = httpx.Client(limits=self._limits)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "PooledLMStudio"
+
+    @property
+    def gateway(self) -> LLMGateway:
+        return self._gateway
+
+    @property
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self._gateway.max_concurrency,
+            max_keepalive_connections=self._gateway.max_concurrency,
+        )
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if loop not in self._async_clients:
+            self._async_clients[loop] = httpx.AsyncClient(limits=self._limits)
+        return self._async_clients[loop]
+
+    def _timeout(self, deadline: float | None) -> httpx.Timeout:
+        """Request timeout, shortened to the remaining time before the deadline."""
+        timeout = self.request_timeout
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise GatewayTimeoutError("Deadline passed before sending the request.")
+            timeout = min(timeout, remaining)
+        return httpx.Timeout(timeout)
+
+    @llm_chat_callback()
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        priority, deadline = _request_options.get()
+        payload = self._create_payload_from_messages(messages, **kwargs)
+        with self._gateway.slot(priority, deadline):
+            try:
+                response = self._client.post(
+                    url=f"{self.base_url}/chat/completions",
+                    json=payload,
+                    timeout=self._timeout(deadline),
+                )
+            except httpx.TimeoutException as e:
+                raise GatewayTimeoutError(f"LLM request timed out: {e}") from e
+        response.raise_for_status()
+        return self._create_chat_response_from_http_response(response)
+
+    @llm_chat_callback()
+    async def achat(
+        self, messages: Sequence[ChatMessage], **kwargs: Any
+    ) -> ChatResponse:
+        priority, deadline = _request_options.get()
+        payload = self._create_payload_from_messages(messages, **kwargs)
+        async with self._gateway.aslot(priority, deadline):
+            try:
+                response = await self._get_async_client().post(
+                    url=f"{self.base_url}/chat/completions",
+                    json=payload,
+                    timeout=self._timeout(deadline),
+                )
+            except httpx.TimeoutException as e:
+                raise GatewayTimeoutError(f"LLM request timed out: {e}") from e
+        response.raise_for_status()
+        return self._create_chat_response_from_http_response(response)
@@ -0,0 +1,225 @@
+"""
+Maintenance of a persistent Chroma collection: statistics, and compaction.
+
+Chroma only marks deleted embeddings in its HNSW index, which keeps their vectors and links:
+after many updates, the index files grow and searches slow down. Compaction copies the live
+embeddings into a new collection, swapped in under the same name. The old one is kept for
+the queries still running on it, and its space reclaimed on the following compaction.
+"""
+
+import logging
+import shutil
+import sqlite3
+from collections.abc import Callable
+from contextlib import closing
+from pathlib import Path
+from typing import Any
+
+import chromadb
+
+from mcp_llamaindex.utils.snapshot import BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Collection of the index, in its persistent Chroma store
+CHROMA_COLLECTION = "markdown_rag_collection"
+CHROMA_SQLITE_FILE = "chroma.sqlite3"
+CHROMA_FTS_TABLE = "embedding_fulltext_search"
+# Vector segment file holding one entry per HNSW element, deleted ones included
+HNSW_LENGTH_FILE = "length.bin"
+
+
+def dir_size(path: str | Path) -> int:
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+
+def scan_collection(collection) -> tuple[set[str], set[str]]:
+    """File names and source document ids of the nodes of a collection, read by batches."""
+    file_names, ref_doc_ids = set(), set()
+    offset = 0
+    while batch := collection.get(
+        include=["metadatas"], limit=BATCH_SIZE, offset=offset
+    )["metadatas"]:
+        for metadata in batch:
+            metadata = metadata or {}
+            if metadata.get("file_name"):
+                file_names.add(metadata["file_name"])
+            if metadata.get("ref_doc_id"):
+                ref_doc_ids.add(metadata["ref_doc_id"])
+        offset += len(batch)
+    return file_names, ref_doc_ids
+
+
+def _vector_segments(persist_dir: Path) -> dict[str, str]:
+    """Collection id of each vector segment (HNSW index directory) of a persistent store."""
+    db_path = persist_dir / CHROMA_SQLITE_FILE
+    if not db_path.exists():
+        return {}
+    with closing(sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)) as db:
+        rows = db.execute(
+            "SELECT id, collection FROM segments WHERE scope = 'VECTOR'"
+        ).fetchall()
+    return dict(rows)
+
+
+def orphan_segment_dirs(persist_dir: str | Path) -> list[Path]:
+    """Vector segment directories left behind by deleted collections."""
+    persist_dir = Path(persist_dir)
+    segments = _vector_segments(persist_dir)
+    return [
+        path
+        for path in persist_dir.iterdir()
+        if path.is_dir()
+        and (path / HNSW_LENGTH_FILE).exists()
+        and path.name not in segments
+    ]
+
+
+def collection_disk_stats(persist_dir: str | Path, collection) -> dict[str, Any]:
+    """
+    Disk usage of a collection in a persistent store, and the number of HNSW elements
+    its index holds. Elements beyond the collection count are deleted embeddings
+    (or, with fewer, embeddings not flushed to disk yet).
+    """
+    persist_dir = Path(persist_dir)
+    segment_ids = [
+        segment_id
+        for segment_id, collection_id in _vector_segments(persist_dir).items()
+        if collection_id == str(collection.id)
+    ]
+    segment_dir = persist_dir / segment_ids[0] if segment_ids else None
+    hnsw_elements = None
+    if segment_dir is not None and (segment_dir / HNSW_LENGTH_FILE).exists():
+        hnsw_elements = (segment_dir / HNSW_LENGTH_FILE).stat().st_size // 4
+    orphans = orphan_segment_dirs(persist_dir)
+    sqlite_path = persist_dir / CHROMA_SQLITE_FILE
+    return {
+        "hnsw_elements": hnsw_elements,
+        "hnsw_index_bytes": dir_size(segment_dir) if segment_dir else 0,
+        "sqlite_bytes": sqlite_path.stat().st_size if sqlite_path.exists() else 0,
+        "orphan_segment_dirs": len(orphans),
+        "orphan_segment_bytes": sum(dir_size(path) for path in orphans),
+    }
+
+
+def vacuum_sqlite(db_path: str | Path) -> None:
+    """
+    Merges the full-text search index of Chroma documents, which bulk inserts leave
+    fragmented, then rewrites the SQLite file, where deleted rows only left free pages.
+    """
+    with closing(sqlite3.connect(db_path, timeout=60)) as db:
+        try:
+            db.execute(
+                f"INSERT INTO {CHROMA_FTS_TABLE}({CHROMA_FTS_TABLE}) VALUES('optimize')"
+            )
+            db.commit()
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Could not optimize the full-text search index: {e}")
+        db.execute("VACUUM")
+
+
+def copy_collection(source, target) -> int:
+    """Copies every node of a collection into another one, by batches. Returns their number."""
+    offset = 0
+    while True:
+        batch = source.get(
+            include=["documents", "metadatas", "embeddings"],
+            limit=BATCH_SIZE,
+            offset=offset,
+        )
+        if not batch["ids"]:
+            return offset
+        target.add(
+            ids=batch["ids"],
+            embeddings=batch["embeddings"],
+            documents=batch["documents"],
+            metadatas=batch["metadatas"],
+        )
+        offset += len(batch["ids"])
+
+
+def compact_collection(
+    persist_dir: str | Path,
+    name: str,
+    swap: Callable[[Any], None] | None = None,
+    hnsw: dict[str, Any] | None = None,
+) -> int:
+    """
+    Rebuilds a collection of a persistent store with its live embeddings only,
+    under the same name and HNSW configuration, and reclaims the space of the collection
+    replaced by the previous compaction.
+    HNSW parameters in `hnsw` (Chroma names) replace those of the old collection.
+
+    The old collection stays queryable while the new one is built. Once renamed, the new
+    collection is passed to `swap`, to rebuild indexes on it. The old one is kept, as
+    `{name}_old`, for the queries still running on it, and only dropped on the following
+    compaction (or by `drop_replaced_collection`).
+    Writes to the collection must wait for the compaction to finish.
+
+    Returns:
+        number of nodes of the compacted collection.
+    """
+    persist_dir = Path(persist_dir)
+    client = chromadb.PersistentClient(path=persist_dir)
+    compacted_name, old_name = f"{name}_compacted", f"{name}_old"
+    # Collections left by an interrupted compaction
+    names = {collection.name for collection in client.list_collections()}
+    if compacted_name in names:
+        client.delete_collection(compacted_name)
+    if old_name in names:
+        if name in names:
+            client.delete_collection(old_name)
+        else:
+            client.get_collection(old_name).modify(name=name)
+
+    collection = client.get_collection(name)
+    configuration = (collection.configuration_json.get("hnsw") or {}) | (hnsw or {})
+    compacted = client.create_collection(
+        compacted_name,
+        configuration={
+            "hnsw": {
+                key: value for key, value in configuration.items() if value is not None
+            }
+        },
+        metadata=collection.metadata,
+    )
+    try:
+        nb_nodes = copy_collection(collection, compacted)
+    except Exception:
+        client.delete_collection(compacted_name)
+        raise
+
+    collection.modify(name=old_name)
+    try:
+        compacted.modify(name=name)
+    except Exception:
+        collection.modify(name=name)
+        raise
+    if swap is not None:
+        swap(compacted)
+
+    for path in orphan_segment_dirs(persist_dir):
+        shutil.rmtree(path, ignore_errors=True)
+    vacuum_sqlite(persist_dir / CHROMA_SQLITE_FILE)
+    logger.info(f"Compacted collection '{name}': {nb_nodes} nodes.")
+    return nb_nodes
+
+
+def drop_replaced_collection(persist_dir: str | Path, name: str) -> bool:
+    """
+    Deletes the collection replaced by the last compaction of `name`, and reclaims its
+    space. Queries must no longer run on it.
+
+    Returns:
+        whether there was a replaced collection.
+    """
+    persist_dir = Path(persist_dir)
+    client = chromadb.PersistentClient(path=persist_dir)
+    names = {collection.name for collection in client.list_collections()}
+    if f"{name}_old" not in names or name not in names:
+        return False
+    client.delete_collection(f"{name}_old")
+    for path in orphan_segment_dirs(persist_dir):
+        shutil.rmtree(path, ignore_errors=True)
+    vacuum_sqlite(persist_dir / CHROMA_SQLITE_FILE)
+    return True
@@ -0,0 +1,264 @@
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from fastmcp.server.middleware import CallNext, Middleware, MiddlewareContext
+from llama_index.core.callbacks import CBEventType, EventPayload
+from llama_index.core.callbacks.base_handler import BaseCallbackHandler
+from llama_index.core.callbacks.token_counting import get_llm_token_counts
+from llama_index.core.utilities.token_counting import TokenCounter
+
+METRICS_PREFIX = "mcp_llamaindex"
+QUANTILES = (0.5, 0.95, 0.99)
+
+# LlamaIndex callback events, mapped to pipeline stages
+EVENT_STAGES = {
+    CBEventType.CHUNKING: "chunk",
+    CBEventType.EMBEDDING: "embed",
+    CBEventType.RETRIEVE: "retrieve",
+    CBEventType.SYNTHESIZE: "synthesize",
+    CBEventType.LLM: "llm",
+    CBEventType.QUERY: "query",
+}
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    """
+    Latency distribution over the last `max_samples` observations.
+    Count and sum cover every observation since startup.
+    """
+
+    def __init__(self, max_samples: int = 2048):
+        self._samples: deque[float] = deque(maxlen=max_samples)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self._samples.append(value)
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        if not self._samples:
+            return 0.0
+        samples = sorted(self._samples)
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+
+class MetricsRegistry:
+    """Thread safe registry of latency histograms, counters and gauges, with labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: dict[tuple[str, Labels], Histogram] = {}
+        self._counters: dict[tuple[str, Labels], float] = {}
+        self._gauges: dict[tuple[str, Labels], float] = {}
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._histograms.setdefault(key, Histogram()).observe(value)
+
+    def increment(self, name: str, value: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        """Observe the duration of the block, in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    def snapshot(self) -> dict[str, list[dict[str, Any]]]:
+        """Current metrics, as JSON serializable data."""
+        with self._lock:
+            histograms = [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                    **{f"p{int(q * 100)}": histogram.quantile(q) for q in QUANTILES},
+                }
+                for (name, labels), histogram in sorted(self._histograms.items())
+            ]
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            gauges = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._gauges.items())
+            ]
+        return {"histograms": histograms, "counters": counters, "gauges": gauges}
+
+    def to_prometheus(self) -> str:
+        """Current metrics, in Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        declared = set()
+        for histogram in snapshot["histograms"]:
+            name = f"{METRICS_PREFIX}_{histogram['name']}"
+            if name not in declared:
+                lines.append(f"# TYPE {name} summary")
+                declared.add(name)
+            for q in QUANTILES:
+                labels = _format_labels({**histogram["labels"], "quantile": str(q)})
+                lines.append(f"{name}{labels} {histogram[f'p{int(q * 100)}']}")
+            labels = _format_labels(histogram["labels"])
+            lines.append(f"{name}_sum{labels} {histogram['sum']}")
+            lines.append(f"{name}_count{labels} {histogram['count']}")
+        for metric_type in ("counter", "gauge"):
+            for metric in snapshot[f"{metric_type}s"]:
+                name = f"{METRICS_PREFIX}_{metric['name']}"
+                if name not in declared:
+                    lines.append(f"# TYPE {name} {metric_type}")
+                    declared.add(name)
+                lines.append(
+                    f"{name}{_format_labels(metric['labels'])} {metric['value']}"
+                )
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str | Path) -> None:
+        """
+        Writes metrics for the node_exporter textfile collector.
+        The file is replaced atomically, so that node_exporter never reads a partial file.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(self.to_prometheus(), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = {
+        key: str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        for key, value in labels.items()
+    }
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped.items()) + "}"
+
+
+metrics = MetricsRegistry()
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    LlamaIndex callback handler timing pipeline stages (chunk, embed, retrieve,
+    synthesize, llm, query), and counting LLM and embedding tokens.
+    """
+
+    def __init__(self, registry: MetricsRegistry = metrics):
+        super().__init__(event_starts_to_ignore=[], event_ends_to_ignore=[])
+        self.registry = registry
+        self._starts: dict[str, float] = {}
+        self._token_counter = TokenCounter()
+
+    def on_event_start(
+        self,
+        event_type: CBEventType,
+        payload: dict[str, Any] | None = None,
+        event_id: str = "",
+        parent_id: str = "",
+        **kwargs: Any,
+    ) -> str:
+        if event_type in EVENT_STAGES:
+            self._starts[event_id] = time.perf_counter()
+        return event_id
+
+    def on_event_end(
+        self,
+        event_type: CBEventType,
+        payload: dict[str, Any] | None = None,
+        event_id: str = "",
+        **kwargs: Any,
+    ) -> None:
+        start = self._starts.pop(event_id, None)
+        if start is None:
+            return
+        self.registry.observe(
+            "stage_seconds",
+            time.perf_counter() - start,
+            stage=EVENT_STAGES[event_type],
+        )
+
+        payload = payload or {}
+        if event_type == CBEventType.LLM:
+            token_counts = get_llm_token_counts(self._token_counter, payload)
+            self.registry.increment(
+                "tokens_total", token_counts.prompt_token_count, kind="prompt"
+            )
+            self.registry.increment(
+                "tokens_total", token_counts.completion_token_count, kind="completion"
+            )
+        elif event_type == CBEventType.EMBEDDING:
+            self.registry.increment(
+                "tokens_total",
+                sum(
+                    self._token_counter.get_string_tokens(chunk)
+                    for chunk in payload.get(EventPayload.CHUNKS, [])
+                ),
+                kind="embedding",
+            )
+
+    def start_trace(self, trace_id: str | None = None) -> None:
+        pass
+
+    def end_trace(
+        self,
+        trace_id: str | None = None,
+        trace_map: dict[str, list[str]] | None = None,
+    ) -> None:
+        pass
+
+
+class MetricsMiddleware(Middleware):
+    """
+    FastMCP middleware timing every tool call, and counting failed ones.
+    Optionally refreshes a Prometheus textfile after each call.
+    """
+
+    def __init__(
+        self, registry: MetricsRegistry = metrics, textfile: str | Path | None = None
+    ):
+        self.registry = registry
+        self.textfile = textfile
+
+    async def on_call_tool(
+        self, context: MiddlewareContext, call_next: CallNext
+    ) -> Any:
+        tool = context.message.name
+        try:
+            with self.registry.timer("tool_seconds", tool=tool):
+                return await call_next(context)
+        except Exception:
+            self.registry.increment("tool_errors_total", tool=tool)
+            raise
+        finally:
+            self.registry.increment("tool_calls_total", tool=tool)
+            if self.textfile:
+                self.registry.write_textfile(self.textfile)
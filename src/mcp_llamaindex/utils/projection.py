@@ -0,0 +1,151 @@
+from pathlib import Path
+from typing import Any, Literal
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from pydantic import Field, PrivateAttr, SerializeAsAny
+
+ProjectionMethod = Literal["pca", "truncate"]
+# Projection of the embeddings of an index, next to it in `persist_dir`
+PROJECTION_FILE = "projection.npz"
+
+
+def projected_model_name(model_name: str, method: ProjectionMethod, dim: int) -> str:
+    """Name of projected embeddings, e.g. "BAAI/bge-large-en-v1.5+pca256"."""
+    return f"{model_name}+{method}{dim}"
+
+
+class EmbeddingProjection:
+    """
+    Linear projection of embeddings to `dim` dimensions, followed by L2 normalization.
+
+    "truncate" keeps the first dimensions (Matryoshka models are trained for it),
+    "pca" projects on the principal components of a sample of embeddings.
+    """
+
+    def __init__(
+        self,
+        method: ProjectionMethod,
+        dim: int,
+        mean: np.ndarray | None = None,
+        components: np.ndarray | None = None,
+    ):
+        if method == "pca" and (mean is None or components is None):
+            raise ValueError("PCA projection needs a mean and components, see `fit`.")
+        self.method = method
+        self.dim = dim
+        self.mean = mean
+        self.components = components
+
+    @classmethod
+    def fit(
+        cls, embeddings: np.ndarray, dim: int, method: ProjectionMethod = "pca"
+    ) -> "EmbeddingProjection":
+        """Fits the projection on a sample of embeddings, of at least `dim` of them for PCA."""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if dim > embeddings.shape[1]:
+            raise ValueError(
+                f"Cannot project {embeddings.shape[1]} dimensions to {dim}."
+            )
+        if method == "truncate":
+            return cls(method, dim)
+        if len(embeddings) < dim:
+            raise ValueError(
+                f"PCA to {dim} dimensions needs at least {dim} sample embeddings, "
+                f"got {len(embeddings)}."
+            )
+        mean = embeddings.mean(axis=0)
+        # Rows of vt are the principal axes, by decreasing variance
+        _, _, vt = np.linalg.svd(embeddings - mean, full_matrices=False)
+        return cls(method, dim, mean=mean, components=vt[:dim])
+
+    def apply(self, embeddings: np.ndarray) -> np.ndarray:
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if self.method == "truncate":
+            projected = embeddings[:, : self.dim]
+        else:
+            projected = (embeddings - self.mean) @ self.components.T
+        norms = np.linalg.norm(projected, axis=1, keepdims=True)
+        return projected / np.where(norms == 0, 1.0, norms)
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        arrays = {
+            "projection_method": np.array(self.method),
+            "projection_dim": np.array(self.dim),
+        }
+        if self.method == "pca":
+            arrays |= {
+                "projection_mean": self.mean,
+                "projection_components": self.components,
+            }
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Any) -> "EmbeddingProjection":
+        return cls(
+            str(arrays["projection_method"]),
+            int(arrays["projection_dim"]),
+            mean=arrays.get("projection_mean"),
+            components=arrays.get("projection_components"),
+        )
+
+    def save(self, path: str | Path) -> None:
+        with Path(path).open("wb") as f:
+            np.savez(f, **self.to_arrays())
+
+    @classmethod
+    def load(cls, path: str | Path) -> "EmbeddingProjection":
+        with np.load(path) as arrays:
+            return cls.from_arrays(dict(arrays))
+
+
+class ProjectedEmbedding(BaseEmbedding):
+    """
+    Embedding model whose texts and queries embeddings are both projected,
+    so that the index stores and searches smaller vectors.
+    """
+
+    base: SerializeAsAny[BaseEmbedding] = Field(description="The full size model.")
+    _projection: EmbeddingProjection = PrivateAttr()
+
+    def __init__(
+        self, base: BaseEmbedding, projection: EmbeddingProjection, **kwargs: Any
+    ):
+        super().__init__(
+            base=base,
+            model_name=projected_model_name(
+                base.model_name, projection.method, projection.dim
+            ),
+            embed_batch_size=base.embed_batch_size,
+            **kwargs,
+        )
+        self._projection = projection
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ProjectedEmbedding"
+
+    @property
+    def projection(self) -> EmbeddingProjection:
+        return self._projection
+
+    def _project(self, embeddings: list[list[float]]) -> list[list[float]]:
+        return self._projection.apply(np.array(embeddings)).tolist()
+
+    def _get_query_embedding(self, query: str) -> list[float]:
+        return self._project([self.base._get_query_embedding(query)])[0]
+
+    def _get_text_embedding(self, text: str) -> list[float]:
+        return self._project([self.base._get_text_embedding(text)])[0]
+
+    def _get_text_embeddings(self, texts: list[str]) -> list[list[float]]:
+        return self._project(self.base._get_text_embeddings(texts))
+
+    async def _aget_query_embedding(self, query: str) -> list[float]:
+        return self._project([await self.base._aget_query_embedding(query)])[0]
+
+    async def _aget_text_embedding(self, text: str) -> list[float]:
+        return self._project([await self.base._aget_text_embedding(text)])[0]
+
+    async def _aget_text_embeddings(self, texts: list[str]) -> list[list[float]]:
+        return self._project(await self.base._aget_text_embeddings(texts))
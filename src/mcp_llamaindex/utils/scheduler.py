@@ -0,0 +1,221 @@
+import asyncio
+import functools
+import inspect
+import math
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from fastmcp.exceptions import ToolError
+from pydantic import BaseModel, Field
+
+from mcp_llamaindex.utils.admission import (
+    Gateway,
+    GatewayBusyError,
+    GatewayTimeoutError,
+)
+from mcp_llamaindex.utils.llm_gateway import llm_request_options
+from mcp_llamaindex.utils.metrics import MetricsRegistry, metrics
+
+
+class ToolLane(BaseModel):
+    """Tools sharing a concurrency limit, a waiting queue and a deadline."""
+
+    tools: list[str]
+    max_concurrency: int = Field(1, ge=1)
+    max_queue_size: int = Field(
+        8, ge=0, description="Calls waiting beyond are rejected as server busy."
+    )
+    timeout: float | None = Field(
+        None,
+        gt=0,
+        description="Seconds before a call is cancelled, waiting included. None for no limit.",
+    )
+    cancel_grace: float = Field(
+        5,
+        ge=0,
+        description="Seconds a cancelled call is given to stop, before it is answered.",
+    )
+
+
+# Cheap calls keep their own lane, so that they stay fast while ingestion saturates the box
+DEFAULT_TOOL_LANES = {
+    "cheap": ToolLane(
+        tools=["get_indexed_files", "retrieve_docs"],
+        max_concurrency=8,
+        max_queue_size=64,
+        timeout=30,
+    ),
+    "query": ToolLane(
+        tools=["query_docs", "query_docs_batch", "query_docs_with_client_llm_sampling"],
+        max_concurrency=2,
+        max_queue_size=16,
+        timeout=180,
+    ),
+    "ingest": ToolLane(
+        tools=[
+            "download_web_page",
+            "crawl_and_ingest",
+            "add_markdown_file",
+            "update_markdown_file",
+            "delete_markdown_files",
+            "export_snapshot",
+            "import_snapshot",
+            "get_index_stats",
+            "compact_index",
+        ],
+        max_concurrency=1,
+        max_queue_size=4,
+        timeout=1800,
+    ),
+}
+
+
+# Set once the running tool call is cancelled, for tools running in worker threads to stop
+_cancel_event: ContextVar[threading.Event | None] = ContextVar(
+    "tool_cancel_event", default=None
+)
+
+
+class ToolCancelledError(Exception):
+    """Raised by a tool stopping early, as its call was cancelled."""
+
+
+def cancel_event() -> threading.Event:
+    """
+    Event set once the running tool call is cancelled. Threads started by the tool
+    don't inherit it: get it in the tool thread, and pass it to them.
+    Never set out of a scheduled call.
+    """
+    event = _cancel_event.get()
+    return event if event is not None else threading.Event()
+
+
+def raise_if_cancelled() -> None:
+    """Stops a tool with `ToolCancelledError` if its call was cancelled."""
+    if cancel_event().is_set():
+        raise ToolCancelledError("Tool call cancelled.")
+
+
+@contextmanager
+def _cancellable(event: threading.Event) -> Iterator[None]:
+    token = _cancel_event.set(event)
+    try:
+        yield
+    finally:
+        _cancel_event.reset(token)
+
+
+class ToolScheduler:
+    """
+    Runs tools in worker threads, admitted by lanes. Async tools run in the event loop.
+
+    Each lane runs at most `max_concurrency` calls at once. When `max_queue_size` calls
+    are already waiting, new ones are rejected with a "server busy" error and a retry hint.
+    A call past its lane timeout is cancelled: coroutines are cancelled, and tools in
+    worker threads are asked to stop through `cancel_event`, which long tools check between
+    steps. Their LLM requests fail from then on. The call is answered once it stopped, or
+    after `cancel_grace` seconds, with an error telling whether it is still running.
+    Its lane slot is released when it really finishes.
+    Tools out of any lane run in a worker thread, without limit.
+    """
+
+    def __init__(self, lanes: dict[str, ToolLane], registry: MetricsRegistry = metrics):
+        self.lanes = lanes
+        self.registry = registry
+        self._gateways = {
+            name: Gateway(
+                lane.max_concurrency,
+                lane.max_queue_size,
+                registry=registry,
+                metrics_prefix="tool_lane",
+                lane=name,
+            )
+            for name, lane in lanes.items()
+        }
+        self._tool_lanes = {
+            tool: name for name, lane in lanes.items() for tool in lane.tools
+        }
+        # Moving average of call durations by lane, for retry hints
+        self._durations: dict[str, float] = {}
+
+    def wrap(self, fn: Callable) -> Callable:
+        """Async version of a tool function, with the same name, signature and docstring."""
+
+        @functools.wraps(fn)
+        async def scheduled(*args: Any, **kwargs: Any) -> Any:
+            return await self.run(fn, *args, **kwargs)
+
+        return scheduled
+
+    def retry_after(self, lane_name: str) -> int:
+        """Estimated seconds before a call of the lane could be admitted."""
+        gateway = self._gateways[lane_name]
+        duration = self._durations.get(lane_name, 1.0)
+        return max(
+            1, math.ceil(duration * (gateway.queue_depth + 1) / gateway.max_concurrency)
+        )
+
+    async def run(self, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        tool = fn.__name__
+        lane_name = self._tool_lanes.get(tool)
+        if lane_name is None:
+            if inspect.iscoroutinefunction(fn):
+                return await fn(*args, **kwargs)
+            return await asyncio.to_thread(fn, *args, **kwargs)
+
+        lane = self.lanes[lane_name]
+        gateway = self._gateways[lane_name]
+        deadline = time.monotonic() + lane.timeout if lane.timeout else None
+        try:
+            ticket = await gateway.aacquire(deadline=deadline)
+        except GatewayBusyError:
+            raise ToolError(
+                f"Server busy: too many '{lane_name}' calls waiting. "
+                f"Retry after {self.retry_after(lane_name)} seconds."
+            ) from None
+        except GatewayTimeoutError:
+            raise ToolError(
+                f"'{tool}' cancelled: still waiting after {lane.timeout} seconds. "
+                f"Retry after {self.retry_after(lane_name)} seconds."
+            ) from None
+
+        start = time.monotonic()
+        remaining = None if deadline is None else deadline - start
+        cancelled = threading.Event()
+        # LLM requests of the call share its deadline, the task gets a copy of the context
+        with llm_request_options(timeout=remaining), _cancellable(cancelled):
+            if inspect.iscoroutinefunction(fn):
+                task = asyncio.ensure_future(fn(*args, **kwargs))
+            else:
+                task = asyncio.ensure_future(asyncio.to_thread(fn, *args, **kwargs))
+
+        def on_done(_: asyncio.Future) -> None:
+            duration = time.monotonic() - start
+            previous = self._durations.get(lane_name, duration)
+            self._durations[lane_name] = 0.8 * previous + 0.2 * duration
+            gateway.release(ticket)
+
+        task.add_done_callback(on_done)
+        try:
+            # Shielded, the slot stays held until the thread really finishes
+            return await asyncio.wait_for(asyncio.shield(task), remaining)
+        except TimeoutError:
+            cancelled.set()
+            if inspect.iscoroutinefunction(fn):
+                task.cancel()  # Unlike threads, coroutines can be stopped right away
+            self.registry.increment("tool_timeouts_total", tool=tool)
+
+        done, _ = await asyncio.wait({task}, timeout=lane.cancel_grace)
+        if not done:
+            raise ToolError(
+                f"'{tool}' timed out after {lane.timeout} seconds, and is still stopping. "
+                f"Retry after {self.retry_after(lane_name)} seconds."
+            )
+        if task.cancelled() or isinstance(task.exception(), ToolCancelledError):
+            raise ToolError(f"'{tool}' cancelled after {lane.timeout} seconds.")
+        # Finished while stopping
+        return task.result()
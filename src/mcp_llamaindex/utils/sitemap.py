@@ -0,0 +1,104 @@
+import gzip
+import logging
+import xml.etree.ElementTree as ET
+from datetime import UTC, datetime
+from urllib.parse import urljoin
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+def _local_name(tag: str) -> str:
+    """Strips the XML namespace of a tag, e.g. '{http://...}urlset' -> 'urlset'."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_lastmod(value: str | None) -> datetime | None:
+    """Parses a sitemap `lastmod` (W3C datetime) into a timezone aware datetime.
+
+    Args:
+        value: the lastmod value, e.g. "2024-05-01" or "2024-05-01T10:00:00+02:00".
+
+    Returns:
+        the datetime, UTC if no timezone is given. None if missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        lastmod = datetime.fromisoformat(value.strip())
+    except ValueError:
+        logger.warning(f"Invalid sitemap lastmod: {value}")
+        return None
+    if lastmod.tzinfo is None:
+        lastmod = lastmod.replace(tzinfo=UTC)
+    return lastmod
+
+
+def find_sitemaps(base_url: str) -> list[str]:
+    """Lists the sitemaps of a website from its robots.txt.
+
+    Args:
+        base_url: any URL of the website.
+
+    Returns:
+        the sitemap URLs declared in robots.txt, or the conventional /sitemap.xml if none.
+    """
+    robots_url = urljoin(base_url, "/robots.txt")
+    sitemaps = []
+    try:
+        response = requests.get(robots_url)
+        response.raise_for_status()
+        for line in response.text.splitlines():
+            key, _, value = line.partition(":")
+            if key.strip().lower() == "sitemap" and value.strip():
+                sitemaps.append(value.strip())
+    except requests.RequestException as e:
+        logger.info(f"No robots.txt found at {robots_url}: {e}")
+
+    return sitemaps or [urljoin(base_url, "/sitemap.xml")]
+
+
+def read_sitemaps(
+    sitemap_urls: list[str], max_sitemaps: int = 100
+) -> dict[str, datetime | None]:
+    """Reads sitemaps, following nested sitemap indexes, plain or gzipped.
+
+    Args:
+        sitemap_urls: URLs of the sitemaps to read.
+        max_sitemaps: maximum number of sitemap files to fetch, including nested ones.
+
+    Returns:
+        mapping of page URLs to their lastmod (None if not given).
+    """
+    pages = {}
+    to_read = list(sitemap_urls)
+    read = set()
+    while to_read and len(read) < max_sitemaps:
+        sitemap_url = to_read.pop(0)
+        if sitemap_url in read:
+            continue
+        read.add(sitemap_url)
+
+        try:
+            response = requests.get(sitemap_url)
+            response.raise_for_status()
+            content = response.content
+            if content[:2] == b"\x1f\x8b":  # gzip magic number, whatever the extension
+                content = gzip.decompress(content)
+            root = ET.fromstring(content)
+        except (requests.RequestException, OSError, ET.ParseError) as e:
+            logger.warning(f"Could not read sitemap {sitemap_url}: {e}")
+            continue
+
+        for entry in root:
+            fields = {_local_name(child.tag): (child.text or "") for child in entry}
+            loc = fields.get("loc", "").strip()
+            if not loc:
+                continue
+            if _local_name(root.tag) == "sitemapindex":
+                to_read.append(loc)
+            else:
+                pages[loc] = parse_lastmod(fields.get("lastmod"))
+
+    return pages
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import logging
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 1
+# Below Chroma maximum batch size (5461 with SQLite)
+BATCH_SIZE = 5000
+
+
+def _pack_strings(values: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Packs strings as one UTF-8 buffer, and the offsets of each string in it."""
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_strings(buffer: np.ndarray, offsets: np.ndarray) -> list[str]:
+    data = buffer.tobytes()
+    return [
+        data[start:end].decode("utf-8")
+        for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())
+    ]
+
+
+def _checksum(array: np.ndarray) -> str:
+    return hashlib.sha256(np.ascontiguousarray(array).tobytes()).hexdigest()
+
+
+def export_collection(
+    collection,
+    path: str | Path,
+    manifest_extra: dict[str, Any] | None = None,
+    extra_arrays: dict[str, np.ndarray] | None = None,
+) -> dict[str, Any]:
+    """
+    Writes every node of a Chroma collection (ids, text, metadata and embedding)
+    in one compressed npz file, with a manifest holding counts and checksums.
+
+    Strings are stored as columns of UTF-8 buffers and offsets, embeddings as a float32 matrix.
+
+    Args:
+        collection: the Chroma collection to export.
+        path: the snapshot file to write.
+        manifest_extra: additional manifest entries, e.g. the embedding model name.
+        extra_arrays: additional arrays, e.g. the embedding projection, see `read_arrays`.
+
+    Returns:
+        the snapshot manifest.
+    """
+    ids, documents, metadatas, embeddings = [], [], [], []
+    offset = 0
+    while True:
+        batch = collection.get(
+            include=["documents", "metadatas", "embeddings"],
+            limit=BATCH_SIZE,
+            offset=offset,
+        )
+        if not batch["ids"]:
+            break
+        ids += batch["ids"]
+        documents += [document or "" for document in batch["documents"]]
+        metadatas += [json.dumps(metadata or {}) for metadata in batch["metadatas"]]
+        embeddings.append(np.asarray(batch["embeddings"], dtype=np.float32))
+        offset += len(batch["ids"])
+
+    arrays = {
+        "embeddings": np.concatenate(embeddings)
+        if embeddings
+        else np.zeros((0, 0), dtype=np.float32)
+    }
+    arrays |= extra_arrays or {}
+    for name, values in [
+        ("ids", ids),
+        ("documents", documents),
+        ("metadatas", metadatas),
+    ]:
+        arrays[f"{name}_buffer"], arrays[f"{name}_offsets"] = _pack_strings(values)
+
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "created_at": datetime.now(UTC).isoformat(),
+        "collection": collection.name,
+        "count": len(ids),
+        "embed_dim": int(arrays["embeddings"].shape[1]) if ids else 0,
+        "checksums": {name: _checksum(array) for name, array in arrays.items()},
+        **(manifest_extra or {}),
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("wb") as f:
+        np.savez_compressed(
+            f,
+            manifest=np.frombuffer(
+                json.dumps(manifest).encode("utf-8"), dtype=np.uint8
+            ),
+            **arrays,
+        )
+    logger.info(f"Snapshot of {len(ids)} nodes written to {path}.")
+    return manifest
+
+
+def read_manifest(path: str | Path) -> dict[str, Any]:
+    with np.load(path) as snapshot:
+        return json.loads(snapshot["manifest"].tobytes())
+
+
+def read_arrays(path: str | Path, prefix: str) -> dict[str, np.ndarray]:
+    """Arrays of a snapshot whose names start with `prefix`, checksums verified."""
+    with np.load(path) as snapshot:
+        manifest = json.loads(snapshot["manifest"].tobytes())
+        arrays = {
+            name: snapshot[name]
+            for name in manifest["checksums"]
+            if name.startswith(prefix)
+        }
+    for name, array in arrays.items():
+        if _checksum(array) != manifest["checksums"][name]:
+            raise ValueError(f"Snapshot '{path}' is corrupted: bad checksum of {name}.")
+    return arrays
+
+
+def import_collection(collection, path: str | Path) -> dict[str, Any]:
+    """
+    Bulk loads a snapshot written by `export_collection` into a Chroma collection.
+    Checksums are verified before anything is written.
+
+    Args:
+        collection: the Chroma collection to load nodes into.
+        path: the snapshot file.
+
+    Returns:
+        the snapshot manifest.
+    """
+    with np.load(path) as snapshot:
+        manifest = json.loads(snapshot["manifest"].tobytes())
+        if manifest["format_version"] > SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(
+                f"Snapshot format {manifest['format_version']} not supported."
+            )
+        arrays = {name: snapshot[name] for name in manifest["checksums"]}
+
+    for name, array in arrays.items():
+        if _checksum(array) != manifest["checksums"][name]:
+            raise ValueError(f"Snapshot '{path}' is corrupted: bad checksum of {name}.")
+
+    ids = _unpack_strings(arrays["ids_buffer"], arrays["ids_offsets"])
+    documents = _unpack_strings(arrays["documents_buffer"], arrays["documents_offsets"])
+    metadatas = [
+        json.loads(metadata) or None
+        for metadata in _unpack_strings(
+            arrays["metadatas_buffer"], arrays["metadatas_offsets"]
+        )
+    ]
+    embeddings = arrays["embeddings"]
+    for start in range(0, len(ids), BATCH_SIZE):
+        end = start + BATCH_SIZE
+        collection.add(
+            ids=ids[start:end],
+            embeddings=embeddings[start:end],
+            metadatas=metadatas[start:end],
+            documents=documents[start:end],
+        )
+    logger.info(f"Snapshot of {len(ids)} nodes loaded from {path}.")
+    return manifest
@@ -0,0 +1,80 @@
+import asyncio
+from typing import Any, Literal
+
+from llama_index.core.async_utils import asyncio_run
+from llama_index.core.response_synthesizers import (
+    BaseSynthesizer,
+    CompactAndRefine,
+    Refine,
+    TreeSummarize,
+)
+
+ResponseMode = Literal["compact", "refine", "tree_summarize", "async_tree_summarize"]
+
+
+class ConcurrentTreeSummarize(TreeSummarize):
+    """
+    Tree summarize, with chunk summaries of each level dispatched concurrently to the LLM,
+    at most `max_concurrency` at once, then merged into the next level.
+
+    Unlike `TreeSummarize(use_async=True)`, the number of simultaneous LLM requests
+    is bounded, so that a local LLM server is not flooded. Streaming and structured
+    outputs are not supported.
+    """
+
+    def __init__(self, max_concurrency: int = 4, **kwargs: Any) -> None:
+        super().__init__(use_async=True, **kwargs)
+        self._max_concurrency = max_concurrency
+
+    def get_response(
+        self, query_str: str, text_chunks: list[str], **response_kwargs: Any
+    ) -> str:
+        return asyncio_run(
+            self.aget_response(query_str, text_chunks, **response_kwargs)
+        )
+
+    async def aget_response(
+        self, query_str: str, text_chunks: list[str], **response_kwargs: Any
+    ) -> str:
+        summary_template = self._summary_template.partial_format(query_str=query_str)
+        # repack text_chunks so that each chunk fills the context window
+        text_chunks = self._prompt_helper.repack(
+            summary_template, text_chunks=text_chunks, llm=self._llm
+        )
+        if len(text_chunks) == 1:
+            return await self._llm.apredict(
+                summary_template, context_str=text_chunks[0], **response_kwargs
+            )
+
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+
+        async def summarize(text_chunk: str) -> str:
+            async with semaphore:
+                return await self._llm.apredict(
+                    summary_template, context_str=text_chunk, **response_kwargs
+                )
+
+        summaries = await asyncio.gather(*map(summarize, text_chunks))
+        # recursively summarize the summaries
+        return await self.aget_response(query_str, summaries, **response_kwargs)
+
+
+def get_response_synthesizer(
+    response_mode: ResponseMode = "compact", max_concurrency: int = 4
+) -> BaseSynthesizer:
+    """
+    Response synthesizer of a response mode.
+
+    Args:
+        response_mode: "compact" (sequential refine over packed chunks), "refine"
+            (sequential refine, one LLM call per chunk), "tree_summarize" (sequential
+            summaries, merged bottom-up), or "async_tree_summarize" (concurrent summaries).
+        max_concurrency: maximum number of simultaneous LLM calls, for "async_tree_summarize".
+    """
+    if response_mode == "refine":
+        return Refine()
+    if response_mode == "tree_summarize":
+        return TreeSummarize()
+    if response_mode == "async_tree_summarize":
+        return ConcurrentTreeSummarize(max_concurrency=max_concurrency)
+    return CompactAndRefine()
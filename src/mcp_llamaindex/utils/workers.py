@@ -0,0 +1,104 @@
+import multiprocessing
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from typing import TypeVar
+
+from llama_index.core import Settings
+from llama_index.core.ingestion import run_transformations
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import BaseNode, Document
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def make_process_pool(num_workers: int) -> ProcessPoolExecutor:
+    """Pool of worker processes, to reuse over several `map_in_processes` calls."""
+    # "spawn" as SimpleDirectoryReader does: forking a process holding torch threads is unsafe
+    return ProcessPoolExecutor(
+        max_workers=num_workers, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+def map_in_processes(
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    num_workers: int = 1,
+    executor: Executor | None = None,
+) -> list[R]:
+    """
+    Applies `fn` to every item, in a pool of worker processes if `num_workers` > 1.
+
+    Results are returned in the order of `items`, whatever the number of workers.
+    `fn` and items must be picklable when running with several workers.
+
+    Args:
+        fn: function to apply.
+        items: items to process.
+        num_workers: number of worker processes. 1 to run in the current process.
+        executor: pool of `num_workers` processes to run in, a new one if None.
+
+    Returns:
+        list of results, in input order.
+    """
+    items = list(items)
+    if num_workers <= 1 or len(items) <= 1:
+        return [fn(item) for item in items]
+    if executor is not None:
+        return list(executor.map(fn, items))
+
+    with make_process_pool(min(num_workers, len(items))) as pool:
+        return list(pool.map(fn, items))
+
+
+def _split_batch(
+    documents: Sequence[Document], chunk_size: int, chunk_overlap: int
+) -> list[BaseNode]:
+    # Built in the worker: the splitter tokenizer does not survive pickling cleanly
+    splitter = SentenceSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return splitter(documents)
+
+
+def split_documents(
+    documents: Sequence[Document],
+    num_workers: int = 1,
+    executor: Executor | None = None,
+) -> list[BaseNode]:
+    """
+    Chunks documents into nodes with the global `Settings.transformations`.
+
+    With several workers, each process chunks with a `SentenceSplitter` built from
+    `Settings.chunk_size` and `Settings.chunk_overlap`, which is what
+    `Settings.transformations` defaults to. Documents are dispatched by contiguous
+    batches, so that nodes come out in the same order, with the same content,
+    as with a single process.
+
+    Args:
+        documents: documents to chunk.
+        num_workers: number of worker processes. 1 to run in the current process.
+        executor: pool of `num_workers` processes to run in, a new one if None.
+
+    Returns:
+        list of nodes.
+    """
+    if num_workers <= 1:
+        return list(run_transformations(documents, Settings.transformations))
+
+    # A few batches per worker to even out the load between small and large files
+    nb_batches = min(len(documents), num_workers * 4)
+    batch_size = -(-len(documents) // nb_batches) if nb_batches else 1
+    batches = [
+        documents[i : i + batch_size] for i in range(0, len(documents), batch_size)
+    ]
+    nodes_batches = map_in_processes(
+        partial(
+            _split_batch,
+            chunk_size=Settings.chunk_size,
+            chunk_overlap=Settings.chunk_overlap,
+        ),
+        batches,
+        num_workers=num_workers,
+        executor=executor,
+    )
+    return [node for nodes in nodes_batches for node in nodes]
@@ -1,8 +1,19 @@
+import asyncio
+import json
+import chromadb
 import pytest
 from pathlib import Path
-from unittest.mock import MagicMock, PropertyMock, patch
+from unittest.mock import AsyncMock, MagicMock, PropertyMock, patch
+
+from fastmcp import Client
+from llama_index.core.schema import QueryBundle
 
 from mcp_llamaindex.dir_rag_server import DirectoryRagServer, RagConfig
+from mcp_llamaindex.utils import llm_gateway
+from mcp_llamaindex.utils.adaptive_top_k import AdaptiveTopK
+from mcp_llamaindex.utils.llm_gateway import llm_request_options
+from mcp_llamaindex.utils.maintenance import CHROMA_COLLECTION
+from mcp_llamaindex.utils.metrics import metrics
 
 
 @pytest.fixture
@@ -139,3 +150,394 @@ def test_download_web_pages(
     mock_downloader_instance.save_as_markdown.assert_any_call(
         rag_server.rag_config.data_dir / "page2.md"
     )
+
+
+@pytest.mark.parametrize("docstore_backend", ["json", "sqlite", "none"])
+def test_index_reload_with_docstore_backend(tmp_path: Path, docstore_backend: str):
+    """Test that an index is created then reloaded for each docstore backend."""
+    data_dir = tmp_path / "md_documents"
+    data_dir.mkdir()
+    (data_dir / "file1.md").write_text("# File 1 Content")
+    persist_dir = tmp_path / "vector_store"
+
+    rag_config = RagConfig(
+        persist_dir=persist_dir,
+        data_dir=data_dir,
+        docstore_backend=docstore_backend,
+    )
+    _ = DirectoryRagServer(rag_config=rag_config).index
+    DirectoryRagServer._get_or_create_index.cache_clear()
+
+    assert (persist_dir / "docstore.json").exists() == (docstore_backend == "json")
+    assert (persist_dir / "docstore.sqlite3").exists() == (docstore_backend == "sqlite")
+
+    # A fresh server only reloads from disk
+    (data_dir / "file1.md").unlink()
+    reloaded_server = DirectoryRagServer(rag_config=rag_config)
+    assert reloaded_server.get_indexed_files() == ["file1.md"]
+
+
+def test_emptied_index_is_built_again(rag_server: DirectoryRagServer):
+    """Test that files added after every indexed file was deleted are indexed on restart."""
+    rag_server.delete_markdown_files(["file1.md", "file2.md"])
+    (Path(rag_server.rag_config.data_dir) / "file3.md").write_text("# File 3 Content")
+    DirectoryRagServer._get_or_create_index.cache_clear()
+
+    restarted_server = DirectoryRagServer(rag_config=rag_server.rag_config)
+    assert restarted_server.get_indexed_files() == ["file3.md"]
+
+
+@patch("mcp_llamaindex.dir_rag_server.PageDownloader")
+def test_download_web_pages_reports_failures(
+    mock_downloader, rag_server: DirectoryRagServer
+):
+    """Test downloading several pages at once, with one failing download."""
+    html_pages = {
+        "http://example.com/page1": "<h1>Page 1</h1>",
+        "http://example.com/page2": OSError("HTTP Error 404: Not Found"),
+    }
+
+    def make_downloader(url, timeout):
+        assert timeout == rag_server.rag_config.fetch_timeout
+        return MagicMock(download_html=MagicMock(side_effect=[html_pages[url]]))
+
+    mock_downloader.side_effect = make_downloader
+
+    with patch.object(DirectoryRagServer, "add_markdown_file") as mock_add_file:
+        failed_urls = rag_server.download_web_pages(list(html_pages))
+
+    assert failed_urls == {"http://example.com/page2": "HTTP Error 404: Not Found"}
+    output_path = rag_server.rag_config.data_dir / "example-com_page1.md"
+    assert output_path.read_text().strip() == "# Page 1"
+    mock_add_file.assert_called_once_with(output_path)
+
+
+@pytest.mark.asyncio
+async def test_metrics_resource_records_tool_calls(rag_server: DirectoryRagServer):
+    """Test that tool calls through the MCP server are reported by the metrics resource."""
+    metrics.reset()
+
+    async with Client(rag_server.as_server()) as client:
+        await client.call_tool("get_indexed_files", {})
+        resource = await client.read_resource("metrics://server")
+
+    snapshot = json.loads(resource[0].text)
+    tool_histograms = [h for h in snapshot["histograms"] if h["name"] == "tool_seconds"]
+    assert tool_histograms[0]["labels"] == {"tool": "get_indexed_files"}
+    assert tool_histograms[0]["count"] == 1
+
+
+def test_retrieve_docs(rag_server: DirectoryRagServer):
+    """Test retrieval without synthesis, with file filter and characters budget."""
+    chunks = rag_server.retrieve_docs("File content", top_k=5)
+    assert sorted(chunk["file_name"] for chunk in chunks) == ["file1.md", "file2.md"]
+    assert set(chunks[0]) == {"text", "score", "file_name"}
+
+    chunks = rag_server.retrieve_docs("File content", files=["file2.md"])
+    assert [chunk["file_name"] for chunk in chunks] == ["file2.md"]
+    assert chunks[0]["text"] == "# File 2 Content"
+
+    chunks = rag_server.retrieve_docs("File content", top_k=5, max_chars=10)
+    assert len(chunks) == 1
+    assert chunks[0]["text"] in {"# File 1 C", "# File 2 C"}
+
+    assert rag_server.retrieve_docs("File content", min_score=2.0) == []
+    assert (
+        rag_server.retrieve_docs("File content", metadata={"file_type": "text/plain"})
+        == []
+    )
+
+
+@pytest.mark.asyncio
+async def test_query_docs_with_client_llm_sampling_packs_context(
+    rag_server: DirectoryRagServer,
+):
+    """Test that the sampled prompt holds packed chunks, and max_tokens is bounded."""
+    ctx = MagicMock()
+    ctx.sample = AsyncMock(return_value=MagicMock(text="Sampled answer"))
+
+    answer = await rag_server.query_docs_with_client_llm_sampling("File content", ctx)
+
+    assert answer == "Sampled answer"
+    prompt = ctx.sample.call_args.args[0]
+    assert "(file1.md)" in prompt and "(file2.md)" in prompt
+    assert ctx.sample.call_args.kwargs["max_tokens"] <= (
+        rag_server.rag_config.sampling_max_tokens
+    )
+
+
+@pytest.mark.asyncio
+async def test_query_docs_with_client_llm_sampling_tool(rag_server: DirectoryRagServer):
+    """Test that MCP clients reach the sampling tool, which samples their LLM."""
+    prompts = []
+
+    def sampling_handler(messages, params, context) -> str:
+        prompts.append(messages[0].content.text)
+        return "Sampled answer"
+
+    async with Client(
+        rag_server.as_server(), sampling_handler=sampling_handler
+    ) as client:
+        result = await client.call_tool(
+            "query_docs_with_client_llm_sampling", {"query": "File content"}
+        )
+
+    assert result.data == "Sampled answer"
+    assert "(file1.md)" in prompts[0] and "(file2.md)" in prompts[0]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("existing_store", [False, True])
+async def test_concurrent_first_calls_share_the_index(
+    tmp_path: Path, existing_store: bool
+):
+    """Test that concurrent first tool calls wait for one index, instead of each opening the store."""
+    data_dir = tmp_path / "md_documents"
+    data_dir.mkdir()
+    (data_dir / "file1.md").write_text("# File 1 Content")
+    rag_config = RagConfig(persist_dir=tmp_path / "vector_store", data_dir=data_dir)
+    if existing_store:
+        _ = DirectoryRagServer(rag_config=rag_config).index
+        DirectoryRagServer._get_or_create_index.cache_clear()
+        chromadb.api.client.SharedSystemClient.clear_system_cache()
+
+    server = DirectoryRagServer(rag_config=rag_config)
+    async with Client(server.as_server()) as client:
+        results = await asyncio.gather(
+            *[
+                client.call_tool("get_indexed_files", {}, raise_on_error=False)
+                for _ in range(4)
+            ]
+        )
+    assert [result.is_error for result in results] == [False] * 4
+    assert [result.structured_content for result in results] == [
+        {"result": ["file1.md"]}
+    ] * 4
+
+
+@pytest.mark.asyncio
+async def test_reader_serves_generations_published_by_writer(tmp_path: Path):
+    """Test that a reader serves read-only generations of the writer index, hot-swapped."""
+    data_dir = tmp_path / "md_documents"
+    data_dir.mkdir()
+    (data_dir / "file1.md").write_text("# File 1 Content")
+    new_file = tmp_path / "file2.md"
+    new_file.write_text("# File 2 Content")
+    generations_dir = tmp_path / "generations"
+
+    writer = DirectoryRagServer(
+        rag_config=RagConfig(
+            persist_dir=tmp_path / "vector_store",
+            data_dir=data_dir,
+            serving_role="writer",
+            generations_dir=generations_dir,
+        )
+    )
+    reader = DirectoryRagServer(
+        rag_config=RagConfig(
+            persist_dir=tmp_path / "unused",
+            data_dir=data_dir,
+            serving_role="reader",
+            generations_dir=generations_dir,
+        )
+    )
+
+    async with (
+        Client(writer.as_server()) as writer_client,
+        Client(reader.as_server()) as reader_client,
+    ):
+        reader_tools = {tool.name for tool in await reader_client.list_tools()}
+        assert "add_markdown_file" not in reader_tools
+        assert reader.get_indexed_files() == ["file1.md"]
+
+        await writer_client.call_tool("add_markdown_file", {"file_path": str(new_file)})
+        writer._get_generation_publisher().flush()
+        reader._get_generation_reader().refresh()
+        assert reader.get_indexed_files() == ["file1.md", "file2.md"]
+
+        # A write failing before any change publishes nothing
+        result = await writer_client.call_tool(
+            "add_markdown_file",
+            {"file_path": str(tmp_path / "missing.md")},
+            raise_on_error=False,
+        )
+        assert result.is_error
+        assert writer._get_generation_publisher()._timer is None
+    assert not (tmp_path / "unused").exists()
+
+
+def test_projected_embeddings_in_snapshots(tmp_path: Path):
+    """Test that embeddings are stored projected, and their projection ships with snapshots."""
+    data_dir = tmp_path / "md_documents"
+    data_dir.mkdir()
+    (data_dir / "file1.md").write_text("# File 1 Content")
+    config = {"data_dir": data_dir, "embed_dim": 64, "embed_projection": "truncate"}
+
+    server = DirectoryRagServer(
+        rag_config=RagConfig(persist_dir=tmp_path / "vector_store", **config)
+    )
+    manifest = server.export_snapshot(str(tmp_path / "snapshot.npz"))
+    assert manifest["embed_dim"] == 64
+    assert manifest["embed_model"].endswith("+truncate64")
+    assert [len(c["text"]) > 0 for c in server.retrieve_docs("content")] == [True]
+
+    replica = DirectoryRagServer(
+        rag_config=RagConfig(persist_dir=tmp_path / "replica", **config)
+    )
+    replica.import_snapshot(str(tmp_path / "snapshot.npz"))
+    assert (tmp_path / "replica" / "projection.npz").exists()
+    assert replica.retrieve_docs("content")[0]["file_name"] == "file1.md"
+
+    other = DirectoryRagServer(
+        rag_config=RagConfig(
+            persist_dir=tmp_path / "other", **(config | {"embed_dim": 32})
+        )
+    )
+    with pytest.raises(ValueError, match="truncate64"):
+        other.import_snapshot(str(tmp_path / "snapshot.npz"))
+
+
+def test_update_markdown_file(rag_server: DirectoryRagServer, tmp_path: Path):
+    """Test that an updated file replaces its chunks and docstore entries in the index."""
+    new_version = tmp_path / "file1.md"
+    new_version.write_text("# File 1 Content\n\nAn added paragraph.")
+
+    report = rag_server.update_markdown_file(str(new_version))
+    rag_server.update_markdown_file(str(new_version))
+    assert rag_server.get_index_stats()["orphan_docstore_entries"] == 0
+
+    assert report["embedded"] + report["unchanged"] >= 1
+    texts = rag_server.index.vector_store._collection.get(
+        where={"file_name": "file1.md"}
+    )["documents"]
+    assert any("An added paragraph." in text for text in texts)
+    assert (
+        (rag_server.rag_config.data_dir / "file1.md").read_text().endswith("paragraph.")
+    )
+
+
+def test_index_stats_and_compaction(rag_server: DirectoryRagServer, tmp_path: Path):
+    """Test that compaction keeps the live chunks only, and drops orphaned docstore entries."""
+    data_dir = rag_server.rag_config.data_dir
+    (data_dir / "file3.md").write_text("# File 3 Content")
+    rag_server.delete_markdown_files(["file2.md"])
+    (data_dir / "file1.md").unlink()
+
+    stats = rag_server.get_index_stats()
+    assert stats["chunks"] == 1
+    assert stats["files_not_indexed"] == ["file3.md"]
+    assert stats["indexed_files_not_on_disk"] == ["file1.md"]
+    assert stats["orphan_docstore_entries"] == 1
+
+    # A query started before the swap keeps running on the old collection
+    retriever = rag_server.index.as_retriever()
+    report = rag_server.compact_index()
+    assert report["after"]["chunks"] == 1
+    assert report["after"]["orphan_docstore_entries"] == 0
+    assert report["after"]["orphan_segment_dirs"] == 0
+    assert [node["file_name"] for node in rag_server.retrieve_docs("content")] == [
+        "file1.md"
+    ]
+    assert len(retriever.retrieve("content")) == 1
+
+    # The old collection is dropped by the next compaction
+    client = chromadb.PersistentClient(path=rag_server.rag_config.persist_dir)
+    old_id = client.get_collection(f"{CHROMA_COLLECTION}_old").id
+    rag_server.compact_index()
+    names = [collection.name for collection in client.list_collections()]
+    assert names.count(f"{CHROMA_COLLECTION}_old") == 1
+    assert client.get_collection(f"{CHROMA_COLLECTION}_old").id != old_id
+
+
+def test_hnsw_parameters(rag_server: DirectoryRagServer):
+    """Test that ef_search applies to an existing collection, other parameters on compaction."""
+    config = rag_server.rag_config.model_copy(
+        update={"hnsw_max_neighbors": 8, "hnsw_ef_search": 42}
+    )
+    server = DirectoryRagServer(rag_config=config)
+
+    hnsw = server.index.vector_store._collection.configuration_json["hnsw"]
+    assert hnsw["ef_search"] == 42
+    assert hnsw["max_neighbors"] != 8
+
+    server.compact_index()
+    hnsw = server.index.vector_store._collection.configuration_json["hnsw"]
+    assert (hnsw["max_neighbors"], hnsw["ef_search"]) == (8, 42)
+    assert len(server.retrieve_docs("content")) == 2
+
+
+def test_file_routing(rag_server: DirectoryRagServer):
+    """Test that indexed files get summaries, kept in sync with the index, to route queries."""
+    config = rag_server.rag_config.model_copy(update={"route_top_files": 1})
+    server = DirectoryRagServer(rag_config=config)
+
+    assert server.get_index_stats()["summarized_files"] == 2
+    assert len(server.retrieve_docs("File 2 Content", top_k=5)) == 1
+    assert (
+        len(server.retrieve_docs("content", top_k=5, files=["file1.md", "file2.md"]))
+        == 2
+    )
+
+    server.delete_markdown_files(["file2.md"])
+    assert server.file_summaries.file_names() == {"file1.md"}
+
+
+def test_query_docs_batch(rag_server: DirectoryRagServer, monkeypatch):
+    """Test that batched queries are answered in input order, with their chunks."""
+    mock_query_engine = MagicMock()
+    mock_query_engine.synthesize.side_effect = lambda query_bundle, nodes: (
+        f"{query_bundle.query_str}: {len(nodes)}"
+    )
+    monkeypatch.setattr(
+        DirectoryRagServer,
+        "rag_query_engine",
+        PropertyMock(return_value=mock_query_engine),
+    )
+
+    queries = [f"question {i}" for i in range(10)]
+    results = rag_server.query_docs_batch(queries, top_k=5)
+    assert [result["query"] for result in results] == queries
+    assert [result["answer"] for result in results] == [f"{q}: 2" for q in queries]
+    assert results[0]["chunks"] == rag_server.retrieve_docs("question 0", top_k=5)
+
+    results = rag_server.query_docs_batch(["question"], synthesize=False)
+    assert results[0]["answer"] is None
+    assert mock_query_engine.synthesize.call_count == 10
+    assert rag_server.query_docs_batch([]) == []
+
+
+def test_query_docs_batch_request_options(rag_server: DirectoryRagServer, monkeypatch):
+    """Test that batched answers are synthesized with the LLM request options of the call."""
+    request_options = []
+    mock_query_engine = MagicMock()
+    mock_query_engine.synthesize.side_effect = lambda query_bundle, nodes: (
+        request_options.append(llm_gateway._request_options.get())
+    )
+    monkeypatch.setattr(
+        DirectoryRagServer,
+        "rag_query_engine",
+        PropertyMock(return_value=mock_query_engine),
+    )
+
+    with llm_request_options(priority=0, timeout=30):
+        rag_server.query_docs_batch([f"question {i}" for i in range(4)])
+    assert len(request_options) == 4
+    assert all(priority == 0 for priority, _ in request_options)
+    assert all(deadline is not None for _, deadline in request_options)
+
+
+def test_adaptive_top_k(rag_server: DirectoryRagServer):
+    """Test that queries fetch `max_k` chunks, and only send the kept ones to the LLM."""
+    config = rag_server.rag_config.model_copy(
+        update={"adaptive_top_k": AdaptiveTopK(max_k=5, min_score=2.0)}
+    )
+    server = DirectoryRagServer(rag_config=config)
+
+    query_engine = server.rag_query_engine
+    assert query_engine.retriever._similarity_top_k == 5
+    assert len(query_engine.retrieve(QueryBundle("content"))) == 1
+
+    results = server.query_docs_batch(["content"], synthesize=False)
+    assert len(results[0]["chunks"]) == 1
+    results = server.query_docs_batch(["content"], top_k=5, synthesize=False)
+    assert len(results[0]["chunks"]) == 2
@@ -0,0 +1,54 @@
+import pytest
+from llama_index.core.schema import NodeWithScore, TextNode
+
+from mcp_llamaindex.utils.adaptive_top_k import (
+    AdaptiveTopK,
+    AdaptiveTopKPostprocessor,
+    adaptive_cutoff,
+)
+from mcp_llamaindex.utils.metrics import metrics
+
+
+@pytest.mark.parametrize(
+    "scores, config, expected",
+    [
+        # One chunk stands out
+        ([0.9, 0.5, 0.45, 0.4], AdaptiveTopK(), 1),
+        # Cut at the largest gap
+        ([0.9, 0.88, 0.86, 0.6, 0.58], AdaptiveTopK(), 3),
+        # No gap large enough: all chunks, up to max_k
+        ([0.9, 0.88, 0.86, 0.84], AdaptiveTopK(max_k=3), 3),
+        ([0.5] * 5, AdaptiveTopK(), 5),
+        # Gaps before min_k are ignored
+        ([0.9, 0.5, 0.45, 0.1], AdaptiveTopK(min_k=2), 3),
+        # Threshold, down to min_k
+        ([0.9, 0.8, 0.7], AdaptiveTopK(min_score=0.75, min_gap=1.0), 2),
+        ([0.9, 0.8, 0.7], AdaptiveTopK(min_k=2, min_score=0.95), 2),
+        ([], AdaptiveTopK(min_k=2), 0),
+    ],
+)
+def test_adaptive_cutoff(scores: list[float], config: AdaptiveTopK, expected: int):
+    assert adaptive_cutoff(scores, config) == expected
+
+
+def test_adaptive_top_k_bounds():
+    with pytest.raises(ValueError):
+        AdaptiveTopK(min_k=5, max_k=3)
+
+
+def test_postprocessor_records_kept_and_dropped_nodes():
+    """Test that nodes are cut, and the nodes and tokens spared are counted."""
+    metrics.reset()
+    nodes = [
+        NodeWithScore(node=TextNode(text=f"chunk number {i}"), score=score)
+        for i, score in enumerate([0.9, 0.85, 0.3, 0.25])
+    ]
+    kept = AdaptiveTopKPostprocessor().postprocess_nodes(nodes)
+    assert kept == nodes[:2]
+
+    snapshot = metrics.snapshot()
+    [histogram] = [h for h in snapshot["histograms"] if h["name"] == "context_nodes"]
+    assert (histogram["count"], histogram["sum"]) == (1, 2)
+    counters = {c["name"]: c["value"] for c in snapshot["counters"]}
+    assert counters["adaptive_dropped_nodes_total"] == 2
+    assert counters["adaptive_dropped_tokens_total"] > 0
@@ -0,0 +1,88 @@
+import uuid
+
+import chromadb
+import numpy as np
+from llama_index.core import Document, StorageContext, VectorStoreIndex
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.retrievers import VectorIndexRetriever
+from llama_index.vector_stores.chroma import ChromaVectorStore
+
+from mcp_llamaindex.utils.batch_query import embed_queries, search_batch
+from mcp_llamaindex.utils.projection import EmbeddingProjection, ProjectedEmbedding
+
+TOPICS = ["apple", "banana", "cherry"]
+
+
+class TopicEmbedding(MockEmbedding):
+    """Counts of topic words, embedding queries in batches."""
+
+    query_calls: int = 0
+
+    def _vector(self, text: str) -> list[float]:
+        return [text.lower().count(topic) + 0.01 for topic in TOPICS]
+
+    def _get_query_embedding(self, query: str) -> list[float]:
+        self.query_calls += 1
+        return self._vector(query)
+
+    def _get_query_embeddings(self, queries: list[str]) -> list[list[float]]:
+        self.query_calls += 1
+        return [self._vector(query) for query in queries]
+
+    def _get_text_embedding(self, text: str) -> list[float]:
+        return self._vector(text)
+
+    def _get_text_embeddings(self, texts: list[str]) -> list[list[float]]:
+        return [self._vector(text) for text in texts]
+
+
+def test_embed_queries_in_one_model_call():
+    """Test that queries are embedded in one call, through the projection if any."""
+    queries = ["apple pie", "banana bread", "cherry cherry"]
+    model = TopicEmbedding(embed_dim=3)
+    expected = [model.get_query_embedding(query) for query in queries]
+    model.query_calls = 0
+    assert embed_queries(model, queries) == expected
+    assert model.query_calls == 1
+
+    projection = EmbeddingProjection.fit(np.eye(3), 2, "truncate")
+    projected = ProjectedEmbedding(model, projection)
+    assert np.allclose(
+        embed_queries(projected, queries),
+        [projected.get_query_embedding(query) for query in queries],
+    )
+
+    # Models without batched queries embed them one by one
+    mock = MockEmbedding(embed_dim=4)
+    assert embed_queries(mock, queries) == [[0.5] * 4] * 3
+
+
+def test_search_batch_matches_single_searches():
+    """Test that a batched search returns the chunks and scores of one search per query."""
+    embed_model = TopicEmbedding(embed_dim=3)
+    collection = chromadb.EphemeralClient().create_collection(
+        f"test_{uuid.uuid4().hex}"
+    )
+    index = VectorStoreIndex.from_documents(
+        [
+            Document(text=f"{topic} {i}. " * (i + 1), metadata={"file_name": topic})
+            for topic in TOPICS
+            for i in range(3)
+        ],
+        storage_context=StorageContext.from_defaults(
+            vector_store=ChromaVectorStore(chroma_collection=collection)
+        ),
+        embed_model=embed_model,
+    )
+    queries = ["apple", "banana cherry", "cherry"]
+    results = search_batch(collection, embed_queries(embed_model, queries), top_k=4)
+
+    retriever = VectorIndexRetriever(index=index, similarity_top_k=4)
+    for query, nodes in zip(queries, results):
+        expected = retriever.retrieve(query)
+        assert [node.node_id for node in nodes] == [node.node_id for node in expected]
+        assert np.allclose(
+            [node.score for node in nodes], [node.score for node in expected]
+        )
+        assert nodes[0].node.get_content() == expected[0].node.get_content()
+    assert search_batch(collection, [], top_k=4) == []
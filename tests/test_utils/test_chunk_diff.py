@@ -0,0 +1,63 @@
+import uuid
+
+import chromadb
+from llama_index.core import Document, StorageContext, VectorStoreIndex
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.vector_stores.chroma import ChromaVectorStore
+
+from mcp_llamaindex.utils.chunk_diff import update_file_nodes
+
+
+class CountingEmbedding(MockEmbedding):
+    nb_embedded: int = 0
+
+    def _get_text_embeddings(self, texts: list[str]) -> list[list[float]]:
+        self.nb_embedded += len(texts)
+        return super()._get_text_embeddings(texts)
+
+
+def chunks(paragraphs: list[str]) -> list:
+    document = Document(text="\n\n".join(paragraphs), metadata={"file_name": "doc.md"})
+    return SentenceSplitter(chunk_size=64, chunk_overlap=0)([document])
+
+
+def test_update_embeds_changed_chunks_only():
+    """Test that unchanged chunks keep their node id and vector, and are not embedded again."""
+    embed_model = CountingEmbedding(embed_dim=8)
+    collection = chromadb.EphemeralClient().create_collection(
+        f"test_{uuid.uuid4().hex}"
+    )
+    index = VectorStoreIndex(
+        nodes=[],
+        storage_context=StorageContext.from_defaults(
+            vector_store=ChromaVectorStore(chroma_collection=collection)
+        ),
+        embed_model=embed_model,
+    )
+    paragraphs = [
+        f"Paragraph {i} is about topic {i}, " + " ".join(["words"] * 40) + "."
+        for i in range(10)
+    ]
+    assert update_file_nodes(index, "doc.md", chunks(paragraphs)) == {
+        "unchanged": 0,
+        "embedded": 10,
+        "deleted": 0,
+    }
+    before = collection.get(include=["documents", "embeddings"])
+    ids_by_text = dict(zip(before["documents"], before["ids"]))
+
+    paragraphs[4] = "Paragraph 4 was rewritten, " + " ".join(["words"] * 40) + "."
+    del paragraphs[7]
+    embed_model.nb_embedded = 0
+    report = update_file_nodes(index, "doc.md", chunks(paragraphs))
+
+    assert report == {"unchanged": 8, "embedded": 1, "deleted": 2}
+    assert embed_model.nb_embedded == 1
+    after = collection.get(include=["documents", "metadatas"])
+    assert sorted(after["documents"]) == sorted(
+        node.text for node in chunks(paragraphs)
+    )
+    for node_id, text in zip(after["ids"], after["documents"]):
+        if text in ids_by_text:
+            assert node_id == ids_by_text[text]
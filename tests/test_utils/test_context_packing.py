@@ -0,0 +1,53 @@
+from llama_index.core.schema import (
+    NodeRelationship,
+    NodeWithScore,
+    RelatedNodeInfo,
+    TextNode,
+)
+
+from mcp_llamaindex.utils.context_packing import merge_adjacent_chunks, pack_context
+
+DOCUMENT = "alpha beta gamma delta epsilon zeta eta theta iota kappa"
+
+
+def word_tokenizer(text: str) -> list[str]:
+    return text.split()
+
+
+def make_node(doc_id: str, start: int, end: int, score: float) -> NodeWithScore:
+    node = TextNode(
+        text=DOCUMENT[start:end],
+        start_char_idx=start,
+        end_char_idx=end,
+        metadata={"file_name": f"{doc_id}.md"},
+        relationships={NodeRelationship.SOURCE: RelatedNodeInfo(node_id=doc_id)},
+    )
+    return NodeWithScore(node=node, score=score)
+
+
+def test_merge_adjacent_chunks_drops_overlap():
+    """Test that overlapping chunks of a same document are merged, keeping the best score."""
+    nodes = [
+        make_node("doc1", 11, 35, 0.5),  # "gamma delta epsilon zeta"
+        make_node("doc1", 0, 22, 0.9),  # "alpha beta gamma delta"
+        make_node("doc2", 0, 10, 0.7),
+    ]
+
+    chunks = sorted(merge_adjacent_chunks(nodes), key=lambda c: c.file_name)
+
+    assert [c.text for c in chunks] == [DOCUMENT[0:35], DOCUMENT[0:10]]
+    assert chunks[0].score == 0.9
+
+
+def test_pack_context_trims_to_budget_in_score_order():
+    """Test that chunks are packed by score, and the overflowing one is truncated."""
+    nodes = [
+        make_node("doc1", 0, 16, 0.4),  # "alpha beta gamma", 3 tokens
+        make_node("doc2", 17, 45, 0.8),  # "delta epsilon zeta eta theta", 5 tokens
+        make_node("doc3", 17, 45, 0.6),  # duplicated text
+    ]
+
+    chunks = pack_context(nodes, token_budget=7, tokenizer=word_tokenizer)
+
+    assert [c.text for c in chunks] == ["delta epsilon zeta eta theta", "alpha beta"]
+    assert sum(c.nb_tokens for c in chunks) == 7
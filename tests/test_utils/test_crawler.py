@@ -2,7 +2,7 @@ import pytest
 import requests
 from unittest.mock import MagicMock, patch
 
-from mcp_llamaindex.utils.crawler import url_to_filename, WebsiteCrawler
+from mcp_llamaindex.utils.crawler import url_to_filename, extract_hrefs, WebsiteCrawler
 
 
 @pytest.mark.parametrize(
@@ -121,3 +121,72 @@ def test_explore_website_handles_request_error(mock_get):
     crawler = WebsiteCrawler(base_url="https://example.com/")
     links = crawler.crawl()
     assert links == {"https://example.com/"}
+
+
+EXTRACT_HTML = """
+<html><body>
+    <nav class="sidebar"><a href="/nav1">Nav 1</a><a href="/nav2">Nav 2</a></nav>
+    <div id="content" class="docs main">
+        <div><a href="/page1">Page 1</a></div>
+        <a href="/page2?a=1&amp;b=2">Page 2</a>
+        <a>No href</a>
+    </div>
+    <div id="footer"><a href="/footer">Footer</a></div>
+</body></html>
+"""
+
+
+@pytest.mark.parametrize(
+    "css_selector, expected_hrefs, expected_match",
+    [
+        (None, ["/nav1", "/nav2", "/page1", "/page2?a=1&b=2", "/footer"], True),
+        ("nav", ["/nav1", "/nav2"], True),
+        ("#content", ["/page1", "/page2?a=1&b=2"], True),
+        ("div.docs.main", ["/page1", "/page2?a=1&b=2"], True),
+        ("body > div#footer", ["/footer"], True),  # Not a simple selector
+        ("main", ["/nav1", "/nav2", "/page1", "/page2?a=1&b=2", "/footer"], False),
+    ],
+)
+def test_extract_hrefs(css_selector, expected_hrefs, expected_match):
+    hrefs, selector_matched = extract_hrefs(EXTRACT_HTML, css_selector)
+    assert hrefs == expected_hrefs
+    assert selector_matched == expected_match
+
+
+@patch("mcp_llamaindex.utils.crawler.read_sitemaps")
+@patch("mcp_llamaindex.utils.crawler.find_sitemaps")
+@patch("requests.get")
+def test_crawl_from_sitemap(mock_get, mock_find_sitemaps, mock_read_sitemaps):
+    """Tests that sitemap discovery applies the crawler rules without fetching pages."""
+    mock_find_sitemaps.return_value = ["https://example.com/sitemap.xml"]
+    mock_read_sitemaps.return_value = {
+        "https://example.com/docs/page1": None,
+        "https://example.com/blog/post1": None,
+        "https://external.com/docs/page": None,
+    }
+
+    crawler = WebsiteCrawler(
+        base_url="https://example.com/docs/",
+        only_subpath_links=True,
+        discovery="sitemap",
+    )
+    links = crawler.crawl()
+
+    assert links == {"https://example.com/docs/page1"}
+    mock_get.assert_not_called()
+
+
+@patch("mcp_llamaindex.utils.crawler.read_sitemaps", return_value={})
+@patch("requests.get", side_effect=mock_requests_get)
+def test_crawl_from_sitemap_fallback_to_links(mock_get, mock_read_sitemaps):
+    """Tests that the crawler follows links when the website has no sitemap."""
+    crawler = WebsiteCrawler(
+        base_url="https://example.com/", max_depth=2, discovery="sitemap"
+    )
+    links = crawler.crawl()
+
+    assert links == {
+        "https://example.com/",
+        "https://example.com/page1",
+        "https://example.com/page2",
+    }
@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+from llama_index.core.embeddings import MockEmbedding
+
+from mcp_llamaindex.utils.embedding_server import (
+    MicroBatcher,
+    RemoteEmbedding,
+    make_server,
+)
+from mcp_llamaindex.utils.metrics import MetricsRegistry
+
+
+def test_micro_batcher_groups_concurrent_requests():
+    """Test that concurrent requests are embedded in one batch, by kind."""
+    batches = []
+
+    def embed_fn(texts: list[str], kind: str) -> list[list[float]]:
+        batches.append((kind, len(texts)))
+        return [[float(len(text))] for text in texts]
+
+    batcher = MicroBatcher(
+        embed_fn, max_batch_size=16, max_wait_s=0.1, registry=MetricsRegistry()
+    )
+    results = {}
+
+    def request(i: int) -> None:
+        results[i] = batcher.embed(["a" * i, "b" * i])
+
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(1, 9)]
+    for thread in threads:
+        thread.start()
+    assert batcher.embed(["query"], kind="query") == [[5.0]]
+    for thread in threads:
+        thread.join()
+
+    assert results == {i: [[float(i)], [float(i)]] for i in range(1, 9)}
+    assert ("text", 16) in batches
+    assert ("query", 1) in batches
+
+
+def test_micro_batcher_does_not_wait_for_full_batches():
+    """Test that a lone request is embedded after `max_wait_s`."""
+    batcher = MicroBatcher(
+        lambda texts, kind: [[0.0] for _ in texts],
+        max_batch_size=64,
+        max_wait_s=0.01,
+        registry=MetricsRegistry(),
+    )
+    start = time.monotonic()
+    assert batcher.embed(["text"]) == [[0.0]]
+    assert time.monotonic() - start < 0.5
+
+
+@pytest.mark.parametrize("transport", ["unix", "http"])
+def test_remote_embedding_matches_in_process_model(tmp_path, transport):
+    """Test that the remote embedding is a drop-in replacement of the served model."""
+    model = MockEmbedding(embed_dim=8, model_name="mock-model")
+    url = (
+        f"unix://{tmp_path / 'embed.sock'}"
+        if transport == "unix"
+        else "http://127.0.0.1:0"
+    )
+    server = make_server(model, url)
+    if transport == "http":
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        remote = RemoteEmbedding(model_name="mock-model", url=url)
+        assert remote.get_text_embedding_batch(["a", "b"]) == (
+            model.get_text_embedding_batch(["a", "b"])
+        )
+        assert remote.get_query_embedding("q") == model.get_query_embedding("q")
+
+        with pytest.raises(RuntimeError, match="mock-model"):
+            RemoteEmbedding(model_name="other-model", url=url).get_query_embedding("q")
+    finally:
+        server.shutdown()
+        server.server_close()
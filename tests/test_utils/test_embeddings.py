@@ -0,0 +1,82 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from sentence_transformers import SentenceTransformer
+from transformers import BertConfig, BertModel, BertTokenizerFast
+
+from mcp_llamaindex.utils.embeddings import length_buckets, make_embed_model
+
+WORDS = [
+    "alpha",
+    "beta",
+    "gamma",
+    "delta",
+    "epsilon",
+    "zeta",
+    "eta",
+    "theta",
+    "the",
+    "a",
+    "of",
+    "and",
+]
+
+
+@pytest.fixture(scope="module")
+def tiny_model_dir(tmp_path_factory) -> Path:
+    """Tiny random BERT model, saved locally, so that no model is downloaded."""
+    model_dir = tmp_path_factory.mktemp("tiny_bert")
+    vocab_file = model_dir / "vocab.txt"
+    vocab_file.write_text(
+        "\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS)
+    )
+    BertTokenizerFast(vocab_file=str(vocab_file)).save_pretrained(model_dir)
+    config = BertConfig(
+        vocab_size=len(WORDS) + 5,
+        hidden_size=8,
+        num_hidden_layers=1,
+        num_attention_heads=2,
+        intermediate_size=16,
+        max_position_embeddings=64,
+    )
+    BertModel(config).save_pretrained(model_dir)
+    return model_dir
+
+
+def test_length_buckets():
+    """Test that texts are batched by decreasing length, within size and token budgets."""
+    lengths = [3, 10, 4, 9, 2, 1]
+    assert length_buckets(lengths, max_batch_size=2, max_batch_tokens=100) == [
+        [1, 3],
+        [2, 0],
+        [4, 5],
+    ]
+    # 2 texts padded to 10 tokens exceed 15 tokens, a too long text is alone
+    assert length_buckets(lengths, max_batch_size=8, max_batch_tokens=15) == [
+        [1],
+        [3],
+        [2, 0, 4],
+        [5],
+    ]
+
+
+def test_bucketed_embeddings_match_model(tiny_model_dir: Path):
+    """Test that length-bucketed batching keeps the embeddings and their order."""
+    embed_model = make_embed_model(
+        str(tiny_model_dir), batch_size=2, max_batch_tokens=12, num_threads=1
+    )
+    texts = ["alpha", "beta gamma delta epsilon zeta", "the a of", "eta", "theta and"]
+
+    embeddings = embed_model.get_text_embedding_batch(texts)
+
+    expected = SentenceTransformer(str(tiny_model_dir)).encode(
+        texts, normalize_embeddings=True
+    )
+    np.testing.assert_allclose(embeddings, expected, atol=1e-5)
+    assert embed_model.model_name == str(tiny_model_dir)
+
+
+def test_int8_needs_onnx_backend():
+    with pytest.raises(ValueError, match="onnx"):
+        make_embed_model("any-model", backend="torch", precision="int8")
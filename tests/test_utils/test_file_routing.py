@@ -0,0 +1,128 @@
+import uuid
+
+import chromadb
+import pytest
+from llama_index.core import Document, StorageContext, VectorStoreIndex
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.llms import MockLLM
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.vector_stores import MetadataFilter, MetadataFilters
+from llama_index.vector_stores.chroma import ChromaVectorStore
+
+from mcp_llamaindex.utils.file_routing import (
+    FileRoutingRetriever,
+    FileSummaryIndex,
+    extractive_summary,
+)
+
+TOPICS = ["apple", "banana", "cherry"]
+
+
+class TopicEmbedding(MockEmbedding):
+    """Counts of topic words, so that texts about the same topic are close."""
+
+    def _vector(self, text: str) -> list[float]:
+        return [text.lower().count(topic) + 0.01 for topic in TOPICS]
+
+    def _get_query_embedding(self, query: str) -> list[float]:
+        return self._vector(query)
+
+    def _get_text_embedding(self, text: str) -> list[float]:
+        return self._vector(text)
+
+    def _get_text_embeddings(self, texts: list[str]) -> list[list[float]]:
+        return [self._vector(text) for text in texts]
+
+
+def new_collection():
+    return chromadb.EphemeralClient().create_collection(f"test_{uuid.uuid4().hex}")
+
+
+def topic_documents() -> list[Document]:
+    return [
+        Document(
+            text=f"# About {topic}\n\n"
+            + "\n\n".join(
+                f"## Section {i}\n\nThis section is about {topic}. "
+                + " ".join(["filler"] * 40)
+                for i in range(4)
+            ),
+            metadata={"file_name": f"{topic}.md"},
+        )
+        for topic in TOPICS
+    ]
+
+
+def test_extractive_summary():
+    """Test that summaries keep headings, with the first sentence of their section."""
+    text = "Intro sentence. More intro.\n\n# Title\n\nFirst one. Second one.\n\n## Part\n\nPart text!"
+
+    assert (
+        extractive_summary(text)
+        == "Intro sentence.\nTitle\nFirst one.\nPart\nPart text!"
+    )
+    assert extractive_summary(text, max_chars=10) == "Intro sent"
+
+
+def test_routing_searches_selected_files_only():
+    """Test that chunks are searched in the files of the closest summaries, unless filtered."""
+    embed_model = TopicEmbedding(embed_dim=3)
+    documents = topic_documents()
+    index = VectorStoreIndex(
+        nodes=SentenceSplitter(chunk_size=64, chunk_overlap=0)(documents),
+        storage_context=StorageContext.from_defaults(
+            vector_store=ChromaVectorStore(chroma_collection=new_collection())
+        ),
+        embed_model=embed_model,
+    )
+    file_summaries = FileSummaryIndex(
+        new_collection(), index.vector_store._collection, embed_model
+    )
+    file_summaries.upsert(documents)
+    assert file_summaries.file_names() == {"apple.md", "banana.md", "cherry.md"}
+
+    retriever = FileRoutingRetriever(
+        index, file_summaries, top_files=1, similarity_top_k=10
+    )
+    nodes = retriever.retrieve("Tell me about banana")
+    assert nodes
+    assert {node.metadata["file_name"] for node in nodes} == {"banana.md"}
+    # Scored like a search of the collection
+    flat = index.as_retriever(similarity_top_k=1).retrieve("Tell me about banana")
+    assert nodes[0].node_id == flat[0].node_id
+    assert nodes[0].score == pytest.approx(flat[0].score)
+
+    retriever = FileRoutingRetriever(
+        index,
+        file_summaries,
+        top_files=1,
+        similarity_top_k=10,
+        filters=MetadataFilters(
+            filters=[MetadataFilter(key="file_name", value="cherry.md")]
+        ),
+    )
+    nodes = retriever.retrieve("Tell me about banana")
+    assert {node.metadata["file_name"] for node in nodes} == {"cherry.md"}
+
+
+def test_llm_summaries_replace_extractive_ones():
+    """Test that LLM summaries are written in the background, except for changed files."""
+    documents = topic_documents()
+    file_summaries = FileSummaryIndex(
+        new_collection(),
+        new_collection(),
+        TopicEmbedding(embed_dim=3),
+        mode="llm",
+        llm=MockLLM(),
+    )
+    file_summaries.upsert(documents)
+    file_summaries.wait()
+
+    summaries = file_summaries.collection.get(include=["metadatas", "documents"])
+    assert {metadata["summary_mode"] for metadata in summaries["metadatas"]} == {"llm"}
+    assert all("Summarize" in document for document in summaries["documents"])
+
+    file_summaries.mode = "extractive"
+    file_summaries.upsert([Document(text="# New", metadata={"file_name": "apple.md"})])
+    file_summaries._llm_summary("apple.md", documents[0].text, "outdated hash")
+    assert file_summaries.collection.get(ids=["apple.md"])["documents"] == ["New"]
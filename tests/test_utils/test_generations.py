@@ -0,0 +1,79 @@
+import time
+import uuid
+
+import chromadb
+import pytest
+
+from mcp_llamaindex.utils.generations import (
+    GenerationPublisher,
+    GenerationReader,
+    GenerationStore,
+)
+
+
+@pytest.fixture
+def collection():
+    collection = chromadb.EphemeralClient().create_collection(
+        f"test_{uuid.uuid4().hex}"
+    )
+    collection.add(ids=["a"], embeddings=[[0.1, 0.2]], documents=["Alpha"])
+    return collection
+
+
+def test_reader_swaps_in_new_generations(tmp_path, collection):
+    """Test that a reader serves the last published generation, and swaps in newer ones."""
+    store = GenerationStore(tmp_path, keep=2)
+    reader = GenerationReader(store, build_index=lambda loaded, path: loaded)
+    with pytest.raises(FileNotFoundError):
+        _ = reader.index
+
+    assert store.publish(collection) == 1
+    first = reader.index
+    assert first.count() == 1
+    assert not reader.refresh()
+
+    collection.add(ids=["b"], embeddings=[[0.3, 0.4]], documents=["Beta"])
+    assert store.publish(collection) == 2
+    assert reader.refresh()
+    assert reader.generation == 2
+    assert reader.index.count() == 2
+    assert first.count() == 1  # In-flight queries keep the previous generation
+
+    store.publish(collection)
+    assert sorted(path.name for path in tmp_path.glob("*.npz")) == [
+        "generation-000002.npz",
+        "generation-000003.npz",
+    ]
+
+
+def test_reader_rejects_other_embedding_model(tmp_path, collection):
+    """Test that a generation embedded with another model is not served."""
+    store = GenerationStore(tmp_path)
+    store.publish(collection, manifest_extra={"embed_model": "model-a"})
+    reader = GenerationReader(
+        store, build_index=lambda loaded, path: loaded, embed_model="model-b"
+    )
+    with pytest.raises(ValueError, match="model-a"):
+        _ = reader.index
+
+
+def test_publisher_coalesces_changes(tmp_path, collection):
+    """Test that changes marked within the publication interval make one generation."""
+    store = GenerationStore(tmp_path)
+    publisher = GenerationPublisher(lambda: store.publish(collection), min_interval=0.2)
+
+    publisher.mark_dirty()  # Nothing published yet, published right away
+    time.sleep(0.1)
+    assert store.current()[0] == 1
+    for _ in range(3):
+        publisher.mark_dirty()
+    time.sleep(0.05)
+    assert store.current()[0] == 1  # Within the interval of the last generation
+    time.sleep(0.2)
+    assert store.current()[0] == 2
+
+    publisher.mark_dirty()
+    publisher.flush()
+    assert store.current()[0] == 3
+    publisher.flush()  # Nothing pending
+    assert store.current()[0] == 3
@@ -0,0 +1,48 @@
+import random
+
+import numpy as np
+
+from mcp_llamaindex.utils.hnsw_tuning import exact_top_k, sample_query, sweep
+
+
+def test_exact_top_k_spaces():
+    """Test that exact search ranks by distance, or by angle with cosine."""
+    embeddings = np.array([[1.0, 0.0], [3.0, 0.1], [0.0, 1.0]])
+    queries = np.array([[2.0, 0.0]])
+
+    assert exact_top_k(embeddings, queries, k=2, space="l2").tolist() == [[0, 1]]
+    assert exact_top_k(embeddings, queries, k=2, space="cosine").tolist() == [[0, 1]]
+    assert exact_top_k(embeddings, queries, k=1, space="ip").tolist() == [[1]]
+
+
+def test_sweep_recall_grows_with_ef_search(tmp_path):
+    """Test that the sweep reports recall, latency and size for each parameter set."""
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(300, 16)).astype(np.float32)
+    queries = rng.normal(size=(20, 16)).astype(np.float32)
+
+    results = sweep(
+        embeddings,
+        queries,
+        k=10,
+        max_neighbors=[4],
+        ef_construction=[16],
+        ef_search=[10, 300],
+        work_dir=tmp_path,
+    )
+
+    assert [result["ef_search"] for result in results] == [10, 300]
+    low, high = results
+    assert high["recall@10"] >= low["recall@10"]
+    assert high["recall@10"] > 0.9
+    assert all(result["p99_ms"] >= result["p50_ms"] > 0 for result in results)
+    assert all(result["index_mb"] > 0 for result in results)
+
+
+def test_sample_query():
+    """Test that queries are sentences of a chunk long enough to search with."""
+    text = "Short one. The index is rebuilt when parameters change. Ok."
+
+    assert sample_query(text, random.Random(0)) == (
+        "The index is rebuilt when parameters change"
+    )
@@ -0,0 +1,103 @@
+import threading
+import uuid
+
+import chromadb
+import pytest
+from llama_index.core import StorageContext, VectorStoreIndex
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.vector_stores.chroma import ChromaVectorStore
+
+from mcp_llamaindex.utils.index_build import (
+    IndexBuildState,
+    StreamingIndexBuilder,
+    file_batches,
+)
+from mcp_llamaindex.utils.scheduler import ToolCancelledError, _cancellable
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    data_dir = tmp_path / "md_documents"
+    data_dir.mkdir()
+    for i in range(5):
+        (data_dir / f"file{i}.md").write_text(f"# File {i}\n\nContent of file {i}.")
+    (data_dir / "notes.txt").write_text("Not markdown.")
+    return data_dir
+
+
+def make_index() -> VectorStoreIndex:
+    collection = chromadb.EphemeralClient().create_collection(
+        f"test_{uuid.uuid4().hex}"
+    )
+    return VectorStoreIndex(
+        nodes=[],
+        storage_context=StorageContext.from_defaults(
+            vector_store=ChromaVectorStore(chroma_collection=collection)
+        ),
+        embed_model=MockEmbedding(embed_dim=8),
+    )
+
+
+def test_file_batches(data_dir):
+    paths = sorted(data_dir.glob("*.md"))
+    assert [len(batch) for batch in file_batches(paths, 2, 10**6)] == [2, 2, 1]
+    # Each file is larger than the byte limit: one file per batch
+    assert [len(batch) for batch in file_batches(paths, 4, 10)] == [1] * 5
+
+
+def test_interrupted_build_resumes(tmp_path, data_dir):
+    """Test that a build stopped after a batch resumes after it, without duplicate nodes."""
+    index = make_index()
+    state_path = tmp_path / "build_state.json"
+    checkpoints = []
+
+    def crash_on_second_batch():
+        checkpoints.append(index.vector_store._collection.count())
+        if len(checkpoints) == 2:
+            raise RuntimeError("Killed")
+
+    builder = StreamingIndexBuilder(
+        index=index,
+        data_dir=data_dir,
+        state_path=state_path,
+        batch_size=2,
+        on_checkpoint=crash_on_second_batch,
+    )
+    with pytest.raises(RuntimeError, match="Killed"):
+        builder.run()
+    state = IndexBuildState.load(state_path)
+    assert (state.files_done, state.last_file, state.complete) == (2, "file1.md", False)
+
+    builder.on_checkpoint = None
+    state = builder.run()
+    assert (state.files_done, state.complete) == (5, True)
+    assert index.vector_store._collection.count() == 5
+    file_names = index.vector_store._collection.get(include=["metadatas"])["metadatas"]
+    assert sorted(m["file_name"] for m in file_names) == [
+        f"file{i}.md" for i in range(5)
+    ]
+
+    # A complete build is not run again
+    assert builder.run().files_done == 5
+    assert index.vector_store._collection.count() == 5
+
+
+def test_cancelled_build_stops_between_batches(tmp_path, data_dir):
+    """Test that a cancelled tool call stops the build after its batch, then resumes."""
+    index = make_index()
+    state_path = tmp_path / "build_state.json"
+    cancelled = threading.Event()
+    builder = StreamingIndexBuilder(
+        index=index,
+        data_dir=data_dir,
+        state_path=state_path,
+        batch_size=2,
+        on_checkpoint=cancelled.set,
+    )
+    with _cancellable(cancelled), pytest.raises(ToolCancelledError):
+        builder.run()
+    assert IndexBuildState.load(state_path).files_done == 2
+
+    builder.on_checkpoint = None
+    assert builder.run().files_done == 5
+    assert index.vector_store._collection.count() == 5
@@ -0,0 +1,179 @@
+import threading
+from datetime import UTC, datetime
+from unittest.mock import MagicMock, patch
+
+import chromadb
+import pytest
+import requests
+from llama_index.core import Settings, StorageContext, VectorStoreIndex
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.vector_stores.chroma import ChromaVectorStore
+
+from mcp_llamaindex.utils.crawler import WebsiteCrawler
+from mcp_llamaindex.utils.ingest_pipeline import CrawlIngestPipeline
+from mcp_llamaindex.utils.scheduler import ToolCancelledError, _cancellable
+
+PAGES = {
+    "https://example.com/": '<html><body><h1>Home</h1><a href="/page1">Page 1</a><a href="/broken">Broken</a></body></html>',
+    "https://example.com/page1": '<html><body><h1>Page 1</h1><a href="/">Home</a><a href="/page2">Page 2</a></body></html>',
+    "https://example.com/page2": "<html><body><h1>Page 2</h1><p>No links here.</p></body></html>",
+}
+
+
+def mock_session_get(url, **kwargs):
+    if url not in PAGES:
+        response = MagicMock()
+        response.raise_for_status.side_effect = requests.HTTPError("404 Not Found")
+        return response
+    return MagicMock(text=PAGES[url])
+
+
+@pytest.fixture
+def index(monkeypatch):
+    monkeypatch.setattr(Settings, "embed_model", MockEmbedding(embed_dim=8))
+    collection = chromadb.EphemeralClient().get_or_create_collection(
+        "test_ingest_pipeline"
+    )
+    vector_store = ChromaVectorStore(chroma_collection=collection)
+    yield VectorStoreIndex(
+        nodes=[],
+        storage_context=StorageContext.from_defaults(vector_store=vector_store),
+    )
+    chromadb.EphemeralClient().delete_collection("test_ingest_pipeline")
+
+
+@patch("requests.Session.get", side_effect=mock_session_get)
+def test_pipeline_fetches_each_page_once(mock_get, index, tmp_path):
+    crawler = WebsiteCrawler(base_url="https://example.com/", max_depth=2)
+    pipeline = CrawlIngestPipeline(
+        crawler=crawler, index=index, data_dir=tmp_path, num_fetchers=2, queue_size=1
+    )
+
+    report = pipeline.run()
+
+    assert sorted(report["ingested_urls"]) == sorted(PAGES)
+    assert list(report["failed_urls"]) == ["https://example.com/broken"]
+    assert mock_get.call_count == 4
+    assert (tmp_path / "example-com_page2.md").read_text().strip() == (
+        "# Page 2\n\nNo links here."
+    )
+    metadatas = index.vector_store._collection.get(include=["metadatas"])["metadatas"]
+    assert {m["file_name"] for m in metadatas} == {
+        "example-com.md",
+        "example-com_page1.md",
+        "example-com_page2.md",
+    }
+
+
+def test_pipeline_survives_malformed_pages(index, tmp_path):
+    """Test that pages failing link extraction or fetching don't hang the crawl."""
+    pages = {
+        "https://example.com/": '<a href="/bad">Bad</a><a href="/error">Error</a>',
+        "https://example.com/bad": '<![foo bar]><a href="/x">X</a>',
+    }
+
+    def session_get(url, **kwargs):
+        if url not in pages:
+            raise ValueError("Unexpected error")
+        return MagicMock(text=pages[url])
+
+    crawler = WebsiteCrawler(base_url="https://example.com/", max_depth=2)
+    pipeline = CrawlIngestPipeline(crawler=crawler, index=index, data_dir=tmp_path)
+    with patch("requests.Session.get", side_effect=session_get):
+        thread = threading.Thread(target=pipeline.run)
+        thread.start()
+        thread.join(timeout=30)
+
+    assert not thread.is_alive()
+    report = pipeline._report()
+    assert report["ingested_urls"] == ["https://example.com/"]
+    assert sorted(report["failed_urls"]) == [
+        "https://example.com/bad",
+        "https://example.com/error",
+    ]
+
+
+def test_pipeline_records_timed_out_pages(index, tmp_path):
+    """Test that fetches are bounded by the timeout, and timed out pages fail."""
+
+    def session_get(url, **kwargs):
+        assert kwargs["timeout"] == 5
+        if url.endswith("page1"):
+            raise requests.Timeout("Read timed out.")
+        return mock_session_get(url, **kwargs)
+
+    pipeline = CrawlIngestPipeline(
+        crawler=WebsiteCrawler(base_url="https://example.com/", max_depth=2),
+        index=index,
+        data_dir=tmp_path,
+        fetch_timeout=5,
+    )
+    with patch("requests.Session.get", side_effect=session_get):
+        report = pipeline.run()
+    assert report["ingested_urls"] == ["https://example.com/"]
+    assert report["failed_urls"] == {
+        "https://example.com/page1": "Read timed out.",
+        "https://example.com/broken": "404 Not Found",
+    }
+
+
+def test_pipeline_stops_when_cancelled(index, tmp_path):
+    """Test that a cancelled crawl drops the pages left, and fails once stopped."""
+    cancelled = threading.Event()
+
+    def cancel_after_fetch(url, **kwargs):
+        cancelled.set()
+        return mock_session_get(url, **kwargs)
+
+    pipeline = CrawlIngestPipeline(
+        crawler=WebsiteCrawler(base_url="https://example.com/", max_depth=2),
+        index=index,
+        data_dir=tmp_path,
+    )
+    with (
+        patch("requests.Session.get", side_effect=cancel_after_fetch) as mock_get,
+        _cancellable(cancelled),
+        pytest.raises(ToolCancelledError, match="after ingesting 0 pages"),
+    ):
+        pipeline.run()
+    assert mock_get.call_count == 1
+    assert index.vector_store._collection.count() == 0
+
+
+@patch("requests.Session.get", side_effect=mock_session_get)
+def test_pipeline_skips_indexed_pages(mock_get, index, tmp_path):
+    crawler = WebsiteCrawler(base_url="https://example.com/page2", max_depth=0)
+    CrawlIngestPipeline(crawler=crawler, index=index, data_dir=tmp_path).run()
+    report = CrawlIngestPipeline(crawler=crawler, index=index, data_dir=tmp_path).run()
+
+    assert report["ingested_urls"] == []
+    assert index.vector_store._collection.count() == 1
+
+
+@patch("requests.Session.get", side_effect=mock_session_get)
+def test_pipeline_resync_from_sitemap(mock_get, index, tmp_path):
+    """Tests that a sitemap re-sync only re-ingests pages modified since last sync."""
+    crawler = WebsiteCrawler(base_url="https://example.com/", discovery="sitemap")
+    sitemap_pages = {
+        "https://example.com/page1": datetime(2024, 5, 1, tzinfo=UTC),
+        "https://example.com/page2": datetime(2024, 5, 1, tzinfo=UTC),
+    }
+
+    with patch.object(
+        WebsiteCrawler, "discover_from_sitemaps", return_value=sitemap_pages
+    ):
+        first_report = CrawlIngestPipeline(
+            crawler=crawler, index=index, data_dir=tmp_path
+        ).run()
+        sitemap_pages["https://example.com/page2"] = datetime(2024, 6, 1, tzinfo=UTC)
+        second_report = CrawlIngestPipeline(
+            crawler=crawler, index=index, data_dir=tmp_path
+        ).run()
+
+    assert sorted(first_report["ingested_urls"]) == sorted(sitemap_pages)
+    assert second_report["ingested_urls"] == ["https://example.com/page2"]
+    metadatas = index.vector_store._collection.get(include=["metadatas"])["metadatas"]
+    assert sorted(m["lastmod"] for m in metadatas) == [
+        "2024-05-01T00:00:00+00:00",
+        "2024-06-01T00:00:00+00:00",
+    ]
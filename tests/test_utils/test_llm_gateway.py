@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+from llama_index.core.base.llms.types import ChatMessage
+
+from mcp_llamaindex.utils.llm_gateway import (
+    GatewayBusyError,
+    GatewayTimeoutError,
+    LLMGateway,
+    PooledLMStudio,
+    llm_request_options,
+)
+from mcp_llamaindex.utils.metrics import MetricsRegistry
+
+
+def test_gateway_bounds_concurrency_and_serves_by_priority():
+    """Test that requests wait for a free slot, and are then served by priority."""
+    gateway = LLMGateway(max_concurrency=1, registry=MetricsRegistry())
+    served = []
+
+    def request(name: str, priority: int) -> None:
+        with gateway.slot(priority):
+            served.append(name)
+
+    with gateway.slot():
+        threads = []
+        for name, priority in [("low", 20), ("high", 0), ("medium", 10)]:
+            threads.append(threading.Thread(target=request, args=(name, priority)))
+            threads[-1].start()
+        while gateway.queue_depth < 3:
+            time.sleep(0.01)
+        assert gateway.active == 1
+    for thread in threads:
+        thread.join()
+
+    assert served == ["high", "medium", "low"]
+    assert gateway.active == 0
+
+
+def test_gateway_rejects_when_busy_and_on_deadline():
+    """Test rejections of a full queue, and of a request queued past its deadline."""
+    registry = MetricsRegistry()
+    gateway = LLMGateway(max_concurrency=1, max_queue_size=0, registry=registry)
+    with gateway.slot(), pytest.raises(GatewayBusyError), gateway.slot():
+        pass
+
+    gateway.max_queue_size = 1
+    with (
+        gateway.slot(),
+        pytest.raises(GatewayTimeoutError),
+        gateway.slot(deadline=time.monotonic() + 0.05),
+    ):
+        pass
+    assert gateway.queue_depth == 0
+    assert gateway.active == 0
+
+    gauges = {g["name"]: g["value"] for g in registry.snapshot()["gauges"]}
+    assert gauges == {"llm_queue_depth": 0, "llm_active_requests": 0}
+
+
+def test_gateway_async_cancellation_leaves_queue():
+    """Test that a cancelled async request leaves the queue, and frees its slot."""
+    gateway = LLMGateway(max_concurrency=1, registry=MetricsRegistry())
+
+    async def waiting_request():
+        async with gateway.aslot():
+            pass
+
+    async def scenario():
+        async with gateway.aslot():
+            task = asyncio.create_task(waiting_request())
+            await asyncio.sleep(0.01)
+            assert gateway.queue_depth == 1
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert gateway.queue_depth == 0
+        async with gateway.aslot():
+            assert gateway.active == 1
+
+    asyncio.run(scenario())
+    assert gateway.active == 0
+
+
+def test_pooled_lmstudio_chat_through_gateway():
+    """Test that chat requests go through the gateway, with the shared client."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(
+            200,
+            json={"choices": [{"message": {"role": "assistant", "content": "Hello"}}]},
+        )
+
+    gateway = LLMGateway(max_concurrency=2, registry=MetricsRegistry())
+    llm = PooledLMStudio(
+        model_name="test", base_url="http://llm.test/v1", gateway=gateway
+    )
+    llm._client = httpx.Client(transport=httpx.MockTransport(handler))
+
+    with llm_request_options(priority=0, timeout=5):
+        response = llm.chat([ChatMessage(role="user", content="Hi")])
+
+    assert response.message.content == "Hello"
+    assert str(requests[0].url) == "http://llm.test/v1/chat/completions"
+    assert gateway.active == 0
+
+    with llm_request_options(timeout=-1), pytest.raises(GatewayTimeoutError):
+        llm.chat([ChatMessage(role="user", content="Hi")])
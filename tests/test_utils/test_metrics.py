@@ -0,0 +1,54 @@
+from llama_index.core.callbacks import CallbackManager
+from llama_index.core.embeddings import MockEmbedding
+
+from mcp_llamaindex.utils.metrics import MetricsCallbackHandler, MetricsRegistry
+
+
+def test_registry_snapshot_percentiles():
+    registry = MetricsRegistry()
+    for value in range(1, 101):
+        registry.observe("stage_seconds", value / 100, stage="embed")
+    registry.increment("tool_calls_total", tool="query_docs")
+    registry.increment("tool_calls_total", tool="query_docs")
+
+    snapshot = registry.snapshot()
+
+    [histogram] = snapshot["histograms"]
+    assert histogram["labels"] == {"stage": "embed"}
+    assert histogram["count"] == 100
+    assert (histogram["p50"], histogram["p95"], histogram["p99"]) == (0.51, 0.96, 1.0)
+    assert snapshot["counters"] == [
+        {"name": "tool_calls_total", "labels": {"tool": "query_docs"}, "value": 2}
+    ]
+
+
+def test_prometheus_textfile(tmp_path):
+    registry = MetricsRegistry()
+    registry.observe("stage_seconds", 0.5, stage="fetch")
+    registry.increment("tokens_total", 12, kind="prompt")
+    textfile = tmp_path / "metrics.prom"
+
+    registry.write_textfile(textfile)
+
+    lines = textfile.read_text().splitlines()
+    assert "# TYPE mcp_llamaindex_stage_seconds summary" in lines
+    assert 'mcp_llamaindex_stage_seconds{stage="fetch",quantile="0.99"} 0.5' in lines
+    assert 'mcp_llamaindex_stage_seconds_count{stage="fetch"} 1' in lines
+    assert 'mcp_llamaindex_tokens_total{kind="prompt"} 12' in lines
+    assert list(tmp_path.iterdir()) == [textfile]
+
+
+def test_callback_handler_times_embeddings():
+    registry = MetricsRegistry()
+    embed_model = MockEmbedding(
+        embed_dim=8,
+        callback_manager=CallbackManager([MetricsCallbackHandler(registry)]),
+    )
+
+    embed_model.get_text_embedding_batch(["hello world", "some other text"])
+
+    snapshot = registry.snapshot()
+    assert [h["labels"] for h in snapshot["histograms"]] == [{"stage": "embed"}]
+    [tokens] = snapshot["counters"]
+    assert tokens["labels"] == {"kind": "embedding"}
+    assert tokens["value"] > 0
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from llama_index.core.embeddings import MockEmbedding
+
+from mcp_llamaindex.utils.projection import EmbeddingProjection, ProjectedEmbedding
+
+
+@pytest.fixture
+def embeddings() -> np.ndarray:
+    """Embeddings spanning 4 of 16 dimensions, with noise."""
+    rng = np.random.default_rng(0)
+    return rng.normal(size=(200, 4)) @ rng.normal(size=(4, 16)) + rng.normal(
+        scale=0.01, size=(200, 16)
+    )
+
+
+def test_pca_projection_keeps_neighbours(embeddings: np.ndarray):
+    """Test that PCA to the data rank keeps nearest neighbours, with unit vectors."""
+    projection = EmbeddingProjection.fit(embeddings, dim=4)
+    projected = projection.apply(embeddings)
+
+    assert projected.shape == (200, 4)
+    np.testing.assert_allclose(np.linalg.norm(projected, axis=1), 1.0, rtol=1e-5)
+    centered = embeddings - embeddings.mean(axis=0)
+    full = centered / np.linalg.norm(centered, axis=1, keepdims=True)
+    assert np.array_equal(
+        np.argsort(-(full[:10] @ full.T))[:, :5],
+        np.argsort(-(projected[:10] @ projected.T))[:, :5],
+    )
+
+    with pytest.raises(ValueError, match="at least 8"):
+        EmbeddingProjection.fit(embeddings[:4], dim=8)
+
+
+def test_projection_save_load(tmp_path, embeddings: np.ndarray):
+    projection = EmbeddingProjection.fit(embeddings, dim=4)
+    projection.save(tmp_path / "projection.npz")
+    loaded = EmbeddingProjection.load(tmp_path / "projection.npz")
+    assert (loaded.method, loaded.dim) == ("pca", 4)
+    np.testing.assert_allclose(loaded.apply(embeddings), projection.apply(embeddings))
+
+
+def test_projected_embedding():
+    """Test that texts and queries are both projected, under a distinct model name."""
+    base = MockEmbedding(embed_dim=16, model_name="mock")
+    embed_model = ProjectedEmbedding(base, EmbeddingProjection("truncate", 8))
+
+    assert embed_model.model_name == "mock+truncate8"
+    assert len(embed_model.get_query_embedding("query")) == 8
+    assert [len(e) for e in embed_model.get_text_embedding_batch(["a", "b"])] == [8, 8]
@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+import pytest
+from fastmcp.exceptions import ToolError
+
+from mcp_llamaindex.utils.metrics import MetricsRegistry
+from mcp_llamaindex.utils.scheduler import ToolLane, ToolScheduler, raise_if_cancelled
+
+
+def slow_ingest(seconds: float) -> str:
+    """Blocking ingestion, stopping once cancelled."""
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        raise_if_cancelled()
+        time.sleep(0.01)
+    return "ingested"
+
+
+def stubborn_ingest(seconds: float) -> str:
+    """Blocking ingestion, never checking for cancellation."""
+    time.sleep(seconds)
+    return "ingested"
+
+
+def list_files() -> list[str]:
+    """Cheap listing."""
+    return ["file1.md"]
+
+
+def make_scheduler(
+    timeout: float | None = None, cancel_grace: float = 5
+) -> ToolScheduler:
+    lanes = {
+        "ingest": ToolLane(
+            tools=["slow_ingest", "stubborn_ingest"],
+            max_concurrency=1,
+            max_queue_size=1,
+            timeout=timeout,
+            cancel_grace=cancel_grace,
+        ),
+        "cheap": ToolLane(tools=["list_files"], max_concurrency=4),
+    }
+    return ToolScheduler(lanes, registry=MetricsRegistry())
+
+
+@pytest.mark.asyncio
+async def test_scheduler_rejects_busy_lane_and_keeps_cheap_lane_fast():
+    """Test that a saturated lane rejects calls with a retry hint, without blocking others."""
+    scheduler = make_scheduler()
+    ingest = scheduler.wrap(slow_ingest)
+
+    running = asyncio.create_task(ingest(0.3))
+    queued = asyncio.create_task(ingest(0.01))
+    await asyncio.sleep(0.05)
+    with pytest.raises(ToolError, match=r"Server busy.*Retry after \d+ seconds"):
+        await ingest(0.01)
+
+    start = time.monotonic()
+    assert await scheduler.wrap(list_files)() == ["file1.md"]
+    assert time.monotonic() - start < 0.1
+
+    assert await asyncio.gather(running, queued) == ["ingested", "ingested"]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_cancels_calls_past_deadline():
+    """Test that a call past its lane timeout is stopped, and frees its slot."""
+    scheduler = make_scheduler(timeout=0.1)
+    ingest = scheduler.wrap(slow_ingest)
+
+    start = time.monotonic()
+    with pytest.raises(ToolError, match="cancelled after"):
+        await ingest(5)
+    assert time.monotonic() - start < 1
+    assert scheduler._gateways["ingest"].active == 0
+    assert await ingest(0.01) == "ingested"
+
+
+@pytest.mark.asyncio
+async def test_scheduler_reports_calls_still_stopping():
+    """Test that a call ignoring cancellation is not reported cancelled, and keeps its slot."""
+    scheduler = make_scheduler(timeout=0.1, cancel_grace=0.05)
+    ingest = scheduler.wrap(stubborn_ingest)
+
+    with pytest.raises(
+        ToolError, match="timed out after 0.1 seconds, and is still stopping"
+    ):
+        await ingest(0.4)
+    assert scheduler._gateways["ingest"].active == 1  # The thread is still running
+
+    await asyncio.sleep(0.4)
+    assert scheduler._gateways["ingest"].active == 0
+    assert await ingest(0.01) == "ingested"
+
+
+async def sample_answer(seconds: float) -> str:
+    """Async tool, e.g. sampling the client LLM."""
+    await asyncio.sleep(seconds)
+    return "sampled"
+
+
+@pytest.mark.asyncio
+async def test_scheduler_awaits_async_tools():
+    """Test that async tools run in the event loop, and are cancelled past their deadline."""
+    lanes = {"query": ToolLane(tools=["sample_answer"], max_concurrency=1, timeout=0.1)}
+    scheduler = ToolScheduler(lanes, registry=MetricsRegistry())
+    sample = scheduler.wrap(sample_answer)
+
+    assert await sample(0.01) == "sampled"
+    with pytest.raises(ToolError, match="cancelled after"):
+        await sample(1.0)
+    await asyncio.sleep(0.01)  # Cancelled, without waiting for the end of the call
+    assert scheduler._gateways["query"].active == 0
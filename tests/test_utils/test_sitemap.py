@@ -0,0 +1,80 @@
+import gzip
+from datetime import UTC, datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from mcp_llamaindex.utils.sitemap import find_sitemaps, parse_lastmod, read_sitemaps
+
+SITEMAP_INDEX = """<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+    <sitemap><loc>https://example.com/sitemap-docs.xml.gz</loc></sitemap>
+    <sitemap><loc>https://example.com/sitemap-blog.xml</loc></sitemap>
+</sitemapindex>
+"""
+SITEMAP_DOCS = """<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+    <url><loc>https://example.com/docs/page1</loc><lastmod>2024-05-01</lastmod></url>
+    <url><loc>https://example.com/docs/page2</loc></url>
+</urlset>
+"""
+SITEMAP_BLOG = """<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+    <url>
+        <loc>https://example.com/blog/post1</loc>
+        <lastmod>2024-05-01T10:00:00+02:00</lastmod>
+    </url>
+</urlset>
+"""
+
+
+def mock_requests_get(url, **kwargs):
+    responses = {
+        "https://example.com/robots.txt": "User-agent: *\nSitemap: https://example.com/sitemap-index.xml\n",
+        "https://example.com/sitemap-index.xml": SITEMAP_INDEX.encode(),
+        "https://example.com/sitemap-docs.xml.gz": gzip.compress(SITEMAP_DOCS.encode()),
+        "https://example.com/sitemap-blog.xml": SITEMAP_BLOG.encode(),
+    }
+    if url not in responses:
+        response = MagicMock()
+        response.raise_for_status.side_effect = requests.HTTPError("404 Not Found")
+        return response
+    content = responses[url]
+    return MagicMock(text=content, content=content)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("2024-05-01", datetime(2024, 5, 1, tzinfo=UTC)),
+        ("2024-05-01T10:00:00Z", datetime(2024, 5, 1, 10, tzinfo=UTC)),
+        (None, None),
+        ("not a date", None),
+    ],
+)
+def test_parse_lastmod(value, expected):
+    assert parse_lastmod(value) == expected
+
+
+@patch("requests.get", side_effect=mock_requests_get)
+def test_find_sitemaps_from_robots(mock_get):
+    assert find_sitemaps("https://example.com/docs/") == [
+        "https://example.com/sitemap-index.xml"
+    ]
+
+
+@patch("requests.get", side_effect=mock_requests_get)
+def test_find_sitemaps_default(mock_get):
+    assert find_sitemaps("https://other.com/docs/") == ["https://other.com/sitemap.xml"]
+
+
+@patch("requests.get", side_effect=mock_requests_get)
+def test_read_nested_and_gzipped_sitemaps(mock_get):
+    pages = read_sitemaps(["https://example.com/sitemap-index.xml"])
+
+    assert pages == {
+        "https://example.com/docs/page1": datetime(2024, 5, 1, tzinfo=UTC),
+        "https://example.com/docs/page2": None,
+        "https://example.com/blog/post1": datetime(2024, 5, 1, 8, tzinfo=UTC),
+    }
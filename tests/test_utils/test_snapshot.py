@@ -0,0 +1,63 @@
+import uuid
+
+import chromadb
+import numpy as np
+import pytest
+
+from mcp_llamaindex.utils.snapshot import (
+    export_collection,
+    import_collection,
+    read_manifest,
+)
+
+
+def make_collection():
+    return chromadb.EphemeralClient().create_collection(f"test_{uuid.uuid4().hex}")
+
+
+@pytest.fixture
+def collection():
+    collection = make_collection()
+    collection.add(
+        ids=["a", "b", "c"],
+        embeddings=[[0.1, 0.2], [0.3, 0.4], [0.5, 0.6]],
+        documents=["Alpha", "Bêta", "Gamma"],
+        metadatas=[{"file_name": "a.md"}, {"file_name": "b.md"}, None],
+    )
+    return collection
+
+
+def test_snapshot_round_trip(tmp_path, collection):
+    """Test that a snapshot restores ids, texts, metadata and embeddings."""
+    path = tmp_path / "snapshot.npz"
+    manifest = export_collection(collection, path, manifest_extra={"embed_model": "m"})
+    assert manifest["count"] == 3
+    assert manifest["embed_dim"] == 2
+    assert read_manifest(path)["embed_model"] == "m"
+
+    restored = make_collection()
+    import_collection(restored, path)
+
+    original = collection.get(include=["documents", "metadatas", "embeddings"])
+    loaded = restored.get(
+        ids=original["ids"], include=["documents", "metadatas", "embeddings"]
+    )
+    assert loaded["documents"] == original["documents"]
+    assert loaded["metadatas"] == original["metadatas"]
+    np.testing.assert_allclose(loaded["embeddings"], original["embeddings"])
+
+
+def test_snapshot_corrupted(tmp_path, collection):
+    """Test that a corrupted snapshot is rejected before anything is loaded."""
+    path = tmp_path / "snapshot.npz"
+    export_collection(collection, path)
+    with np.load(path) as snapshot:
+        arrays = dict(snapshot)
+    arrays["documents_buffer"] = arrays["documents_buffer"].copy()
+    arrays["documents_buffer"][0] += 1
+    np.savez_compressed(path, **arrays)
+
+    restored = make_collection()
+    with pytest.raises(ValueError, match="corrupted"):
+        import_collection(restored, path)
+    assert restored.count() == 0
@@ -0,0 +1,25 @@
+from mcp_llamaindex.utils.sqlite_kvstore import SqliteKVStore
+
+
+def test_put_get_delete(tmp_path):
+    store = SqliteKVStore(tmp_path / "kv.sqlite3")
+    store.put("key1", {"a": 1})
+    store.put_all([("key2", {"b": 2}), ("key3", {"c": 3})], collection="other")
+
+    assert store.get("key1") == {"a": 1}
+    assert store.get("key2") is None
+    assert store.get_all(collection="other") == {"key2": {"b": 2}, "key3": {"c": 3}}
+
+    assert store.delete("key1") is True
+    assert store.delete("key1") is False
+    assert store.get_all() == {}
+
+
+def test_values_persist_across_instances(tmp_path):
+    db_path = tmp_path / "kv.sqlite3"
+    store = SqliteKVStore(db_path)
+    store.put("key", {"nested": {"list": [1, 2]}})
+    store.put("key", {"nested": {"list": [3]}})
+    store.close()
+
+    assert SqliteKVStore(db_path).get("key") == {"nested": {"list": [3]}}
@@ -0,0 +1,59 @@
+import asyncio
+from typing import Any
+
+from llama_index.core import Settings
+from llama_index.core.llms import CompletionResponse, CustomLLM, LLMMetadata, MockLLM
+
+from mcp_llamaindex.utils.synthesis import (
+    ConcurrentTreeSummarize,
+    get_response_synthesizer,
+)
+
+
+class SlowLLM(CustomLLM):
+    """LLM with a small context window, tracking its simultaneous async calls."""
+
+    nb_calls: int = 0
+    nb_active: int = 0
+    max_active: int = 0
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(context_window=400, num_output=50)
+
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        return CompletionResponse(text="summary")
+
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        yield CompletionResponse(text="summary", delta="summary")
+
+    async def acomplete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        self.nb_calls += 1
+        self.nb_active += 1
+        self.max_active = max(self.max_active, self.nb_active)
+        await asyncio.sleep(0.01)
+        self.nb_active -= 1
+        return CompletionResponse(text="summary")
+
+
+def test_concurrent_tree_summarize_bounds_concurrency():
+    """Test that chunk summaries run concurrently, within the concurrency limit."""
+    llm = SlowLLM()
+    synthesizer = ConcurrentTreeSummarize(max_concurrency=2, llm=llm)
+    text_chunks = [f"chunk {i} " + "word " * 150 for i in range(6)]
+
+    response = synthesizer.get_response("query", text_chunks)
+
+    assert response == "summary"
+    # Chunks are repacked in a few context windows, summarized concurrently, then merged
+    assert llm.nb_calls > 3
+    assert llm.max_active == 2
+
+
+def test_get_response_synthesizer_modes(monkeypatch):
+    """Test that each response mode gets its synthesizer."""
+    monkeypatch.setattr(Settings, "_llm", MockLLM())
+    synthesizer = get_response_synthesizer("async_tree_summarize", max_concurrency=3)
+    assert isinstance(synthesizer, ConcurrentTreeSummarize)
+    assert synthesizer._max_concurrency == 3
+    assert type(get_response_synthesizer("compact")).__name__ == "CompactAndRefine"
@@ -1,5 +1,6 @@
+import pytest
 from unittest.mock import patch, MagicMock
-from mcp_llamaindex.utils.downloader import PageDownloader
+from mcp_llamaindex.utils.downloader import PageDownloader, html_to_markdown
 
 
 @patch("urllib.request.urlopen")
@@ -21,3 +22,28 @@ def test_save_as_markdown(mock_urlopen, tmp_path):
 
     content = output_file.read_text(encoding="utf-8")
     assert content.strip() == expected_markdown.strip()
+
+
+def test_html_to_markdown_with_css_selector():
+    html_content = (
+        "<html><body><nav><p>Menu</p></nav>"
+        "<main><h1>Hello</h1><p>This is a test.</p></main></body></html>"
+    )
+
+    markdown = html_to_markdown(html_content, css_selector="main")
+
+    assert markdown.strip() == "# Hello\n\nThis is a test."
+    assert "Menu" in html_to_markdown(html_content)
+
+
+@patch("urllib.request.urlopen")
+def test_download_html_raises_download_errors(mock_urlopen):
+    mock_response = MagicMock()
+    mock_response.getcode.return_value = 204
+    mock_urlopen.return_value.__enter__.return_value = mock_response
+
+    downloader = PageDownloader(url="http://example.com", timeout=5)
+    with pytest.raises(OSError, match="status code: 204"):
+        downloader.download_html()
+    mock_urlopen.assert_called_once_with("http://example.com", timeout=5)
+    assert downloader.html_content is None
@@ -0,0 +1,27 @@
+from llama_index.core import Document
+
+from mcp_llamaindex.utils.workers import map_in_processes, split_documents
+
+
+def test_map_in_processes_keeps_order():
+    items = ["a", "bb", "ccc", "dddd", "eeeee"]
+    assert map_in_processes(len, items, num_workers=2) == [1, 2, 3, 4, 5]
+    assert map_in_processes(len, items, num_workers=1) == [1, 2, 3, 4, 5]
+
+
+def test_split_documents_same_output_as_single_process():
+    documents = [
+        Document(text=f"Document {i}. " + "Some sentence here. " * 300, id_=str(i))
+        for i in range(6)
+    ]
+
+    serial_nodes = split_documents(documents, num_workers=1)
+    parallel_nodes = split_documents(documents, num_workers=3)
+
+    assert len(serial_nodes) > len(documents)
+    assert [n.get_content() for n in parallel_nodes] == [
+        n.get_content() for n in serial_nodes
+    ]
+    assert [n.ref_doc_id for n in parallel_nodes] == [
+        n.ref_doc_id for n in serial_nodes
+    ]